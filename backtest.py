@@ -0,0 +1,255 @@
+# Backtest GridLineManager strategies on historical candles
+from dataclasses import dataclass
+from typing import Optional
+import argparse
+
+# Third Party Imports
+import numpy as np
+import pandas as pd
+
+# Internal Imports
+from grid_line_machine import GridLineManager
+from grid_line_machine import BUY_ORDER_FILLED, BUY_ORDER_PLACED, SELL_ORDER_FILLED, SELL_ORDER_PLACED
+
+# Gate.io spot taker/maker fee
+DEFAULT_FEE_RATE = 0.002
+
+
+@dataclass
+class BacktestResult:
+    ticker: str
+    pnl: float  # cash + tokens held valued at last close
+    cash: float  # usd spent on buys subtracted, usd from sells added, fees subtracted
+    tokens_held: float
+    fees: float
+    buy_fills: int
+    sell_fills: int
+    max_capital_locked: float  # peak usd sitting in open buy orders
+    average_capital_locked: float
+    fills_per_grid_line: pd.DataFrame  # name, price, buys, sells, tokens
+
+    def __str__(self):
+        return f"""
+    {self.ticker} pnl: {self.pnl:.4f} cash: {self.cash:.4f} tokens: {self.tokens_held:.4f} fee: {self.fees:.4f}
+    buys: {self.buy_fills} sells: {self.sell_fills}
+    capital locked max: {self.max_capital_locked:.2f} avg: {self.average_capital_locked:.2f}"""
+
+
+def load_candles(_path: str) -> pd.DataFrame:
+    """Read OHLC candles from a .csv or .parquet file, columns are matched case
+    insensitively and must include open, high, low and close"""
+    if _path.endswith(".parquet"):
+        candles = pd.read_parquet(_path)
+    else:
+        candles = pd.read_csv(_path)
+    candles.columns = [str(column).lower() for column in candles.columns]
+    missing = {"open", "high", "low", "close"} - set(candles.columns)
+    if missing:
+        raise ValueError(f"{_path} is missing columns {sorted(missing)}")
+    return candles
+
+
+class Backtester:
+    """Replays candles through a GridLineManager the way GateIOConnector trades it
+
+    Every candle is one manage_trades cycle at the candle's close: buy orders
+    with price >= low and sell orders with price <= high fill, each fill is
+    applied with the GridLine transitions (ascending grid line index, as
+    reconcile_orders does) and gets its follow up order, a sell on the grid
+    line above a filled buy and a buy on the grid line below a filled sell.
+    Then free grid lines below close get a buy order, grid lines handled this
+    cycle excluded. Each grid line has at most one outstanding order and orders
+    outside of do_not_buy prices are never placed, so the bought tokens are
+    held. Buy orders before the first candle are placed at its open.
+
+    Candles where nothing can fill or be placed are skipped with a vectorized
+    search so the python loop only runs once per candle with an event. Candle
+    order inside a bar is unknown so an order can only fill on a candle after
+    the one it was placed on."""
+
+    def __init__(self, _grid_line_manager: GridLineManager, _fee_rate: float = DEFAULT_FEE_RATE):
+        self.grid_line_manager = _grid_line_manager
+        self.fee_rate = _fee_rate
+
+    def run(self, _candles: pd.DataFrame) -> BacktestResult:
+        return self.run_arrays(
+            _candles["open"].to_numpy(dtype=np.float64),
+            _candles["high"].to_numpy(dtype=np.float64),
+            _candles["low"].to_numpy(dtype=np.float64),
+            _candles["close"].to_numpy(dtype=np.float64),
+        )
+
+    def run_arrays(
+        self, _open: np.ndarray, _high: np.ndarray, _low: np.ndarray, _close: np.ndarray
+    ) -> BacktestResult:
+        manager = self.grid_line_manager
+        usd = manager.usd_to_buy_with
+        prices = manager.store.price
+        n_lines = len(prices)
+        n_candles = len(_close)
+        # +usd when a buy order is placed, -usd when it fills, cumsum is locked usd
+        locked_diff = np.zeros(n_candles + 1)
+
+        buys = np.zeros(n_lines, dtype=np.int64)
+        sells = np.zeros(n_lines, dtype=np.int64)
+        # BUY_ORDER_PLACED | SELL_ORDER_PLACED | BUY_ORDER_FILLED | SELL_ORDER_FILLED bits
+        state = np.zeros(n_lines, dtype=np.uint8)
+        in_bounds = manager.buy_bounds_mask()
+
+        def place_new_buys(_candle: int, _price: float, _handled: Optional[np.ndarray] = None):
+            # GridLineManager.free_grid_lines_below
+            free = (
+                (prices < _price)
+                & in_bounds
+                & ((state & (BUY_ORDER_PLACED | SELL_ORDER_PLACED | BUY_ORDER_FILLED)) == 0)
+            )
+            if _handled is not None:
+                free &= ~_handled
+            state[free] |= BUY_ORDER_PLACED
+            locked_diff[_candle + 1] += usd * np.count_nonzero(free)
+
+        def next_event(_candle: int) -> int:
+            """First candle from _candle on where an order fills or a new buy
+            order is placed, n_candles if there is none"""
+            buy_orders = prices[(state & BUY_ORDER_PLACED) != 0]
+            sell_orders = prices[(state & SELL_ORDER_PLACED) != 0]
+            free = in_bounds & ((state & (BUY_ORDER_PLACED | SELL_ORDER_PLACED | BUY_ORDER_FILLED)) == 0)
+            highest_buy = buy_orders.max(initial=-np.inf)
+            lowest_sell = sell_orders.min(initial=np.inf)
+            lowest_free = prices[free].min(initial=np.inf)
+            chunk = 64
+            while _candle < n_candles:
+                end = min(n_candles, _candle + chunk)
+                hits = np.flatnonzero(
+                    (_low[_candle:end] <= highest_buy)
+                    | (_high[_candle:end] >= lowest_sell)
+                    | (_close[_candle:end] > lowest_free)
+                )
+                if len(hits):
+                    return _candle + int(hits[0])
+                _candle = end
+                chunk *= 4
+            return n_candles
+
+        if n_candles:
+            place_new_buys(-1, _open[0])
+        candle = 0
+        while (candle := next_event(candle)) < n_candles:
+            filled = np.flatnonzero(
+                (((state & BUY_ORDER_PLACED) != 0) & (prices >= _low[candle]))
+                | (((state & SELL_ORDER_PLACED) != 0) & (prices <= _high[candle]))
+            ).tolist()
+            handled = np.zeros(n_lines, dtype=bool)
+            follow_ups = []
+            for index in filled:
+                line_state = state.item(index)
+                if line_state & BUY_ORDER_PLACED:
+                    # buy_order_triggerd, sell goes on the grid line above
+                    state[index] = (line_state & ~BUY_ORDER_PLACED) | BUY_ORDER_FILLED
+                    buys[index] += 1
+                    locked_diff[candle + 1] -= usd
+                    follow_ups.append((index + 1, SELL_ORDER_PLACED))
+                else:
+                    # sell_order_triggerd frees the grid line below for its buy
+                    state[index] = (line_state & ~SELL_ORDER_PLACED) | SELL_ORDER_FILLED
+                    sells[index] += 1
+                    if index > 0:
+                        state[index - 1] = state.item(index - 1) & ~BUY_ORDER_FILLED
+                    follow_ups.append((index - 1, BUY_ORDER_PLACED))
+                handled[index] = True
+            for index, order in follow_ups:
+                if not 0 <= index < n_lines:
+                    continue
+                handled[index] = True
+                if in_bounds[index]:
+                    state[index] = state.item(index) | order
+                    if order == BUY_ORDER_PLACED:
+                        locked_diff[candle + 1] += usd
+            place_new_buys(candle, _close[candle], handled)
+            candle += 1
+
+        # no candles, no orders: nothing is held that a last price would value
+        last_price = _close[-1] if n_candles else 0.0
+        return self.result(buys, sells, state, locked_diff[:-1], last_price)
+
+    def result(
+        self,
+        _buys: np.ndarray,
+        _sells: np.ndarray,
+        _state: np.ndarray,
+        _locked_diff: np.ndarray,
+        _last_price: float,
+    ) -> BacktestResult:
+        """Write fills and order state into the grid line store and sum them up"""
+        manager = self.grid_line_manager
+        usd = manager.usd_to_buy_with
+        prices = manager.store.price
+
+        # same amounts ExchangeManager.batch_orders sends: usd / price of the order's line
+        tokens = _buys * usd / prices - _sells * usd / prices
+        fees = (_buys + _sells) * usd * self.fee_rate
+        cash = float(((_sells - _buys) * usd).sum() - fees.sum())
+        tokens_held = float(tokens.sum())
+        locked = np.cumsum(_locked_diff)
+
+        store = manager.store
+        store.total_buy_orders[:] = _buys
+        store.total_sell_orders[:] = _sells
+        store.total_tokens[:] = tokens
+        store.total_cost[:] = prices * tokens
+        store.total_fee[:] = fees
+        store.state[:] = _state
+
+        return BacktestResult(
+            ticker=manager.ticker,
+            pnl=cash + tokens_held * float(_last_price),
+            cash=cash,
+            tokens_held=tokens_held,
+            fees=float(fees.sum()),
+            buy_fills=int(_buys.sum()),
+            sell_fills=int(_sells.sum()),
+            max_capital_locked=float(locked.max(initial=0)),
+            average_capital_locked=float(locked.mean()) if len(locked) else 0.0,
+            fills_per_grid_line=pd.DataFrame(
+                {
+                    "name": [grid_line.name for grid_line in manager.grid_lines_as_objects],
+                    "price": prices.copy(),
+                    "buys": _buys,
+                    "sells": _sells,
+                    "tokens": tokens,
+                }
+            ),
+        )
+
+
+def main(_args: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Backtest a grid on historical candles")
+    parser.add_argument("candles", help=".csv or .parquet file with open/high/low/close columns")
+    parser.add_argument("--ticker", default="BACKTEST_USDT")
+    parser.add_argument("--central-price", type=float, required=True)
+    parser.add_argument("--distance", type=float, default=0.1, help="0.1 == 10%%")
+    parser.add_argument("--grids", type=int, default=10, help="grid lines on each side")
+    parser.add_argument("--usd", type=float, default=11, help="usd per grid line")
+    parser.add_argument("--above", type=float, required=True, help="do not buy above this price")
+    parser.add_argument("--below", type=float, required=True, help="do not buy below this price")
+    parser.add_argument("--decimals", type=int, default=5)
+    parser.add_argument("--fee-rate", type=float, default=DEFAULT_FEE_RATE)
+    args = parser.parse_args(_args)
+
+    manager = GridLineManager(
+        _central_grid_price=args.central_price,
+        _distance_between_grids=args.distance,
+        _ticker=args.ticker,
+        _usd_amount_to_buy_with=args.usd,
+        _number_of_grids_on_each_side_of_grid_start_price=args.grids,
+        _do_not_buy_above_this_price=args.above,
+        _do_not_buy_below_this_price=args.below,
+        _round_prices_to=args.decimals,
+    )
+    result = Backtester(manager, args.fee_rate).run(load_candles(args.candles))
+    print(result)
+    print(result.fills_per_grid_line.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+# Benchmarks of grid construction, region lookup and the trade management loop
+#   python benchmark.py                  run and compare to benchmark_baseline.json
+#   python benchmark.py --save-baseline  run and overwrite benchmark_baseline.json
+from typing import Callable, Literal, Optional
+import argparse, asyncio, json, logging, os, platform, random, statistics, sys, time
+
+# Internal Imports
+from exchanges import ExchangeOrder, OpenOrders, PlacedOrders
+from exchanges.gateio import GateIOConnector, to_exchange_order, to_placed_order
+from exchanges.simulator import MatchingEngine
+from grid_line_machine import GridLine, GridLineManager
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+# total grid lines (grids on each side * 2 + 1) and tickers benchmarked
+GRID_SIZES = (11, 101, 1001, 5001)
+TICKER_COUNTS = (1, 20, 200)
+# skip ticker/grid combinations above this many grid lines in total, 200 * 5001
+# GridLines takes minutes to build and is not a realistic deployment
+MAX_TOTAL_GRID_LINES = 250_000
+# slower than baseline by more than this ratio is reported as a regression
+REGRESSION_RATIO = 1.5
+
+
+def make_manager(_grid_lines: int, _ticker: str = "BENCH_USDT") -> GridLineManager:
+    """0.1% apart grid around 1.0, 5001 lines span ~0.08 to ~12"""
+    return GridLineManager(
+        _central_grid_price=1.0,
+        _distance_between_grids=0.001,
+        _ticker=_ticker,
+        _usd_amount_to_buy_with=10,
+        _number_of_grids_on_each_side_of_grid_start_price=_grid_lines // 2,
+        _do_not_buy_above_this_price=100,
+        _do_not_buy_below_this_price=0.01,
+        _round_prices_to=8,
+    )
+
+
+class BenchmarkGateIOManager:
+    """GateIOManager stand-in backed by the simulator's MatchingEngine, no network,
+    orders go through the same json -> ExchangeOrder/PlacedOrders conversion as
+    real responses"""
+
+    def __init__(self):
+        self.engine = MatchingEngine()
+
+    async def batch_orders(
+        self,
+        _grid_lines_and_sides: list[tuple[GridLine, Literal["buy", "sell"]]],
+        _currency_pair: str,
+        _usd_amount_to_spend: float,
+        _priority=None,
+    ) -> list[PlacedOrders]:
+        return [
+            to_placed_order(
+                {
+                    **self.engine.place(
+                        _currency_pair, _side, _grid_line.price, _usd_amount_to_spend / _grid_line.price
+                    ).to_json(),
+                    "succeeded": True,
+                }
+            )
+            for _grid_line, _side in _grid_lines_and_sides
+        ]
+
+    async def batch_buy(self, _grid_lines, _currency_pair, _usd_amount_to_spend):
+        return await self.batch_orders(
+            [(_grid_line, "buy") for _grid_line in _grid_lines], _currency_pair, _usd_amount_to_spend
+        )
+
+    async def get_orders(self, _ticker: str, _status: Literal["open", "finished"]) -> list[ExchangeOrder]:
+        # like Gate.io only the first page (100 newest) of finished orders is returned
+        if _status == "open":
+            orders = self.engine.open_orders(_ticker)
+        else:
+            orders = self.engine.finished.get(_ticker, [])[:-101:-1]
+        return [to_exchange_order(order.to_json()) for order in orders]
+
+    async def get_order_status(self, _order_id, _ticker: str) -> ExchangeOrder:
+        return to_exchange_order(self.engine.orders[str(_order_id)].to_json())
+
+    async def get_all_open_orders(self) -> list[OpenOrders]:
+        return [
+            OpenOrders(pair, len(orders), [to_exchange_order(order.to_json()) for order in orders])
+            for pair in self.engine.open_pairs()
+            for orders in [self.engine.open_orders(pair)]
+        ]
+
+
+def measure(_function: Callable[[], object], _repeat: int, _setup: Optional[Callable[[], object]] = None) -> dict:
+    """Run _function _repeat times (calling _setup untimed before each run),
+    returns seconds per run"""
+    timings = []
+    for _ in range(_repeat):
+        if _setup is not None:
+            _setup()
+        start = time.perf_counter()
+        _function()
+        timings.append(time.perf_counter() - start)
+    return {"median": statistics.median(timings), "min": min(timings), "runs": _repeat}
+
+
+def bench_construction(_grid_lines: int, _repeat: int) -> dict[str, dict]:
+    """create_grid_line_objects: GridLine views are created on first access,
+    so this times creating the view of every line of a fresh manager"""
+    managers = [make_manager(_grid_lines)]
+
+    def fresh_manager():
+        managers[0] = make_manager(_grid_lines)
+
+    return {
+        f"construction/GridLineManager/{_grid_lines}": measure(lambda: make_manager(_grid_lines), _repeat),
+        f"construction/calculate_grid_lines/{_grid_lines}": measure(managers[0].calculate_grid_lines, _repeat),
+        f"construction/create_grid_line_objects/{_grid_lines}": measure(
+            lambda: list(managers[0].grid_lines_as_objects), _repeat, fresh_manager
+        ),
+    }
+
+
+def bench_lookups(_grid_lines: int, _repeat: int, _lookups: int = 10_000) -> dict[str, dict]:
+    """Per run: _lookups get_region calls on random prices inside the grid (cold
+    and warm region cache) and _lookups grid_line_obj_map_price calls on
+    exchange style string prices of grid lines"""
+    manager = make_manager(_grid_lines)
+    rng = random.Random(_grid_lines)
+    low, high = manager.grid_lines[0], manager.grid_lines[-1]
+    # 8 decimals so nearly every price misses the region cache
+    cold_prices = [round(rng.uniform(low, high), 8) for _ in range(_lookups)]
+    # a price feed mostly repeats a handful of prices
+    warm_prices = [rng.choice(cold_prices[:50]) for _ in range(_lookups)]
+    order_prices = [f"{rng.choice(manager.grid_lines)}" for _ in range(_lookups)]
+
+    def get_region(_prices: list[float]):
+        for price in _prices:
+            manager.get_region(price)
+
+    def map_price():
+        for price in order_prices:
+            manager.grid_line_obj_map_price(price)
+
+    return {
+        f"lookup/get_region_cold/{_grid_lines}": measure(
+            lambda: get_region(cold_prices), _repeat, manager._region_cache.clear
+        ),
+        f"lookup/get_region_warm/{_grid_lines}": measure(lambda: get_region(warm_prices), _repeat),
+        f"lookup/grid_line_obj_map_price/{_grid_lines}": measure(map_price, _repeat),
+    }
+
+
+def bench_remove_duplicate_orders(_grid_lines: int, _tickers: int, _repeat: int) -> dict[str, dict]:
+    """Restore state of every ticker from one resync, half of each grid has an
+    open buy and a few lines have an open sell"""
+    managers = [make_manager(_grid_lines, f"T{index}_USDT") for index in range(_tickers)]
+    connector = GateIOConnector(*managers, _price_feed="rest")
+    giom = BenchmarkGateIOManager()
+    for manager in managers:
+        lines = list(manager.grid_lines_as_objects)
+        half = len(lines) // 2
+        asyncio.run(giom.batch_orders([(line, "buy") for line in lines[:half]], manager.ticker, 10))
+        asyncio.run(giom.batch_orders([(line, "sell") for line in lines[half + 1 : half + 4]], manager.ticker, 10))
+    open_orders_by_pair = asyncio.run(connector.resync_open_orders(giom))
+
+    async def restore():
+        for manager in managers:
+            await connector.remove_duplicate_orders(manager, giom, open_orders_by_pair)
+
+    return {
+        f"remove_duplicate_orders/{_tickers}x{_grid_lines}": measure(lambda: asyncio.run(restore()), _repeat)
+    }
+
+
+def bench_manage_trades(_grid_lines: int, _tickers: int, _repeat: int) -> dict[str, dict]:
+    """One manage_trades cycle of every ticker run concurrently (like the ticker
+    watchers do) while price swings 0.5% around 1.0, each cycle fills ~5 orders
+    per ticker and places their follow ups"""
+    managers = [make_manager(_grid_lines, f"T{index}_USDT") for index in range(_tickers)]
+    connector = GateIOConnector(*managers, _price_feed="rest")
+    giom = BenchmarkGateIOManager()
+    prices = iter([1.005, 0.995] * (_repeat + 1))
+
+    async def cycle(_price: float):
+        for manager in managers:
+            giom.engine.set_price(manager.ticker, _price)
+        await asyncio.gather(
+            *(connector.manage_trades(_price, manager, giom) for manager in managers)
+        )
+
+    # place initial buys outside of the timed runs
+    asyncio.run(cycle(1.0))
+    return {
+        f"manage_trades/{_tickers}x{_grid_lines}": measure(lambda: asyncio.run(cycle(next(prices))), _repeat)
+    }
+
+
+def run_benchmarks(
+    _grid_sizes: tuple[int, ...] = GRID_SIZES,
+    _ticker_counts: tuple[int, ...] = TICKER_COUNTS,
+    _repeat: int = 5,
+) -> dict[str, dict]:
+    """Logging is discarded while benchmarking so numbers measure the bot's
+    logic and not the terminal/log file"""
+    results: dict[str, dict] = {}
+    logging.disable(logging.CRITICAL)
+    try:
+        for grid_lines in _grid_sizes:
+            results.update(bench_construction(grid_lines, _repeat))
+            results.update(bench_lookups(grid_lines, _repeat))
+            for tickers in _ticker_counts:
+                if tickers * grid_lines > MAX_TOTAL_GRID_LINES:
+                    continue
+                results.update(bench_remove_duplicate_orders(grid_lines, tickers, _repeat))
+                results.update(bench_manage_trades(grid_lines, tickers, _repeat))
+    finally:
+        logging.disable(logging.NOTSET)
+    return results
+
+
+def compare(_results: dict[str, dict], _baseline: dict[str, dict], _ratio: float = REGRESSION_RATIO) -> list[str]:
+    """Names of benchmarks whose median is more than _ratio times the baseline"""
+    return [
+        name
+        for name, result in _results.items()
+        if name in _baseline and result["median"] > _baseline[name]["median"] * _ratio
+    ]
+
+
+def main(_args: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark grid and trade management hot paths")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--grids", type=int, nargs="+", default=GRID_SIZES, help="total grid lines")
+    parser.add_argument("--tickers", type=int, nargs="+", default=TICKER_COUNTS)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--ratio", type=float, default=REGRESSION_RATIO)
+    args = parser.parse_args(_args)
+
+    results = run_benchmarks(tuple(args.grids), tuple(args.tickers), args.repeat)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+    print(f"{'benchmark':<50} {'median ms':>12} {'baseline ms':>12} {'ratio':>7}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        base_ms = f"{base['median'] * 1000:.3f}" if base else "-"
+        ratio = f"{result['median'] / base['median']:.2f}" if base else "-"
+        print(f"{name:<50} {result['median'] * 1000:>12.3f} {base_ms:>12} {ratio:>7}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(
+                {"python": platform.python_version(), "machine": platform.machine(), "results": results},
+                f,
+                indent=2,
+            )
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.ratio)
+    if regressions:
+        print(f"\n{len(regressions)} benchmarks slower than {args.ratio}x baseline")
+        for name in regressions:
+            print(f"    {name}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
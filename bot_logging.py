@@ -0,0 +1,106 @@
+# Queue backed logging, file/console I/O happens on a background thread
+#   listener = setup_logging()   # once at startup, before the event loop runs
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+import atexit, gzip, json, logging, os, queue, shutil
+
+LOG_FILE = "DCALOGS.log"
+# rotate at this size, keeping LOG_BACKUP_COUNT gzipped files (DCALOGS.log.1.gz ...)
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One compact json object per line, structured fields are passed with
+    logger.info(msg, extra={"fields": {...}}) and merged into the object"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        event = {
+            "time": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        event.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            event["exception"] = self.formatException(record.exc_info)
+        return json.dumps(event, separators=(",", ":"), default=str)
+
+
+class LazyQueueHandler(QueueHandler):
+    """QueueHandler formats the message in the calling thread before queueing it,
+    records stay in this process so they are queued as is and %-args are only
+    merged into the message on the listener thread. Args must not be mutated
+    after logging, pass snapshots (numbers, strings, dicts of them)"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class CompressingRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that gzips every rotated file"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.namer = lambda _name: _name + ".gz"
+        self.rotator = self.compress
+
+    @staticmethod
+    def compress(_source: str, _destination: str):
+        with open(_source, "rb") as source, gzip.open(_destination, "wb") as destination:
+            shutil.copyfileobj(source, destination)
+        os.remove(_source)
+
+
+def setup_logging(
+    _path: str = LOG_FILE,
+    _level: int = logging.INFO,
+    _max_bytes: int = LOG_MAX_BYTES,
+    _backup_count: int = LOG_BACKUP_COUNT,
+    _console: bool = False,
+) -> QueueListener:
+    """Route every log record through a queue to a background thread which
+    writes json lines to _path (and plain text to stdout if _console)
+
+    Logging calls on the event loop only build a LogRecord and put it on the
+    queue. Calling it again replaces the previous setup"""
+    global _listener
+    stop_logging()
+
+    file_handler = CompressingRotatingFileHandler(
+        _path, maxBytes=_max_bytes, backupCount=_backup_count, encoding="utf-8"
+    )
+    file_handler.setFormatter(JsonLinesFormatter())
+    handlers: list[logging.Handler] = [file_handler]
+    if _console:
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter("%(message)s"))
+        handlers.append(console_handler)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.addHandler(LazyQueueHandler(log_queue))
+    root.setLevel(_level)
+
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    """Flush queued records, close handlers and detach the queue handler"""
+    global _listener
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, LazyQueueHandler):
+            root.removeHandler(handler)
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_logging)
@@ -1,13 +1,30 @@
-import asyncio
+import argparse, asyncio
 
 # Internal Imports
+from bot_logging import setup_logging
+from grid_journal import GridJournal
 from grid_line_machine import GridLineManager
+from exchanges.binance import BinanceConnector
+from exchanges.connector import run_connectors
 from exchanges.gateio import GateIOConnector
+from loop_monitor import PROFILE_SECONDS, LoopMonitor
+from metrics import METRICS_PORT
+from supervisor import Supervisor
 
 
-
-async def move_price():  # Price Tracker
-    cpool = GridLineManager(
+# GridLineManager arguments of every grid the bot runs
+GRIDS = [
+    dict(
+        _central_grid_price=0.19700,
+        _distance_between_grids=0.1,
+        _ticker="VANRY_USDT",
+        _usd_amount_to_buy_with=11,
+        _number_of_grids_on_each_side_of_grid_start_price=10,
+        _do_not_buy_above_this_price = 0.3,
+        _do_not_buy_below_this_price = 0.13,
+        _round_prices_to=5,
+    ),
+    dict(
         _central_grid_price=0.15350,
         _distance_between_grids=0.1,
         _ticker="CPOOL_USDT",
@@ -16,21 +33,46 @@ async def move_price():  # Price Tracker
         _do_not_buy_above_this_price = 0.25,
         _do_not_buy_below_this_price = 0.1,
         _round_prices_to=5,
+    ),
+]
+# Same for Binance grids, tickers are Binance symbols i.e "VANRYUSDT"
+BINANCE_GRIDS: list[dict] = []
+
+
+async def move_price(_profile_seconds: float = 0):  # Price Tracker
+    managers = [GridLineManager(**grid) for grid in GRIDS]
+    # kill -USR1 <pid> profiles the event loop any time later
+    loop_monitor = LoopMonitor(
+        _profile_seconds=_profile_seconds or PROFILE_SECONDS,
+        _profile_on_start=bool(_profile_seconds),
     )
-    vanry = GridLineManager(
-        _central_grid_price=0.19700,
-        _distance_between_grids=0.1,
-        _ticker="VANRY_USDT",
-        _usd_amount_to_buy_with=11,
-        _number_of_grids_on_each_side_of_grid_start_price=10,
-        _do_not_buy_above_this_price = 0.3,
-        _do_not_buy_below_this_price = 0.13,
-        _round_prices_to=5,
+    x = GateIOConnector(
+        *managers, _journal=GridJournal(), _metrics_port=METRICS_PORT, _loop_monitor=loop_monitor
+    )
+    if not BINANCE_GRIDS:
+        await x.entry_point()
+        return
+    # one journal per connector, two connections writing one file contend for its lock
+    binance = BinanceConnector(
+        *(GridLineManager(**grid) for grid in BINANCE_GRIDS),
+        _journal=GridJournal("grid_state.binance.db"),
     )
-    x = GateIOConnector(vanry,cpool)
-    
-    await x.entry_point()
+    await run_connectors(x, binance)
 
 
 if __name__ == "__main__":
-    asyncio.run(move_price())
+    parser = argparse.ArgumentParser(description="Run DCA grid bot")
+    parser.add_argument(
+        "--shards", type=int, default=1, help="worker processes, above 1 runs supervisor.py mode"
+    )
+    parser.add_argument(
+        "--profile", type=float, default=0, metavar="SECONDS",
+        help="profile the event loop for SECONDS right after start, files go to profiles/",
+    )
+    args = parser.parse_args()
+    if args.shards > 1:
+        # every process sets up its own log file
+        Supervisor(GRIDS, _shards=args.shards, _metrics_port=METRICS_PORT).run()
+    else:
+        setup_logging(_console=True)
+        asyncio.run(move_price(args.profile))
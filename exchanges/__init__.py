@@ -1,14 +1,22 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from dotenv import load_dotenv
 from typing import Optional
 
 from typing import Literal
-import os
+import asyncio, os, time
 
 load_dotenv()
 
 GATEIO_KEY = os.environ.get("GATEIO_KEY")
 GATEIO_SECRET = os.environ.get("GATEIO_SECRET")
+# point these to exchanges/simulator.py to run against a local stand-in
+GATEIO_HOST = os.environ.get("GATEIO_HOST", "https://api.gateio.ws")
+GATEIO_WS_URL = os.environ.get("GATEIO_WS_URL", "wss://api.gateio.ws/ws/v4/")
+
+BINANCE_KEY = os.environ.get("BINANCE_KEY")
+BINANCE_SECRET = os.environ.get("BINANCE_SECRET")
+BINANCE_HOST = os.environ.get("BINANCE_HOST", "https://api.binance.com")
+BINANCE_WS_URL = os.environ.get("BINANCE_WS_URL", "wss://stream.binance.com:9443/ws")
 
 
 @dataclass
@@ -41,3 +49,57 @@ class PlacedOrders:
     side: Literal["buy", "sell"]
     success: bool
     label : Optional[str] = None
+
+
+@dataclass
+class ExchangeOrder:
+    """Order (open or finished) as reported by Exchanges"""
+    id: str
+    currency_pair: str
+    price: float
+    amount: float
+    side: Literal["buy", "sell"]
+    status: str  # open, closed, cancelled
+    finish_as: str  # open, filled, cancelled, ioc, stp
+    left: float = 0
+    create_time: int = 0
+
+
+@dataclass
+class OpenOrders:
+    """Open orders of one currency pair, total is count of all open orders of pair"""
+    currency_pair: str
+    total: int
+    orders: list[ExchangeOrder]
+
+
+@dataclass
+class PriceUpdate:
+    """Latest price of a ticker, watchers await wait_for_change instead of polling"""
+    ticker: str
+    market_price: Optional[float] = None
+    # incremented on every price change
+    version: int = 0
+    # time.monotonic() of last price reported by the feed, 0 until first price
+    updated_at: float = 0
+    _changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False, compare=False)
+
+    def set_market_price(self, _price: float) -> bool:
+        """Store new price and wake every watcher, False if price didn't change"""
+        # feed reported the ticker, even if the price is the same
+        self.updated_at = time.monotonic()
+        if _price == self.market_price:
+            return False
+        self.market_price = _price
+        self.version += 1
+        # wake current waiters, later waiters wait on a fresh event for next change
+        self._changed.set()
+        self._changed = asyncio.Event()
+        return True
+
+    async def wait_for_change(self, _version: int) -> int:
+        """Wait until price changes after _version was seen, returns new version.
+        Multiple changes while caller was busy are coalesced into one wake up"""
+        while self.version == _version:
+            await self._changed.wait()
+        return self.version
@@ -0,0 +1,450 @@
+# Binance connector to Manage Orders
+#   BinanceConnector(GridLineManager(_ticker="VANRYUSDT", ...))
+# Tickers are Binance symbols (VANRYUSDT), Gate.io grids keep VANRY_USDT
+from typing import Literal, Optional
+from urllib.parse import urlencode
+
+# STD imports
+import asyncio, aiohttp, hashlib, hmac, json, logging, math, time
+
+# Internal Imports
+from . import BINANCE_KEY, BINANCE_SECRET, BINANCE_HOST, BINANCE_WS_URL
+from . import OrderToBePlaced, PlacedOrders, PriceUpdate, ExchangeOrder, OpenOrders
+from .binance_ws import ORDER_STATUS, BinanceOrderStream, BinancePriceStream
+from .connector import ExchangeApiException, ExchangeClient, ExchangeConnector, ExchangeManager
+from .rate_limiter import BINANCE_RATE_LIMITS, Priority, RequestScheduler
+from metrics import API_CALL_SECONDS, API_ERRORS
+
+logger = logging.getLogger("dca.binance")
+
+# orders/cancels in flight at once, spot has no batch endpoint
+MAX_CONCURRENT_ORDERS = 10
+
+
+class BinanceApiException(ExchangeApiException):
+    """Error response returned by Binance api, label is its error code i.e -2013"""
+
+
+def format_decimal(_value: float) -> str:
+    """Plain decimal Binance accepts, no exponent and at most 8 decimals"""
+    return f"{_value:.8f}".rstrip("0").rstrip(".")
+
+
+def step_decimals(_step: str) -> int:
+    """Decimals of a filter size, "0.01000000" -> 2"""
+    return len(_step.rstrip("0").partition(".")[2])
+
+
+def format_to_step(_value: float, _step: str, _round_down: bool = False) -> str:
+    """_value rounded to a multiple of _step (a filter size like "0.01000000"),
+    _round_down for quantities so an order never spends more than asked"""
+    step = float(_step)
+    if step <= 0:
+        return format_decimal(_value)
+    # tolerance keeps 0.3/0.1 = 2.9999999999999996 at 3 steps
+    steps = math.floor(_value / step + 1e-9) if _round_down else round(_value / step)
+    return f"{steps * step:.{step_decimals(_step)}f}"
+
+
+def to_exchange_order(_data: dict) -> ExchangeOrder:
+    """Convert Binance order json to ExchangeOrder"""
+    status, finish_as = ORDER_STATUS.get(_data.get("status", ""), ("open", "open"))
+    amount = float(_data["origQty"])
+    return ExchangeOrder(
+        id=str(_data["orderId"]),
+        currency_pair=_data["symbol"],
+        price=float(_data["price"]),
+        amount=amount,
+        side=_data["side"].lower(),
+        status=status,
+        finish_as=finish_as,
+        left=amount - float(_data.get("executedQty") or 0),
+        create_time=int(_data.get("time") or _data.get("transactTime") or 0) // 1000,
+    )
+
+
+def to_placed_order(_data: dict) -> PlacedOrders:
+    """Convert a new order response to PlacedOrders"""
+    return PlacedOrders(
+        price=float(_data["price"]),
+        tokens=float(_data["origQty"]),
+        order_id=str(_data["orderId"]),
+        create_time=int(_data.get("transactTime") or 0) // 1000,
+        currency_pair=_data["symbol"],
+        side=_data["side"].lower(),
+        success=True,
+    )
+
+
+class Binance(ExchangeClient):
+    """Non blocking client for the Binance spot endpoints the bot uses, every call
+    goes through one pooled aiohttp session, private endpoints are HMAC-SHA256
+    signed. Orders are placed/cancelled one request each, concurrently"""
+
+    prefix = "/api/v3"
+
+    def __init__(
+        self,
+        _key: Optional[str] = BINANCE_KEY,
+        _secret: Optional[str] = BINANCE_SECRET,
+        _connection_limit: int = 20,
+        _keepalive_timeout: float = 30,
+        _scheduler: Optional[RequestScheduler] = None,
+        _host: str = BINANCE_HOST,
+        _recv_window: int = 5000,
+    ):
+        """_connection_limit: max simultaneous connections in the pool
+        _keepalive_timeout: seconds an idle connection is kept open for reuse
+        _scheduler: rate limiter every request waits on, pass one to share it
+        _recv_window: ms a signed request stays valid after its timestamp"""
+        self.scheduler = _scheduler or RequestScheduler(BINANCE_RATE_LIMITS)
+        self.host = _host
+        self.key = _key or ""
+        self.secret = _secret or ""
+        self.connection_limit = _connection_limit
+        self.keepalive_timeout = _keepalive_timeout
+        self.recv_window = _recv_window
+        # Created on first use bcz aiohttp sessions must be created inside running loop
+        self._session: Optional[aiohttp.ClientSession] = None
+        # symbol -> (LOT_SIZE stepSize, PRICE_FILTER tickSize), see symbol_filters
+        self.filters: dict[str, tuple[str, str]] = {}
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Long lived pooled session shared by every call of this instance"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.connection_limit, keepalive_timeout=self.keepalive_timeout
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector, headers={"Accept": "application/json"}
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def sign(self, _query_string: str) -> str:
+        return hmac.new(self.secret.encode(), _query_string.encode(), hashlib.sha256).hexdigest()
+
+    async def request(
+        self,
+        _method: Literal["GET", "POST", "PUT", "DELETE"],
+        _path: str,
+        _params: Optional[dict] = None,
+        _signed: bool = False,
+        _with_key: bool = False,
+        _endpoint_class: Optional[str] = None,
+        _priority: Priority = Priority.PRICE_POLL,
+    ):
+        """Send request to self.prefix + _path and return decoded json, every
+        parameter goes in the query string. Raises BinanceApiException for
+        error responses
+
+        _with_key: send the api key header without signing, user data stream
+        endpoints only want that
+        _endpoint_class: rate limit bucket, defaults to "private" for requests
+        sent with the api key and "public" for the others
+        _priority: lane the request waits in when rate limit is reached"""
+        _endpoint_class = _endpoint_class or ("private" if _signed or _with_key else "public")
+        await self.scheduler.acquire(_endpoint_class, _priority)
+
+        params = dict(_params or {})
+        headers = None
+        if _signed:
+            params["timestamp"] = int(time.time() * 1000)
+            params["recvWindow"] = self.recv_window
+        query_string = urlencode(params)
+        if _signed:
+            query_string += "&signature=" + self.sign(query_string)
+        if _signed or _with_key:
+            headers = {"X-MBX-APIKEY": self.key}
+
+        url = self.host + self.prefix + _path
+        async with self.session.request(
+            _method, f"{url}?{query_string}" if query_string else url, headers=headers
+        ) as r:
+            if r.status < 400:
+                return await r.json(content_type=None)
+            # 418 is an IP ban for ignoring 429s
+            if r.status in (418, 429):
+                self.scheduler.throttled(_endpoint_class)
+            # error pages from proxies/waf are html, not json
+            text = await r.text()
+            try:
+                data = json.loads(text)
+            except ValueError:
+                data = {"msg": text}
+            data = data if isinstance(data, dict) else {}
+            label = str(data.get("code", r.status))
+            API_ERRORS.inc("binance", label)
+            raise BinanceApiException(r.status, label, data.get("msg", ""))
+
+    async def prices(
+        self,
+        _currency_pairs: Optional[list[str]] = None,
+        _priority: Priority = Priority.PRICE_POLL,
+    ) -> dict[str, str]:
+        """Returns {symbol: best bid}, one bookTicker request for any number of
+        symbols. None fetches every symbol on the exchange"""
+        with API_CALL_SECONDS.time("binance", "prices"):
+            params = None
+            if _currency_pairs is not None:
+                params = {"symbols": json.dumps(_currency_pairs, separators=(",", ":"))}
+            tickers = await self.request("GET", "/ticker/bookTicker", params, _priority=_priority)
+            return {data["symbol"]: data["bidPrice"] for data in tickers}
+
+    async def symbol_filters(
+        self, _symbols: list[str], _priority: Priority = Priority.NEW_GRID_ORDER
+    ) -> dict[str, tuple[str, str]]:
+        """(stepSize, tickSize) of _symbols, exchangeInfo is asked once per symbol
+        and cached. Symbols it can't be fetched for are left out (and asked again
+        next time), their orders go with 8 decimals and get their error from /order"""
+        missing = sorted({symbol for symbol in _symbols if symbol not in self.filters})
+
+        async def fetch(_symbol: str):
+            try:
+                response = await self.request(
+                    "GET", "/exchangeInfo", {"symbol": _symbol}, _priority=_priority
+                )
+            except (BinanceApiException, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning(
+                    "Exchange info request failed for %s : %s", _symbol, e,
+                    extra={"fields": {"ticker": _symbol, "error": repr(e)}},
+                )
+                return
+            for symbol in response["symbols"]:
+                filters = {f["filterType"]: f for f in symbol.get("filters", [])}
+                self.filters[symbol["symbol"]] = (
+                    filters.get("LOT_SIZE", {}).get("stepSize", "0"),
+                    filters.get("PRICE_FILTER", {}).get("tickSize", "0"),
+                )
+
+        if missing:
+            with API_CALL_SECONDS.time("binance", "symbol_filters"):
+                await asyncio.gather(*(fetch(symbol) for symbol in missing))
+        return {symbol: self.filters[symbol] for symbol in _symbols if symbol in self.filters}
+
+    async def price_decimals(self, _currency_pairs: list[str]) -> dict[str, int]:
+        """Decimals of each symbol's PRICE_FILTER tickSize"""
+        return {
+            symbol: step_decimals(tick)
+            for symbol, (_step, tick) in (await self.symbol_filters(_currency_pairs)).items()
+            if float(tick) > 0
+        }
+
+    async def place_batch_orders(
+        self,
+        orders: list[OrderToBePlaced] | OrderToBePlaced,
+        _priority: Priority = Priority.NEW_GRID_ORDER,
+    ) -> list[PlacedOrders]:
+        """Place GTC limit orders, MAX_CONCURRENT_ORDERS requests at a time.
+        Returns one PlacedOrders per order in the same order as orders
+
+        Quantity is rounded down to the symbol's LOT_SIZE step and price to its
+        tick size, Binance rejects anything finer (-1013)"""
+        with API_CALL_SECONDS.time("binance", "place_batch_orders"):
+            if not isinstance(orders, list):
+                orders = [orders]
+            _filters = await self.symbol_filters([order.currency_pair for order in orders], _priority)
+            _semaphore = asyncio.Semaphore(MAX_CONCURRENT_ORDERS)
+
+            async def place(_order: OrderToBePlaced) -> PlacedOrders:
+                _step, _tick = _filters.get(_order.currency_pair, ("0", "0"))
+                async with _semaphore:
+                    try:
+                        response = await self.request(
+                            "POST",
+                            "/order",
+                            {
+                                "symbol": _order.currency_pair,
+                                "side": _order.side.upper(),
+                                "type": "LIMIT",
+                                "timeInForce": "GTC",
+                                "quantity": format_to_step(_order.amount, _step, _round_down=True),
+                                "price": format_to_step(_order.price, _tick),
+                                "newOrderRespType": "RESULT",
+                            },
+                            _signed=True,
+                            _endpoint_class="order",
+                            _priority=_priority,
+                        )
+                        return to_placed_order(response)
+                    except BinanceApiException as ex:
+                        logger.warning(
+                            "Order rejected for %s, code: %s, message: %s",
+                            _order.currency_pair, ex.label, ex.message,
+                            extra={"fields": {"ticker": _order.currency_pair, "side": _order.side, "code": ex.label}},
+                        )
+                        _label = ex.label
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        logger.warning(
+                            "Order request failed for %s : %s", _order.currency_pair, e,
+                            extra={"fields": {"ticker": _order.currency_pair, "side": _order.side, "error": repr(e)}},
+                        )
+                        _label = "ApiException"
+                    return PlacedOrders(0, 0, 0, 0, _order.currency_pair, _order.side, False, _label)
+
+            return list(await asyncio.gather(*(place(order) for order in orders)))
+
+    async def cancel_batch_orders(
+        self,
+        orders: list[tuple[str, str]],
+        _priority: Priority = Priority.NEW_GRID_ORDER,
+    ) -> set[str]:
+        """Cancel [(symbol, order_id)], one request per order sent concurrently.
+        Returns ids of the orders that got cancelled"""
+        with API_CALL_SECONDS.time("binance", "cancel_batch_orders"):
+            _semaphore = asyncio.Semaphore(MAX_CONCURRENT_ORDERS)
+
+            async def cancel(_symbol: str, _order_id: str) -> Optional[str]:
+                async with _semaphore:
+                    try:
+                        response = await self.request(
+                            "DELETE",
+                            "/order",
+                            {"symbol": _symbol, "orderId": _order_id},
+                            _signed=True,
+                            _endpoint_class="cancel",
+                            _priority=_priority,
+                        )
+                        return str(response["orderId"])
+                    except BinanceApiException as ex:
+                        # -2011 unknown order, already filled or cancelled
+                        if ex.label != "-2011":
+                            logger.warning(
+                                "Cancel rejected for %s %s, code: %s, message: %s",
+                                _symbol, _order_id, ex.label, ex.message,
+                                extra={"fields": {"ticker": _symbol, "order_id": _order_id, "code": ex.label}},
+                            )
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        logger.warning(
+                            "Cancel request failed for %s %s : %s", _symbol, _order_id, e,
+                            extra={"fields": {"ticker": _symbol, "order_id": _order_id, "error": repr(e)}},
+                        )
+                    return None
+
+            results = await asyncio.gather(*(cancel(symbol, order_id) for symbol, order_id in orders))
+            return {order_id for order_id in results if order_id is not None}
+
+    async def get_all_open_orders(
+        self, _priority: Priority = Priority.RECONCILIATION
+    ) -> list[OpenOrders]:
+        """Returns All Open Order, Placed Limit Orders of every symbol, one request"""
+        with API_CALL_SECONDS.time("binance", "get_all_open_orders"):
+            try:
+                response = await self.request(
+                    "GET", "/openOrders", _signed=True, _priority=_priority
+                )
+            except BinanceApiException as ex:
+                logger.warning(
+                    "Open orders rejected, code: %s, message: %s", ex.label, ex.message,
+                    extra={"fields": {"code": ex.label}},
+                )
+                return []
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning(
+                    "Open orders request failed : %s", e, extra={"fields": {"error": repr(e)}}
+                )
+                return []
+
+            open_orders_by_pair: dict[str, OpenOrders] = {}
+            for order in response:
+                orders = open_orders_by_pair.setdefault(
+                    order["symbol"], OpenOrders(currency_pair=order["symbol"], total=0, orders=[])
+                )
+                orders.orders.append(to_exchange_order(order))
+                orders.total += 1
+            return list(open_orders_by_pair.values())
+
+    async def list_orders(
+        self,
+        _ticker: str,
+        _status: Literal["open", "finished"],
+        _limit: int = 100,
+        _priority: Priority = Priority.RECONCILIATION,
+    ) -> list[ExchangeOrder]:
+        """Orders of a single symbol, finished orders are newest first and come
+        from the _limit most recent orders of the symbol"""
+        with API_CALL_SECONDS.time("binance", "list_orders"):
+            if _status == "open":
+                response = await self.request(
+                    "GET", "/openOrders", {"symbol": _ticker}, _signed=True, _priority=_priority
+                )
+                return [to_exchange_order(order) for order in response]
+
+            response = await self.request(
+                "GET",
+                "/allOrders",
+                {"symbol": _ticker, "limit": _limit},
+                _signed=True,
+                _priority=_priority,
+            )
+            # oldest first
+            orders = [to_exchange_order(order) for order in reversed(response)]
+            return [order for order in orders if order.status != "open"]
+
+    async def check_filled_order_status(
+        self,
+        _order_id: int,
+        _ticker: str,
+        _priority: Priority = Priority.RECONCILIATION,
+    ) -> ExchangeOrder:
+        with API_CALL_SECONDS.time("binance", "check_filled_order_status"):
+            response = await self.request(
+                "GET",
+                "/order",
+                {"symbol": _ticker, "orderId": _order_id},
+                _signed=True,
+                _priority=_priority,
+            )
+            return to_exchange_order(response)
+
+    async def new_listen_key(self) -> str:
+        """Open a user data stream, returns the listen key its websocket is reached
+        with. Binance closes it after 60 minutes without keepalive_listen_key"""
+        with API_CALL_SECONDS.time("binance", "new_listen_key"):
+            response = await self.request(
+                "POST", "/userDataStream", _with_key=True, _priority=Priority.FILL_FOLLOW_UP
+            )
+            return response["listenKey"]
+
+    async def keepalive_listen_key(self, _listen_key: str):
+        with API_CALL_SECONDS.time("binance", "keepalive_listen_key"):
+            await self.request(
+                "PUT",
+                "/userDataStream",
+                {"listenKey": _listen_key},
+                _with_key=True,
+                _priority=Priority.FILL_FOLLOW_UP,
+            )
+
+
+class BinanceManager(ExchangeManager):
+    """ExchangeManager over a Binance client"""
+
+    def __init__(
+        self, _scheduler: Optional[RequestScheduler] = None, _host: str = BINANCE_HOST
+    ):
+        super().__init__(
+            Binance(_scheduler=_scheduler or RequestScheduler(BINANCE_RATE_LIMITS), _host=_host)
+        )
+
+
+class BinanceConnector(ExchangeConnector):
+    """ExchangeConnector trading on Binance spot, see exchanges/connector.py"""
+
+    exchange = "binance"
+    default_host = BINANCE_HOST
+    default_ws_url = BINANCE_WS_URL
+    prices_objects: dict[str, PriceUpdate] = {}
+
+    def make_manager(self) -> BinanceManager:
+        return BinanceManager(_scheduler=self.scheduler, _host=self.host)
+
+    def price_stream(self) -> BinancePriceStream:
+        return BinancePriceStream(self.prices_objects, self.ws_url)
+
+    def order_stream(self, _giom, _on_order, _on_connect) -> BinanceOrderStream:
+        return BinanceOrderStream(_giom.client, _on_order, self.ws_url, _on_connect=_on_connect)
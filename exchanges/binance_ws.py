@@ -0,0 +1,138 @@
+# Binance websocket streams
+from typing import Callable, Optional
+
+# STD imports
+import asyncio, aiohttp, logging
+
+# Internal Imports
+from . import ExchangeOrder, PriceUpdate, BINANCE_WS_URL
+from .connector import ExchangeApiException, ExchangeClient
+from .websocket import WebsocketStream
+
+logger = logging.getLogger("dca.binance")
+
+# Binance order status -> (status, finish_as) as Gate.io reports them
+ORDER_STATUS = {
+    "NEW": ("open", "open"),
+    "PARTIALLY_FILLED": ("open", "open"),
+    "PENDING_CANCEL": ("open", "open"),
+    "FILLED": ("closed", "filled"),
+    "CANCELED": ("cancelled", "cancelled"),
+    "EXPIRED": ("cancelled", "cancelled"),
+    "EXPIRED_IN_MATCH": ("cancelled", "cancelled"),
+    "REJECTED": ("cancelled", "cancelled"),
+}
+
+
+class BinancePriceStream(WebsocketStream):
+    """Subscribes to <symbol>@bookTicker of every ticker in prices_objects and
+    writes the best bid into the matching PriceUpdate"""
+
+    channel = "bookTicker"
+
+    def __init__(self, _prices_objects: dict[str, PriceUpdate], _url: str = BINANCE_WS_URL, **kwargs):
+        """_prices_objects: symbol (i.e VANRYUSDT) -> PriceUpdate"""
+        super().__init__(_url, **kwargs)
+        self.prices_objects = _prices_objects
+
+    def subscribe_message(self) -> dict:
+        return {
+            "method": "SUBSCRIBE",
+            "params": [f"{symbol.lower()}@{self.channel}" for symbol in self.prices_objects],
+            "id": self.connections,
+        }
+
+    def handle_message(self, _message: dict) -> Optional[PriceUpdate]:
+        """Update PriceUpdate for symbol in message, returns updated PriceUpdate
+        or None if message was not a price update for a tracked symbol"""
+        if _message.get("error"):
+            logger.warning(
+                "Binance websocket error %s", _message["error"],
+                extra={"fields": {"error": _message["error"]}},
+            )
+            return None
+        price_object = self.prices_objects.get(_message.get("s"))
+        if price_object is None or not _message.get("b"):
+            return None
+        price_object.set_market_price(float(_message["b"]))
+        return price_object
+
+
+def to_order_update(_data: dict) -> ExchangeOrder:
+    """Convert an executionReport event to ExchangeOrder"""
+    status, finish_as = ORDER_STATUS.get(_data.get("X", ""), ("open", "open"))
+    amount = float(_data["q"])
+    return ExchangeOrder(
+        id=str(_data["i"]),
+        currency_pair=_data["s"],
+        price=float(_data["p"]),
+        amount=amount,
+        side=_data["S"].lower(),
+        status=status,
+        finish_as=finish_as,
+        left=amount - float(_data.get("z") or 0),
+        create_time=int(_data.get("O") or 0) // 1000,
+    )
+
+
+class BinanceOrderStream(WebsocketStream):
+    """User data stream of the account, every executionReport (order placed,
+    traded, cancelled) is passed to _on_order as an ExchangeOrder. Each
+    connection opens a listen key over REST and keeps it alive while connected"""
+
+    def __init__(
+        self,
+        _client: ExchangeClient,
+        _on_order: Callable[[ExchangeOrder], None],
+        _url: str = BINANCE_WS_URL,
+        _keepalive_interval: float = 1800,
+        **kwargs,
+    ):
+        """_client: Binance client the listen key is requested with
+        _keepalive_interval: seconds between listen key keepalives, Binance
+        expires it after 60 minutes without one
+        kwargs: WebsocketStream arguments i.e _on_connect"""
+        super().__init__(_url, **kwargs)
+        self.client = _client
+        self.on_order = _on_order
+        self.keepalive_interval = _keepalive_interval
+        self.listen_key: Optional[str] = None
+
+    def subscribe_messages(self) -> list[dict]:
+        # listen key in the url is the subscription
+        return []
+
+    async def connect_url(self, _session: aiohttp.ClientSession) -> str:
+        try:
+            self.listen_key = await self.client.new_listen_key()
+        except ExchangeApiException as e:
+            # retried with backoff like any other connection error
+            raise aiohttp.ClientError(f"listen key not created {e}") from e
+        return f"{self.url}/{self.listen_key}"
+
+    async def stream(self, _session: aiohttp.ClientSession):
+        keepalive = asyncio.create_task(self.keepalive())
+        try:
+            await super().stream(_session)
+        finally:
+            keepalive.cancel()
+
+    async def keepalive(self):
+        while True:
+            await asyncio.sleep(self.keepalive_interval)
+            try:
+                await self.client.keepalive_listen_key(self.listen_key)
+            except (ExchangeApiException, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning(
+                    "Binance listen key keepalive failed : %s", e,
+                    extra={"fields": {"error": repr(e)}},
+                )
+
+    def handle_message(self, _message: dict) -> Optional[ExchangeOrder]:
+        """Pass order of an executionReport to on_order, returns it or None
+        for other events (balance updates etc)"""
+        if _message.get("e") != "executionReport":
+            return None
+        order = to_order_update(_message)
+        self.on_order(order)
+        return order
@@ -0,0 +1,906 @@
+# Exchange agnostic core of the bot, grid bookkeeping and order flow shared by
+# every exchange adapter
+#   await run_connectors(GateIOConnector(*gate_grids), BinanceConnector(*binance_grids))
+# An exchange plugs in with an ExchangeClient (signed REST calls returning the
+# dataclasses of exchanges/__init__.py), an ExchangeManager over it and an
+# ExchangeConnector subclass naming the two plus its price stream
+from typing import Literal, Optional
+
+# STD imports
+import asyncio, logging, time
+
+# Third Party Imports
+import aiohttp
+import numpy as np
+
+# Internal Imports
+from . import OrderToBePlaced, PlacedOrders, PriceUpdate, ExchangeOrder, OpenOrders
+from .price_board import PriceBoard, PriceBoardReader
+from .rate_limiter import Priority, RequestScheduler
+from .websocket import WebsocketStream
+from grid_line_machine import GridLine, GridLineManager
+from grid_line_machine import BUY_ORDER_FILLED, BUY_ORDER_PLACED, SELL_ORDER_PLACED
+from grid_journal import GridJournal
+from loop_monitor import LoopMonitor
+from metrics import MANAGE_TRADES_SECONDS, PRICE_STALENESS_SECONDS, REGISTRY, start_metrics_server
+
+# mp/region of every ticker on each price change, see ExchangeConnector._log_ticks
+tick_logger = logging.getLogger("dca.ticks")
+logger = logging.getLogger("dca.connector")
+# remove_duplicate_orders joins fewer open orders than this in a plain loop
+VECTORIZE_MIN_ORDERS = 64
+
+
+class ExchangeApiException(Exception):
+    """Error response returned by an exchange api, label is the exchange's
+    error name or code"""
+
+    def __init__(self, status: int, label: str, message: str):
+        super().__init__(f"{status} {label}: {message}")
+        self.status = status
+        self.label = label
+        self.message = message
+
+
+class ExchangeClient:
+    """Calls an exchange adapter implements, everything the core needs from an
+    exchange: tickers, batch orders, order status, open orders and cancel.
+    Requests wait on self.scheduler, a RequestScheduler with the exchange's
+    rate limits, and share one pooled session per client"""
+
+    scheduler: RequestScheduler
+
+    async def prices(
+        self,
+        _currency_pairs: Optional[list[str]] = None,
+        _priority: Priority = Priority.PRICE_POLL,
+    ) -> dict[str, str]:
+        """Returns {currency_pair: highest_bid}, None fetches every pair"""
+        raise NotImplementedError
+
+    async def place_batch_orders(
+        self,
+        orders: list[OrderToBePlaced] | OrderToBePlaced,
+        _priority: Priority = Priority.NEW_GRID_ORDER,
+    ) -> list[PlacedOrders]:
+        """Returns one PlacedOrders per order in the same order as orders,
+        failures are reported per order (success False + label) not raised"""
+        raise NotImplementedError
+
+    async def cancel_batch_orders(
+        self,
+        orders: list[tuple[str, str]],
+        _priority: Priority = Priority.NEW_GRID_ORDER,
+    ) -> set[str]:
+        """Cancel [(currency_pair, order_id)], returns ids of the orders that got
+        cancelled, orders that failed (already filled, not found ...) are left out"""
+        raise NotImplementedError
+
+    async def get_all_open_orders(self) -> list[OpenOrders]:
+        """Open orders of every pair, [] when the call fails"""
+        raise NotImplementedError
+
+    async def list_orders(
+        self, _ticker: str, _status: Literal["open", "finished"]
+    ) -> list[ExchangeOrder]:
+        """Orders of a single pair, finished orders are newest first"""
+        raise NotImplementedError
+
+    async def check_filled_order_status(self, _order_id: int, _ticker: str) -> ExchangeOrder:
+        raise NotImplementedError
+
+    async def get_price(self, _ticker: str) -> float:
+        prices = await self.prices([_ticker])
+        return float(prices[_ticker])
+
+    async def price_decimals(self, _currency_pairs: list[str]) -> dict[str, int]:
+        """Decimals of each pair's price tick, pairs left out keep the
+        round_prices_to they were configured with"""
+        return {}
+
+    async def close(self):
+        raise NotImplementedError
+
+
+class ExchangeManager:
+    """Places and tracks orders of grid lines on one exchange through its client,
+    batch orders, cancel, order status, get price for ticker
+
+    Every call waits on the client's request scheduler, a token bucket per
+    endpoint class with priority lanes: fill follow ups, new grid orders,
+    reconciliation and price polling. scheduler.stats() shows queue depth and
+    wait times"""
+
+    def __init__(self, _client: ExchangeClient):
+        self.client = _client
+        self.scheduler = _client.scheduler
+
+    async def batch_buy(
+        self,
+        _grid_lines: list[GridLine],
+        _currency_pair: str,
+        _usd_amount_to_spend: float,
+    ):
+        return await self.batch_orders(
+            [(_each_grid, "buy") for _each_grid in _grid_lines],
+            _currency_pair,
+            _usd_amount_to_spend,
+        )
+
+    async def batch_orders(
+        self,
+        _grid_lines_and_sides: list[tuple[GridLine, Literal["buy", "sell"]]],
+        _currency_pair: str,
+        _usd_amount_to_spend: float,
+        _priority: Priority = Priority.NEW_GRID_ORDER,
+    ) -> Optional[list[PlacedOrders]]:
+        """Place buy and/or sell orders on grid lines in one batch request,
+        statuses are returned in the same order as _grid_lines_and_sides"""
+        _orders_list = []
+        for _each_grid, _side in _grid_lines_and_sides:
+            _orders_list.append(
+                OrderToBePlaced(
+                    currency_pair=_currency_pair,
+                    price=_each_grid.price,
+                    amount=_usd_amount_to_spend / _each_grid.price,
+                    side=_side,
+                )
+            )
+
+        if len(_orders_list) < 1:
+            logger.info(
+                "No grid lines available for %s", _currency_pair,
+                extra={"fields": {"ticker": _currency_pair}},
+            )
+            return
+        _orders_status = await self.client.place_batch_orders(
+            _orders_list, _priority
+        )
+        return _orders_status
+
+    async def cancel_orders(
+        self,
+        _grid_lines: list[GridLine],
+        _currency_pair: str,
+        _priority: Priority = Priority.NEW_GRID_ORDER,
+    ) -> set[str]:
+        """Cancel orders of grid lines, returns ids of cancelled orders"""
+        if not _grid_lines:
+            return set()
+        return await self.client.cancel_batch_orders(
+            [(_currency_pair, str(_grid_line.order_id)) for _grid_line in _grid_lines],
+            _priority,
+        )
+
+    async def get_order_status(self, _order_id: int, _ticker: str):
+        orders_statuses = await self.client.check_filled_order_status(
+            _order_id, _ticker
+        )
+        return orders_statuses
+
+    async def get_all_open_orders(self) -> list[OpenOrders]:
+        return await self.client.get_all_open_orders()
+
+    async def price_decimals(self, _currency_pairs: list[str]) -> dict[str, int]:
+        return await self.client.price_decimals(_currency_pairs)
+
+    async def get_orders(
+        self, _ticker: str, _status: Literal["open", "finished"]
+    ) -> list[ExchangeOrder]:
+        return await self.client.list_orders(_ticker, _status)
+
+    async def fetch_prices(self, _currency_pairs: Optional[list[str]] = None):
+        return await self.client.prices(_currency_pairs)
+
+    async def close(self):
+        await self.client.close()
+
+
+
+
+class ExchangeConnector:
+    """Takes in multiple lists of GridLIne objects then runs in loop to keep track
+    of prices for each ticker and place orders on one exchange.
+
+    Exchange adapters subclass it, naming the exchange, its endpoints, how to
+    build its ExchangeManager and price stream. Every subclass keeps its own
+    prices_objects (price cache of its tickers) and every connector its own
+    manager (connection pool + rate limiter), run_connectors drives several
+    exchanges from one event loop"""
+
+    exchange = ""
+    default_host = ""
+    default_ws_url = ""
+    # ticker -> PriceUpdate, one dict per exchange, subclasses define their own
+    prices_objects: dict[str, PriceUpdate] = {}
+
+    def __init__(
+        self,
+        *grid_lines_objects: GridLineManager,
+        _price_feed: Literal["websocket", "rest"] = "websocket",
+        _ws_url: Optional[str] = None,
+        _host: Optional[str] = None,
+        _log_ticks: bool = True,
+        _journal: Optional[GridJournal] = None,
+        _price_board: Optional[PriceBoard] = None,
+        _scheduler: Optional[RequestScheduler] = None,
+        _metrics_port: Optional[int] = None,
+        _loop_monitor: Optional[LoopMonitor] = None,
+        _order_stream: Optional[bool] = None,
+        _reconcile_interval: float = 60,
+    ):
+        """_price_feed: "websocket" streams prices for tracked tickers only,
+        "rest" polls the exchange's tickers every 2 seconds
+        _host & _ws_url: exchange endpoints (default_host / default_ws_url if not
+                         given), i.e a local exchanges/simulator.py
+        _log_ticks: False silences the mp/region line logged on every price change
+        _journal: grid state is restored from it on start and journaled while running
+        _price_board: read prices from a board another process publishes to
+                      (see supervisor.py) instead of running _price_feed
+        _scheduler: rate limiter of every request, i.e one with shared buckets
+        _metrics_port: serve metrics.py metrics on http://127.0.0.1:<port>/metrics
+        _loop_monitor: started with the connector, logs event loop stalls and
+                       profiles the loop on SIGUSR1 (see loop_monitor.py)
+        _order_stream: fills are pushed by the exchange's private order stream and
+                       their follow up orders placed right away, instead of polling
+                       for fills on every price move. On by default with the
+                       websocket price feed
+        _reconcile_interval: seconds between safety reconciles (fills polled like
+                             without the order stream) while the order stream runs"""
+        self.grid_line_managers = grid_lines_objects
+        self.price_feed = _price_feed
+        self.ws_url = _ws_url or self.default_ws_url
+        self.host = _host or self.default_host
+        self.log_ticks = _log_ticks
+        self.journal = _journal
+        self.price_board = _price_board
+        self.scheduler = _scheduler
+        self.metrics_port = _metrics_port
+        self.loop_monitor = _loop_monitor
+        if _order_stream is None:
+            _order_stream = _price_feed == "websocket" and _price_board is None
+        self.order_stream_enabled = _order_stream
+        self.reconcile_interval = _reconcile_interval
+        # tickers whose grid state came from journal at start
+        self.restored_tickers: set[str] = set()
+        # tickers whose initial orders are placed, reconciles wait for it
+        self.started_tickers: set[str] = set()
+        self.grid_line_managers_by_ticker = {
+            grid_line_manager.ticker: grid_line_manager
+            for grid_line_manager in self.grid_line_managers
+        }
+        # one trade cycle or streamed fill of a ticker at a time, so a fill is
+        # never applied while the cycle placing its grid line's order is running
+        self.ticker_locks = {_ticker: asyncio.Lock() for _ticker in self.grid_line_managers_by_ticker}
+        # manager of the running entry_point, used by order stream callbacks
+        self.giom: Optional[ExchangeManager] = None
+        # fill/reconnect handlers started by the order stream, kept until done
+        self.order_stream_tasks: set[asyncio.Task] = set()
+
+        # create prices_objects from grid_lines_objects.tickers
+        for grid_line_manager in self.grid_line_managers:
+            _ticker = grid_line_manager.ticker
+            type(self).prices_objects[_ticker] = PriceUpdate(_ticker)
+
+    def make_manager(self) -> ExchangeManager:
+        """Manager (client, connection pool, rate limiter) used by entry_point"""
+        raise NotImplementedError
+
+    def price_stream(self):
+        """Websocket price feed writing into prices_objects, has a run() coroutine"""
+        raise NotImplementedError
+
+    def order_stream(self, _giom: ExchangeManager, _on_order, _on_connect) -> Optional[WebsocketStream]:
+        """Private order stream of the account calling _on_order(ExchangeOrder) on
+        every order event and _on_connect after every (re)connection. None if the
+        exchange has none, fills are polled then"""
+        return None
+
+    def apply_order_status(self, _grid_line: GridLine, order_status: ExchangeOrder) -> bool:
+        """Update _grid_line from exchange order, True if the order got filled"""
+        if order_status.finish_as == "filled":
+            if order_status.side == "buy":
+                _grid_line.buy_order_triggerd(order_status.amount)
+                return True
+            else:
+                _grid_line.sell_order_triggerd(order_status.amount)
+                return True
+        elif order_status.status == "cancelled":
+            # cancelled by user(or due to some unforseen reason) free the grid line
+            _grid_line.order_cancelled()
+            return False
+        else:
+            return False
+
+    async def reconcile_orders(
+        self, _grid_line_manager: GridLineManager, _giom: ExchangeManager
+    ) -> list[tuple[GridLine, ExchangeOrder]]:
+        """Fetch open and recently finished orders of the ticker once and apply
+        every fill to grid lines with a placed order, instead of one get_order
+        call per grid line. Returns [(grid_line, filled order)]"""
+        _ticker = _grid_line_manager.ticker
+        _grids_with_orders = _grid_line_manager.grid_lines_with_orders()
+        if not _grids_with_orders:
+            return []
+
+        try:
+            open_orders, finished_orders = await asyncio.gather(
+                _giom.get_orders(_ticker, "open"), _giom.get_orders(_ticker, "finished")
+            )
+            open_order_ids = {order.id for order in open_orders}
+            finished_orders_by_id = {order.id: order for order in finished_orders}
+
+            _grids_and_statuses = []
+            for _grid_line in _grids_with_orders:
+                _order_id = str(_grid_line.order_id)
+                if _order_id in open_order_ids:
+                    continue
+                # None: not in first page of either list, asked for directly below
+                _grids_and_statuses.append((_grid_line, finished_orders_by_id.get(_order_id)))
+            # lookups wait on the scheduler concurrently instead of one after another
+            _missing = [_grid_line for _grid_line, _status in _grids_and_statuses if _status is None]
+            _missing_statuses = iter(await asyncio.gather(
+                *(_giom.get_order_status(_grid_line.order_id, _ticker) for _grid_line in _missing)
+            ))
+        except (ExchangeApiException, aiohttp.ClientError, asyncio.TimeoutError) as e:
+            # grid lines keep their orders, next cycle tries again
+            logger.warning(
+                "Reconcile failed for %s, skipping cycle : %s", _ticker, e,
+                extra={"fields": {"ticker": _ticker, "error": repr(e)}},
+            )
+            return []
+
+        _filled = []
+        for _grid_line, order_status in _grids_and_statuses:
+            if order_status is None:
+                order_status = next(_missing_statuses)
+            if self.apply_order_status(_grid_line, order_status):
+                _filled.append((_grid_line, order_status))
+        return _filled
+
+    def can_place_order(
+        self, _grid_line: Optional[GridLine], _grid_line_manager: GridLineManager
+    ) -> bool:
+        """False for missing grid lines and grid lines outside of do_not_buy prices"""
+        if _grid_line is None:
+            return False
+        return not (
+            _grid_line.price > _grid_line_manager.do_not_buy_above_price
+            or _grid_line.price < _grid_line_manager.do_not_buy_below_price
+        )
+
+    async def place_orders(
+        self,
+        _grid_lines_and_sides: list[tuple[GridLine, Literal["buy", "sell"]]],
+        _grid_line_manager: GridLineManager,
+        _giom: ExchangeManager,
+        _priority: Priority = Priority.NEW_GRID_ORDER,
+    ):
+        """Place orders on grid lines in a single batch and mark each grid line
+        with the result of its own order"""
+        _grid_lines_and_sides = [
+            (_grid_line, _side)
+            for _grid_line, _side in _grid_lines_and_sides
+            if self.can_place_order(_grid_line, _grid_line_manager)
+        ]
+        if not _grid_lines_and_sides:
+            return
+        _statuses = await _giom.batch_orders(
+            _grid_lines_and_sides,
+            _currency_pair=_grid_line_manager.ticker,
+            _usd_amount_to_spend=_grid_line_manager.usd_to_buy_with,
+            _priority=_priority,
+        )
+        if _statuses is None:
+            return
+        for (_grid_line, _side), status in zip(_grid_lines_and_sides, _statuses):
+            if status.success and _side == "buy":
+                _grid_line.buy_order_success(status.order_id)
+            elif status.success:
+                _grid_line.sell_order_success(status.order_id)
+            else:
+                logger.warning(
+                    "Failed to place %s order %s : ticker : %s", _side, status.label, _grid_line_manager.ticker,
+                    extra={"fields": {"ticker": _grid_line_manager.ticker, "side": _side, "label": status.label}},
+                )
+
+    async def resync_open_orders(
+        self, _giom: ExchangeManager
+    ) -> dict[str, list[ExchangeOrder]]:
+        """Fetch every page of open orders once and index them by pair"""
+        open_orders_by_pair: dict[str, list[ExchangeOrder]] = {}
+        for orders in await _giom.get_all_open_orders():
+            open_orders_by_pair.setdefault(orders.currency_pair, []).extend(orders.orders)
+        return open_orders_by_pair
+
+    async def remove_duplicate_orders(
+        self,
+        _grid_line_manager: GridLineManager,
+        _giom: ExchangeManager,
+        _open_orders_by_pair: Optional[dict[str, list[ExchangeOrder]]] = None,
+    ) -> list[GridLine]:
+        """Restore grid line state from orders already open on exchange, returns
+        grid lines that already have an order
+
+        _open_orders_by_pair: result of resync_open_orders, fetched if not given"""
+        if _open_orders_by_pair is None:
+            _open_orders_by_pair = await self.resync_open_orders(_giom)
+
+        _orders = _open_orders_by_pair.get(_grid_line_manager.ticker, [])
+        store = _grid_line_manager.store
+        if len(_orders) < VECTORIZE_MIN_ORDERS:
+            # numpy's per call overhead costs more than a short loop over
+            # the store's columns
+            _tick_index = _grid_line_manager.tick_index()
+            _scale = 10**_grid_line_manager.round_price_to
+            # memoryviews write single items into the columns faster than numpy indexing
+            _state, _total_buy_orders = memoryview(store.state), memoryview(store.total_buy_orders)
+            _order_id, _order_index = store.order_id, store.order_index
+            _lines = store.lines
+            _grids, _sell_grids = [], []
+            for order in _orders:
+                # grid_line_index inlined
+                _index = _tick_index.get(round(float(order.price) * _scale))
+                if _index is None:
+                    continue
+                if order.side == "buy":
+                    _state[_index] |= BUY_ORDER_PLACED
+                    # store.set_order_id inlined
+                    _order_id[_index] = order.id
+                    _order_index[order.id] = _index
+                    _grids.append(_lines.get(_index) or _lines[_index])
+                elif order.side == "sell" and _index > 0:
+                    # Last grid where buy was placed, sell is on the one above
+                    _state[_index - 1] |= BUY_ORDER_FILLED
+                    _total_buy_orders[_index - 1] += 1
+                    _state[_index] |= SELL_ORDER_PLACED
+                    _order_id[_index] = order.id
+                    _order_index[order.id] = _index
+                    _sell_grids.append(_lines.get(_index) or _lines[_index])
+                    _sell_grids.append(_lines.get(_index - 1) or _lines[_index - 1])
+            _grids.extend(_sell_grids)
+            return _grids
+        else:
+            # join open orders with grid lines on price tick, then write state
+            # of every matched grid line into the store at once
+            _indices = _grid_line_manager.grid_line_indices([order.price for order in _orders])
+            # side is "buy" or "sell"
+            _is_buy = np.array([order.side == "buy" for order in _orders], dtype=bool)
+            _order_ids = np.array([order.id for order in _orders], dtype=object)
+            _buys = (_indices >= 0) & _is_buy
+            # sell needs the grid line below where its buy was placed
+            _sells = (_indices > 0) & ~_is_buy
+
+            _buy_indices = _indices[_buys]
+            _sell_indices = _indices[_sells]
+            store.set_state(BUY_ORDER_PLACED, _buy_indices, True)
+            store.set_order_ids(_buy_indices, _order_ids[_buys])
+            # Last grid where buy was placed
+            store.set_state(BUY_ORDER_FILLED, _sell_indices - 1, True)
+            np.add.at(store.total_buy_orders, _sell_indices - 1, 1)
+            # Current grid where sell order is placed
+            store.set_state(SELL_ORDER_PLACED, _sell_indices, True)
+            store.set_order_ids(_sell_indices, _order_ids[_sells])
+            # buy grid lines, then each sell's grid line and the one its buy filled on
+            _grid_indices = _buy_indices.tolist()
+            for _index in _sell_indices.tolist():
+                _grid_indices += (_index, _index - 1)
+            return store.lines.views(_grid_indices)
+
+    async def resume_from_journal(
+        self,
+        _mp: float,
+        _grid_line_manager: GridLineManager,
+        _giom: ExchangeManager,
+        _open_orders_by_pair: Optional[dict[str, list[ExchangeOrder]]] = None,
+    ):
+        """Grid state came from the journal, only reconcile what changed while
+        the bot was down: open orders the journal doesn't know about (placed
+        right before a crash) are joined on price like a fresh start, then one
+        manage_trades cycle applies fills/cancels and places missing orders"""
+        if _open_orders_by_pair is None:
+            _open_orders_by_pair = await self.resync_open_orders(_giom)
+        _known_order_ids = {
+            str(_order_id) for _order_id in _grid_line_manager.store.order_id if _order_id != 0
+        }
+        _ticker = _grid_line_manager.ticker
+        _unknown_orders = [
+            order
+            for order in _open_orders_by_pair.get(_ticker, [])
+            if str(order.id) not in _known_order_ids
+        ]
+        if _unknown_orders:
+            await self.remove_duplicate_orders(
+                _grid_line_manager, _giom, {_ticker: _unknown_orders}
+            )
+        await self.manage_trades(_mp, _grid_line_manager, _giom)
+
+    async def buy_batch_order(
+        self,
+        _mp: float,
+        _grid_line_manager: GridLineManager,
+        _giom: ExchangeManager,
+        _open_orders_by_pair: Optional[dict[str, list[ExchangeOrder]]] = None,
+    ):
+        _grid_line_manager.extend_to(_mp)
+        orders_already_placed = await self.remove_duplicate_orders(
+            _grid_line_manager, _giom, _open_orders_by_pair
+        )
+        # do_not_buy prices are inclusive, like can_place_order
+        _mask = (
+            (_grid_line_manager.store.price < _mp)
+            & _grid_line_manager.buy_bounds_mask()
+            & _grid_line_manager.window_mask(_mp)
+        )
+        _mask[[_grid.index for _grid in orders_already_placed]] = False
+        _grids_where_order_are_to_be_placed = [
+            _grid_line_manager[_index] for _index in np.flatnonzero(_mask)
+        ]
+
+        _statuses = await _giom.batch_buy(
+            _grid_lines=_grids_where_order_are_to_be_placed,
+            _currency_pair=_grid_line_manager.ticker,
+            _usd_amount_to_spend=_grid_line_manager.usd_to_buy_with,
+        )
+        if _statuses is None:
+            return
+        # statuses come back in order of the grid lines, the price exchange
+        # returns may be rounded to its tick and match no grid line
+        for grid, status in zip(_grids_where_order_are_to_be_placed, _statuses):
+            if status.label is None and status.success:
+                grid.buy_order_success(status.order_id)
+
+            else:
+                logger.warning(
+                    "Placing batch order failed %s : ticker : %s", status.label, _grid_line_manager.ticker,
+                    extra={"fields": {"ticker": _grid_line_manager.ticker, "side": "buy", "label": status.label}},
+                )
+
+    async def entry_point(self):
+        """Start Loop to track prices for each class
+        Seperate Each ticker tracking create a worker using asyncio.get_loop"""
+        _tasks = []
+        _giom = self.make_manager()
+        # Task 1 global_price_updater
+        # * each GridLineManager watcher i.e : ticker_watcher
+        loop = asyncio.get_event_loop()
+        _metrics_runner = None
+        if self.metrics_port is not None:
+            _metrics_runner = await start_metrics_server(self.metrics_port)
+        if self.loop_monitor is not None:
+            self.loop_monitor.start()
+        if self.price_board is not None:
+            _board_reader = PriceBoardReader(
+                self.price_board,
+                {
+                    _grid_line_manager.ticker: self.prices_objects[_grid_line_manager.ticker]
+                    for _grid_line_manager in self.grid_line_managers
+                },
+            )
+            _tasks.append(loop.create_task(_board_reader.run()))
+        elif self.price_feed == "websocket":
+            _tasks.append(loop.create_task(self.price_stream().run()))
+        else:
+            _tasks.append(loop.create_task(self.global_price_updater(_giom)))
+        await self.snap_grid_prices(_giom)
+        if self.journal is not None:
+            for _grid_line_manager in self.grid_line_managers:
+                if self.journal.restore(_grid_line_manager):
+                    self.restored_tickers.add(_grid_line_manager.ticker)
+            _tasks.append(loop.create_task(self.journal.run()))
+        self.giom = _giom
+        if self.order_stream_enabled:
+            _order_stream = self.order_stream(
+                _giom, self.on_order_update, self.on_order_stream_connect
+            )
+            if _order_stream is None:
+                logger.info(
+                    "No order stream for %s, polling for fills", self.exchange,
+                    extra={"fields": {"exchange": self.exchange}},
+                )
+                self.order_stream_enabled = False
+            else:
+                _tasks.append(loop.create_task(_order_stream.run()))
+                for _grid_line_manager in self.grid_line_managers:
+                    _tasks.append(
+                        loop.create_task(self.reconcile_loop(_grid_line_manager, _giom))
+                    )
+        try:
+            # one open orders sync shared by every ticker at startup
+            _open_orders_by_pair = await self.resync_open_orders(_giom)
+            # each task is grid for unique ticker
+            for _grid_line_manager in self.grid_line_managers:
+                _tasks.append(
+                    loop.create_task(
+                        self.ticker_watcher(_grid_line_manager, _giom, _open_orders_by_pair)
+                    )
+                )
+            await asyncio.gather(*_tasks)
+        finally:
+            # nothing may touch the journal or the session once they are closed
+            _running = [*_tasks, *self.order_stream_tasks]
+            for _task in _running:
+                _task.cancel()
+            await asyncio.gather(*_running, return_exceptions=True)
+            if self.journal is not None:
+                self.journal.close()
+            if _metrics_runner is not None:
+                await _metrics_runner.cleanup()
+            if self.loop_monitor is not None:
+                await self.loop_monitor.stop()
+            await _giom.close()
+
+    async def snap_grid_prices(self, _giom: ExchangeManager):
+        """Round grid prices to the price tick of their pair where the exchange
+        has a coarser one than round_prices_to, before anything is restored"""
+        _decimals = await _giom.price_decimals(
+            [_grid_line_manager.ticker for _grid_line_manager in self.grid_line_managers]
+        )
+        for _grid_line_manager in self.grid_line_managers:
+            _ticker = _grid_line_manager.ticker
+            if _ticker in _decimals and _grid_line_manager.snap_to_decimals(_decimals[_ticker]):
+                logger.info(
+                    "Grid prices of %s rounded to %s decimals, the exchange's price tick",
+                    _ticker, _decimals[_ticker],
+                    extra={"fields": {"ticker": _ticker, "decimals": _decimals[_ticker]}},
+                )
+
+    async def ticker_watcher(
+        self,
+        _grid_line_manager: GridLineManager,
+        _giom: ExchangeManager,
+        _open_orders_by_pair: Optional[dict[str, list[ExchangeOrder]]] = None,
+    ):
+        """Called with GridLineManager as param and places order on the exchange"""
+        # exchange manager
+        giom = _giom
+        _ticker = _grid_line_manager.ticker
+        tick_logger.info("%s %s", _ticker, _grid_line_manager.grid_lines)
+        _decimals = _grid_line_manager.round_price_to
+
+        price_object = self.prices_objects[_ticker]
+        # wait for first price, returns at once if a price already came in
+        version = await price_object.wait_for_change(0)
+        last_price = price_object.market_price
+
+        async with self.ticker_locks[_ticker]:
+            if _ticker in self.restored_tickers:
+                await self.resume_from_journal(last_price, _grid_line_manager, giom, _open_orders_by_pair)
+            else:
+                await self.buy_batch_order(last_price, _grid_line_manager, giom, _open_orders_by_pair)
+            self.started_tickers.add(_ticker)
+        last_lower_grid, last_higher_grid = last_price, last_price
+        while True:
+            market_price: float = price_object.market_price
+            # sliding grid grows when price gets close to its last grid line
+            _grid_line_manager.extend_to(market_price)
+            lower_grid, higher_grid = _grid_line_manager.get_region(market_price)
+
+            # DEV check if price is within 1% of any grid
+            price_in_lower_grid_range = False
+            price_in_higher_grid_range = False
+            if round(market_price - (0.005 * market_price), _decimals) < lower_grid:
+                price_in_lower_grid_range = True
+
+            if round(market_price + (0.005 * market_price), _decimals) > higher_grid:
+                price_in_higher_grid_range = True
+
+            if self.log_ticks:
+                tick_logger.info(
+                    "%s  mp: %s\t\t REGION : %s : %s",
+                    _ticker, round(market_price, _decimals), lower_grid, higher_grid,
+                )
+            if (
+                (last_lower_grid != lower_grid and last_higher_grid != higher_grid)
+                or price_in_lower_grid_range
+                or price_in_higher_grid_range
+            ):
+                async with self.ticker_locks[_ticker]:
+                    with MANAGE_TRADES_SECONDS.time(self.exchange, _ticker):
+                        # fills come from the order stream when it runs
+                        await self.manage_trades(
+                            market_price, _grid_line_manager, giom,
+                            _reconcile=not self.order_stream_enabled,
+                        )
+
+            last_lower_grid, last_higher_grid = lower_grid, higher_grid
+            # sleep until price feed writes a different price
+            version = await price_object.wait_for_change(version)
+
+    def follow_up_orders(
+        self,
+        _filled: list[tuple[GridLine, ExchangeOrder]],
+        _mp: float,
+        _grid_line_manager: GridLineManager,
+    ) -> list[tuple[Optional[GridLine], Literal["buy", "sell"]]]:
+        """Orders to place for filled grid lines, sliding grids drop follow ups
+        outside of the window around _mp, they wait until window comes back"""
+        _follow_up_orders = []
+        for _grid_line, order_status in _filled:
+            # buy order filled place sell order on grid line above
+            if order_status.side == "buy":
+                _follow_up_orders.append((_grid_line.next_grid_line, "sell"))
+            # sell order filled place buy order on grid line below
+            else:
+                _follow_up_orders.append((_grid_line.last_grid_line, "buy"))
+        if _grid_line_manager.window:
+            _window_mask = _grid_line_manager.window_mask(_mp)
+            _follow_up_orders = [
+                (_grid_line, _side)
+                for _grid_line, _side in _follow_up_orders
+                if _grid_line is not None and _window_mask[_grid_line.index]
+            ]
+        return _follow_up_orders
+
+    async def manage_trades(
+        self,
+        _mp: float,
+        _grid_line_manager: GridLineManager,
+        _giom: ExchangeManager,
+        _reconcile: bool = True,
+    ):
+        """_reconcile: poll the exchange for fills first, False when the order
+        stream applies them as they happen"""
+        _sliding = bool(_grid_line_manager.window)
+        if _sliding:
+            _grid_line_manager.extend_to(_mp)
+        _filled = await self.reconcile_orders(_grid_line_manager, _giom) if _reconcile else []
+        _follow_up_orders = self.follow_up_orders(_filled, _mp, _grid_line_manager)
+
+        if _sliding:
+            # cancel orders the window moved away from before placing new ones
+            await self.retire_orders(_mp, _grid_line_manager, _giom)
+            _follow_up_lines = {_grid_line.index for _grid_line, _ in _follow_up_orders}
+            _follow_up_orders.extend(
+                (_grid_line, "sell")
+                for _grid_line in _grid_line_manager.grid_lines_to_resell(_mp)
+                if _grid_line.index not in _follow_up_lines
+            )
+
+        _grids_handled_this_cycle = [_grid_line for _grid_line, _ in _filled]
+        _grids_handled_this_cycle.extend(
+            _grid_line for _grid_line, _ in _follow_up_orders if _grid_line is not None
+        )
+        # for gridlines below mp with no active sell order nor buy order
+        # place buy order
+        _new_orders = [
+            (_grid_line, "buy")
+            for _grid_line in _grid_line_manager.free_grid_lines_below(
+                _mp, _grids_handled_this_cycle
+            )
+        ]
+
+        # follow ups and new grid orders go out as two concurrent batches
+        await asyncio.gather(
+            self.place_orders(
+                _follow_up_orders, _grid_line_manager, _giom, Priority.FILL_FOLLOW_UP
+            ),
+            self.place_orders(_new_orders, _grid_line_manager, _giom),
+        )
+
+    async def retire_orders(
+        self, _mp: float, _grid_line_manager: GridLineManager, _giom: ExchangeManager
+    ):
+        """Sliding grid: cancel orders on grid lines outside of the window in
+        one batch. Orders that fail to cancel (i.e filled meanwhile) keep their
+        state and are picked up by the next reconcile"""
+        _grid_lines = _grid_line_manager.grid_lines_outside_window(_mp)
+        if not _grid_lines:
+            return
+        _cancelled = await _giom.cancel_orders(_grid_lines, _grid_line_manager.ticker)
+        for _grid_line in _grid_lines:
+            if str(_grid_line.order_id) in _cancelled:
+                _grid_line.order_cancelled()
+
+    def on_order_update(self, _order: ExchangeOrder):
+        """Order stream callback, finished orders of tracked tickers are handled
+        in a task of their own"""
+        if _order.status == "open" or _order.currency_pair not in self.ticker_locks:
+            return
+        self.start_order_stream_task(self.handle_finished_order(_order))
+
+    def on_order_stream_connect(self):
+        """Events sent while the order stream was down are lost, reconcile every
+        ticker right after it (re)connects"""
+        for _grid_line_manager in self.grid_line_managers:
+            self.start_order_stream_task(self.safety_reconcile(_grid_line_manager, self.giom))
+
+    def start_order_stream_task(self, _coroutine):
+        _task = asyncio.get_running_loop().create_task(_coroutine)
+        self.order_stream_tasks.add(_task)
+        _task.add_done_callback(self.order_stream_tasks.discard)
+
+    async def handle_finished_order(self, _order: ExchangeOrder):
+        """Apply a streamed fill/cancel to the grid line holding the order and
+        place its follow up order at once instead of on the next price move"""
+        _grid_line_manager = self.grid_line_managers_by_ticker[_order.currency_pair]
+        async with self.ticker_locks[_grid_line_manager.ticker]:
+            _grid_line = _grid_line_manager.grid_line_by_order_id(_order.id)
+            # not a grid order, or already applied by a reconcile
+            if _grid_line is None or not self.apply_order_status(_grid_line, _order):
+                return
+            _mp = self.prices_objects[_grid_line_manager.ticker].market_price
+            if _mp is None:
+                _mp = _order.price
+            await self.place_orders(
+                self.follow_up_orders([(_grid_line, _order)], _mp, _grid_line_manager),
+                _grid_line_manager,
+                self.giom,
+                Priority.FILL_FOLLOW_UP,
+            )
+
+    async def safety_reconcile(self, _grid_line_manager: GridLineManager, _giom: ExchangeManager):
+        """One polling manage_trades cycle, picks up fills the order stream missed"""
+        _ticker = _grid_line_manager.ticker
+        if _ticker not in self.started_tickers:
+            return
+        async with self.ticker_locks[_ticker]:
+            with MANAGE_TRADES_SECONDS.time(self.exchange, _ticker):
+                await self.manage_trades(
+                    self.prices_objects[_ticker].market_price, _grid_line_manager, _giom
+                )
+
+    async def reconcile_loop(self, _grid_line_manager: GridLineManager, _giom: ExchangeManager):
+        """Safety reconcile of the ticker every reconcile_interval seconds while
+        the order stream runs"""
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            try:
+                await self.safety_reconcile(_grid_line_manager, _giom)
+            except Exception as e:
+                logger.exception(
+                    "Safety reconcile failed : ticker : %s %s", _grid_line_manager.ticker, e,
+                    extra={"fields": {"ticker": _grid_line_manager.ticker, "error": repr(e)}},
+                )
+
+    async def global_price_updater(self,_giom:ExchangeManager):
+        while True:
+            await asyncio.sleep(2)
+            try:
+                await self.update_prices(_giom)
+            except Exception as e:
+                logger.warning(
+                    "Price update failed Reconnecting in 3 ... %s", e,
+                    extra={"fields": {"exchange": self.exchange, "error": repr(e)}},
+                )
+                await asyncio.sleep(3)
+
+
+    @classmethod
+    async def update_prices(cls,_giom:ExchangeManager):
+        """Call the exchange's tickers endpoint to fetch all prices and then get prices of
+        tickers in tickers_list
+        @DEVOnly update last price"""
+
+        gate_prices = await _giom.fetch_prices(list(cls.prices_objects))
+        for k, v in cls.prices_objects.items():  # k == ticker, v == price
+            cls.prices_objects[k].set_market_price(float(gate_prices[k]))
+
+
+async def run_connectors(*connectors: ExchangeConnector):
+    """Run connectors of several exchanges on one event loop, each with its own
+    manager (connection pool, rate limits) and price cache. Pass _metrics_port
+    and _loop_monitor to one of them only, they are process wide"""
+    await asyncio.gather(*(connector.entry_point() for connector in connectors))
+
+
+def price_caches(_connector_class: type = ExchangeConnector) -> dict[str, dict[str, PriceUpdate]]:
+    """exchange -> prices_objects of every connector class defining its own"""
+    caches = {}
+    for connector_class in _connector_class.__subclasses__():
+        if "prices_objects" in vars(connector_class):
+            caches[connector_class.exchange] = connector_class.prices_objects
+        caches.update(price_caches(connector_class))
+    return caches
+
+
+def collect_price_staleness():
+    """Seconds since price feed last reported each ticker, set when metrics are scraped"""
+    now = time.monotonic()
+    for exchange, prices_objects in price_caches().items():
+        for ticker, price_object in prices_objects.items():
+            if price_object.updated_at:
+                PRICE_STALENESS_SECONDS.set(now - price_object.updated_at, exchange, ticker)
+
+
+REGISTRY.add_collector(collect_price_staleness)
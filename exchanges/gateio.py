@@ -1,458 +1,477 @@
 # Gate.io connector to Manage Orders
-import gate_api
-from gate_api import Order, OpenOrders
-from gate_api.exceptions import GateApiException, ApiException
-from typing import Optional
+from typing import Literal, Optional
+from urllib.parse import urlencode
 
 # STD imports
-from multiprocessing.pool import ApplyResult
-from dataclasses import dataclass
-import asyncio, aiohttp
+import asyncio, aiohttp, hashlib, hmac, json, logging, time
 
 # Internal Imports
-from . import GATEIO_KEY, GATEIO_SECRET
-from . import OrderToBePlaced, PlacedOrders
-from grid_line_machine import GridLine, GridLineManager
-
-
-@dataclass
-class PriceUpdate:
-    ticker: str
-    market_price: Optional[float] = None
-
-
-class GateIO:
-    def __init__(self):
-        configuration = gate_api.Configuration(
-            host="https://api.gateio.ws/api/v4",
-            key=GATEIO_KEY,
-            secret=GATEIO_SECRET,
-        )
-        self.api_client = gate_api.ApiClient(configuration)
-        self.api_instance = gate_api.SpotApi(self.api_client)
-
-    async def prices(self) -> dict[str, str]:
-        host = "https://api.gateio.ws"
-        prefix = "/api/v4"
-        headers = {"Accept": "application/json", "Content-Type": "application/json"}
+from . import GATEIO_KEY, GATEIO_SECRET, GATEIO_HOST
+from . import OrderToBePlaced, PlacedOrders, PriceUpdate, ExchangeOrder, OpenOrders
+from .connector import ExchangeApiException, ExchangeClient, ExchangeConnector, ExchangeManager
+from .connector import collect_price_staleness, run_connectors, tick_logger
+from .gateio_ws import GateIOOrderStream, GateIOPriceStream, GATEIO_WS_URL
+from .rate_limiter import Priority, RequestScheduler
+from metrics import API_CALL_SECONDS, API_ERRORS
+
+logger = logging.getLogger("dca.gateio")
+
+# Above this many pairs one spot/tickers call for all pairs is cheaper then a call per pair
+PER_PAIR_TICKERS_LIMIT = 10
+# spot/batch_orders limits
+MAX_BATCH_ORDERS_PER_PAIR = 10
+MAX_BATCH_PAIRS = 3
+MAX_CONCURRENT_BATCHES = 5
+# spot/cancel_batch_orders limit
+MAX_CANCEL_BATCH_ORDERS = 20
+
+
+def chunk_batch_orders(orders: list[OrderToBePlaced]) -> list[list[int]]:
+    """Split orders into batches Gate.io accepts, at most MAX_BATCH_ORDERS_PER_PAIR
+    orders of a pair and MAX_BATCH_PAIRS pairs per batch. Batches hold indexes
+    into orders so results can be put back in input order"""
+    indexes_by_pair: dict[str, list[int]] = {}
+    for index, order in enumerate(orders):
+        indexes_by_pair.setdefault(order.currency_pair, []).append(index)
+
+    chunks: list[list[int]] = []
+    chunk_pairs: list[set[str]] = []
+    for pair, indexes in indexes_by_pair.items():
+        for start in range(0, len(indexes), MAX_BATCH_ORDERS_PER_PAIR):
+            # first batch which has room for another pair and doesn't have this one
+            for chunk, pairs in zip(chunks, chunk_pairs):
+                if len(pairs) < MAX_BATCH_PAIRS and pair not in pairs:
+                    break
+            else:
+                chunk, pairs = [], set()
+                chunks.append(chunk)
+                chunk_pairs.append(pairs)
+            chunk.extend(indexes[start : start + MAX_BATCH_ORDERS_PER_PAIR])
+            pairs.add(pair)
+    return chunks
+
+
+class GateApiException(ExchangeApiException):
+    """Error response returned by Gate.io api"""
+
+
+def to_exchange_order(_data: dict) -> ExchangeOrder:
+    """Convert Gate.io order json to ExchangeOrder"""
+    return ExchangeOrder(
+        id=_data["id"],
+        currency_pair=_data["currency_pair"],
+        price=float(_data["price"]),
+        amount=float(_data["amount"]),
+        side=_data["side"],
+        status=_data.get("status", ""),
+        finish_as=_data.get("finish_as", ""),
+        left=float(_data.get("left") or 0),
+        create_time=int(_data.get("create_time") or 0),
+    )
+
+
+def to_placed_order(_data: dict) -> PlacedOrders:
+    """Convert an entry of Gate.io batch_orders response to PlacedOrders, failed
+    entries only carry label and message"""
+    return PlacedOrders(
+        price=float(_data.get("price") or 0),
+        tokens=float(_data.get("amount") or 0),
+        order_id=_data.get("id") or 0,
+        create_time=int(_data.get("create_time") or 0),
+        currency_pair=_data.get("currency_pair", ""),
+        side=_data.get("side", "buy"),
+        success=bool(_data.get("succeeded")),
+        label=_data.get("label") or None,
+    )
+
+
+class GateIO(ExchangeClient):
+    """Non blocking client for the Gate.io spot endpoints the bot uses, every call
+    goes through one pooled aiohttp session, private endpoints are HMAC signed"""
+
+    prefix = "/api/v4"
+    headers = {"Accept": "application/json", "Content-Type": "application/json"}
+
+    def __init__(
+        self,
+        _key: Optional[str] = GATEIO_KEY,
+        _secret: Optional[str] = GATEIO_SECRET,
+        _connection_limit: int = 20,
+        _keepalive_timeout: float = 30,
+        _scheduler: Optional[RequestScheduler] = None,
+        _host: str = GATEIO_HOST,
+    ):
+        """_connection_limit: max simultaneous connections in the pool
+        _keepalive_timeout: seconds an idle connection is kept open for reuse
+        _scheduler: rate limiter every request waits on, pass one to share it"""
+        self.scheduler = _scheduler or RequestScheduler()
+        self.host = _host
+        self.key = _key or ""
+        self.secret = _secret or ""
+        self.connection_limit = _connection_limit
+        self.keepalive_timeout = _keepalive_timeout
+        # Created on first use bcz aiohttp sessions must be created inside running loop
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Long lived pooled session shared by every call of this instance"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.connection_limit,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                base_url=self.host, headers=self.headers, connector=connector
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    def sign(self, _method: str, _url: str, _query_string: str, _body: str) -> dict[str, str]:
+        """Gate.io APIv4 signature headers
+        SIGN = HexEncode(HMAC_SHA512(secret, method\nurl\nquery\nSHA512(body)\ntimestamp))"""
+        timestamp = str(int(time.time()))
+        hashed_body = hashlib.sha512(_body.encode()).hexdigest()
+        payload = "\n".join([_method, _url, _query_string, hashed_body, timestamp])
+        signature = hmac.new(self.secret.encode(), payload.encode(), hashlib.sha512)
+        return {"KEY": self.key, "Timestamp": timestamp, "SIGN": signature.hexdigest()}
+
+    async def request(
+        self,
+        _method: Literal["GET", "POST", "DELETE"],
+        _path: str,
+        _params: Optional[dict] = None,
+        _body: Optional[list | dict] = None,
+        _signed: bool = False,
+        _endpoint_class: Optional[str] = None,
+        _priority: Priority = Priority.PRICE_POLL,
+    ):
+        """Send request to self.prefix + _path and return decoded json,
+        raises GateApiException for error responses
+
+        _endpoint_class: rate limit bucket, defaults to "private" for signed
+        and "public" for unsigned requests
+        _priority: lane the request waits in when rate limit is reached"""
+        _endpoint_class = _endpoint_class or ("private" if _signed else "public")
+        await self.scheduler.acquire(_endpoint_class, _priority)
+
+        url = self.prefix + _path
+        query_string = urlencode(_params) if _params else ""
+        body = json.dumps(_body, separators=(",", ":")) if _body is not None else ""
+        headers = self.sign(_method, url, query_string, body) if _signed else None
+
+        async with self.session.request(
+            _method,
+            f"{url}?{query_string}" if query_string else url,
+            data=body or None,
+            headers=headers,
+        ) as r:
+            if r.status < 400:
+                return await r.json(content_type=None)
+            if r.status == 429:
+                self.scheduler.throttled(_endpoint_class)
+            # error bodies from proxies / gateways are often html or plain text
+            text = await r.text()
+            try:
+                data = json.loads(text)
+            except ValueError:
+                data = None
+            data = data if isinstance(data, dict) else {"message": text}
+            API_ERRORS.inc("gateio", data.get("label") or str(r.status))
+            raise GateApiException(
+                r.status, data.get("label", ""), data.get("message", "")
+            )
 
-        url = "/spot/tickers"
-        async with aiohttp.ClientSession() as session:
-            async with session.get(host + prefix + url, headers=headers) as r:
-                x = await r.json()
-                return {data["currency_pair"]: data["highest_bid"] for data in x}
+    async def prices(
+        self,
+        _currency_pairs: Optional[list[str]] = None,
+        _priority: Priority = Priority.PRICE_POLL,
+    ) -> dict[str, str]:
+        """Returns {currency_pair: highest_bid}
+
+        `@param _currency_pairs:` only fetch these pairs, one request per pair sent
+        concurrently, for more then PER_PAIR_TICKERS_LIMIT pairs all tickers are
+        fetched once and filtered. None fetches every pair on the exchange"""
+        with API_CALL_SECONDS.time("gateio", "prices"):
+            if _currency_pairs is not None and len(_currency_pairs) <= PER_PAIR_TICKERS_LIMIT:
+                tickers = await asyncio.gather(
+                    *(
+                        self.request(
+                            "GET", "/spot/tickers", {"currency_pair": pair}, _priority=_priority
+                        )
+                        for pair in _currency_pairs
+                    )
+                )
+                return {
+                    data["currency_pair"]: data["highest_bid"]
+                    for ticker in tickers
+                    for data in ticker
+                }
+
+            tickers = await self.request("GET", "/spot/tickers", _priority=_priority)
+            if _currency_pairs is None:
+                return {data["currency_pair"]: data["highest_bid"] for data in tickers}
+            _wanted = set(_currency_pairs)
+            return {
+                data["currency_pair"]: data["highest_bid"]
+                for data in tickers
+                if data["currency_pair"] in _wanted
+            }
 
     async def place_batch_orders(
-        self, orders: list[OrderToBePlaced] | OrderToBePlaced
+        self,
+        orders: list[OrderToBePlaced] | OrderToBePlaced,
+        _priority: Priority = Priority.NEW_GRID_ORDER,
     ) -> list[PlacedOrders]:
         """Place Batch of Orders For tickers Max 10 Orders/Ticker and Max 3 Tickers
+        per request, longer lists are split into compliant batches which are sent
+        concurrently (at most MAX_CONCURRENT_BATCHES at a time)
 
         `@param orders:` a list of OrderToBePlaced objects (required param for order price & amount,currency_pair
         order = [OrderToBePlaced("VANRY_USDT",0.02,600,'buy')]
+
+        Returns one PlacedOrders per order in the same order as orders
         """
-        _ticker = ""
-        if not isinstance(orders, list):
-            orders = [orders]
+        with API_CALL_SECONDS.time("gateio", "place_batch_orders"):
+            if not isinstance(orders, list):
+                orders = [orders]
+
+            chunks = chunk_batch_orders(orders)
+            _semaphore = asyncio.Semaphore(MAX_CONCURRENT_BATCHES)
+
+            async def place_chunk(_chunk: list[int]) -> list[PlacedOrders]:
+                async with _semaphore:
+                    return await self._place_batch(
+                        [orders[index] for index in _chunk], _priority
+                    )
+
+            results = await asyncio.gather(*(place_chunk(chunk) for chunk in chunks))
 
-        _ticker = orders[0].currency_pair
+            orders_list: list[Optional[PlacedOrders]] = [None] * len(orders)
+            for chunk, placed_orders in zip(chunks, results):
+                for index, placed_order in zip(chunk, placed_orders):
+                    orders_list[index] = placed_order
+            return orders_list
+
+    async def _place_batch(
+        self, orders: list[OrderToBePlaced], _priority: Priority
+    ) -> list[PlacedOrders]:
+        """Single batch_orders request, orders must already respect batch limits"""
         list_of_gateio_order_type = []
         for order in orders:
             list_of_gateio_order_type.append(
-                Order(
-                    currency_pair=order.currency_pair,
-                    amount=f"{order.amount}",
-                    price=f"{order.price}",
-                    side=order.side,
-                    text="t-apiv4",
-                )
+                {
+                    "currency_pair": order.currency_pair,
+                    "amount": f"{order.amount}",
+                    "price": f"{order.price}",
+                    "side": order.side,
+                    "text": "t-apiv4",
+                }
             )
 
         try:
             # Create a batch of orders
-            api_response: ApplyResult = self.api_instance.create_batch_orders(
-                list_of_gateio_order_type, async_req=True
+            response = await self.request(
+                "POST",
+                "/spot/batch_orders",
+                _body=list_of_gateio_order_type,
+                _signed=True,
+                _endpoint_class="order",
+                _priority=_priority,
             )
-            await asyncio.sleep(0.1)
-            response = api_response.get()
-            orders_list = []
-            for order_placed in response:
-                response = PlacedOrders(
-                    price=order_placed.price,
-                    tokens=order_placed.amount,
-                    create_time=order_placed.create_time,
-                    currency_pair=order_placed.currency_pair,
-                    order_id=order_placed.id,
-                    side=order_placed.side,
-                    success=order_placed.succeeded,
-                    label=order_placed.label,
-                )
-                orders_list.append(response)
-            return orders_list
+            return [to_placed_order(order_placed) for order_placed in response]
         except GateApiException as ex:
-            print(
-                "Gate api exception, label: %s, message: %s\n" % (ex.label, ex.message)
+            logger.warning(
+                "Batch orders rejected, label: %s, message: %s", ex.label, ex.message,
+                extra={"fields": {"orders": len(orders), "label": ex.label}},
             )
-            return [PlacedOrders(0, 0, 0, 0, _ticker, "buy", False, "GateApiException")]
-        except ApiException as e:
-            print("Exception when calling SpotApi->list_all_open_orders: %s\n" % e)
-            return [PlacedOrders(0, 0, 0, 0, _ticker, "buy", False, "ApiException")]
-
-    async def get_all_open_orders(self) -> OpenOrders:
-        """Returns All Open Order, Placed Limit Orders"""
-
-        # @DEV Page and Limit are hardcoded bcz no way i will place more then 100 trades at a time
-        page = 1
-        limit = 100
-        try:
-            api_response: ApplyResult = self.api_instance.list_all_open_orders(
-                page=page, limit=limit, async_req=True
+            _label = "GateApiException"
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(
+                "Batch orders request failed : %s", e,
+                extra={"fields": {"orders": len(orders), "error": repr(e)}},
             )
-            #     await asyncio.sleep(1)
-            return api_response.get()
-
-        except GateApiException as ex:
-            print(
-                "Gate api exception, label: %s, message: %s\n" % (ex.label, ex.message)
-            )
-        except ApiException as e:
-            print("Exception when calling SpotApi->list_all_open_orders: %s\n" % e)
-
-    async def get_price(self):
-        # @DEEV check what exactly this returns and take argument of ticker
-        return self.api_instance.list_tickers(currency_pair="VANRY_USDT")
-
-    async def check_filled_order_status(self, _order_id: int, _ticker: str):
-        api_response = self.api_instance.get_order(_order_id, _ticker, async_req=True)
-        await asyncio.sleep(0.1)
-        return api_response.get()
-
-
-class GateIOManager:
-    """A Stand Alone Instance representing each grid line for  each ticker
-    buy, sell, buy batch, get price for ticker"""
-
-    def __init__(self):
-        self.gateio_instance = GateIO()
-
-    async def buy(
-        self, _order: GridLine, _currency_pair: str, _usd_amount_to_spend: float
-    ) -> PlacedOrders:
-        """Convert from GridLine to OrderToBePlaced type"""
-        new_order = OrderToBePlaced(
-            currency_pair=_currency_pair,
-            price=_order.price,
-            amount=_usd_amount_to_spend / _order.price,
-            side="buy",
-        )
-
-        order_status = await self.gateio_instance.place_batch_orders(new_order)
-
-        return order_status[0]
-
-    async def sell(
-        self, _order: GridLine, _currency_pair: str, _usd_amount_to_spend: float
-    ) -> PlacedOrders:
-        """Convert from GridLine to OrderToBePlaced type"""
-        new_order = OrderToBePlaced(
-            currency_pair=_currency_pair,
-            price=_order.price,
-            amount=_usd_amount_to_spend / _order.price,
-            side="sell",
+            _label = "ApiException"
+        # whole batch failed, report failure for each order in it
+        return [
+            PlacedOrders(0, 0, 0, 0, order.currency_pair, order.side, False, _label)
+            for order in orders
+        ]
+
+    async def cancel_batch_orders(
+        self,
+        orders: list[tuple[str, str]],
+        _priority: Priority = Priority.NEW_GRID_ORDER,
+    ) -> set[str]:
+        """Cancel [(currency_pair, order_id)], MAX_CANCEL_BATCH_ORDERS per request
+        sent concurrently. Returns ids of the orders that got cancelled, orders
+        that failed (already filled, not found ...) are left out"""
+        with API_CALL_SECONDS.time("gateio", "cancel_batch_orders"):
+            chunks = [
+                orders[start : start + MAX_CANCEL_BATCH_ORDERS]
+                for start in range(0, len(orders), MAX_CANCEL_BATCH_ORDERS)
+            ]
+            _semaphore = asyncio.Semaphore(MAX_CONCURRENT_BATCHES)
+
+            async def cancel_chunk(_chunk: list[tuple[str, str]]) -> list[dict]:
+                async with _semaphore:
+                    try:
+                        return await self.request(
+                            "POST",
+                            "/spot/cancel_batch_orders",
+                            _body=[
+                                {"currency_pair": pair, "id": str(order_id)}
+                                for pair, order_id in _chunk
+                            ],
+                            _signed=True,
+                            _endpoint_class="cancel",
+                            _priority=_priority,
+                        )
+                    except GateApiException as ex:
+                        logger.warning(
+                            "Cancel batch rejected, label: %s, message: %s", ex.label, ex.message,
+                            extra={"fields": {"orders": len(_chunk), "label": ex.label}},
+                        )
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        logger.warning(
+                            "Cancel batch request failed : %s", e,
+                            extra={"fields": {"orders": len(_chunk), "error": repr(e)}},
+                        )
+                    return []
+
+            results = await asyncio.gather(*(cancel_chunk(chunk) for chunk in chunks))
+            return {
+                str(cancelled["id"])
+                for result in results
+                for cancelled in result
+                if cancelled.get("succeeded")
+            }
+
+    async def get_all_open_orders(
+        self, _limit: int = 100, _priority: Priority = Priority.RECONCILIATION
+    ) -> list[OpenOrders]:
+        """Returns All Open Order, Placed Limit Orders of every pair
+
+        spot/open_orders pages each pair separately (_limit orders per pair per page)
+        so page 1 tells how many pages the pair with most open orders needs, the
+        rest of the pages are then fetched concurrently and merged per pair"""
+        with API_CALL_SECONDS.time("gateio", "get_all_open_orders"):
+            try:
+                first_page = await self._open_orders_page(1, _limit, _priority)
+                pages = max((-(-orders.total // _limit) for orders in first_page), default=1)
+                other_pages = await asyncio.gather(
+                    *(
+                        self._open_orders_page(page, _limit, _priority)
+                        for page in range(2, pages + 1)
+                    )
+                )
+            except GateApiException as ex:
+                logger.warning(
+                    "Open orders rejected, label: %s, message: %s", ex.label, ex.message,
+                    extra={"fields": {"label": ex.label}},
+                )
+                return []
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning(
+                    "Open orders request failed : %s", e, extra={"fields": {"error": repr(e)}}
+                )
+                return []
+
+            open_orders_by_pair = {orders.currency_pair: orders for orders in first_page}
+            for page in other_pages:
+                for orders in page:
+                    if orders.currency_pair in open_orders_by_pair:
+                        open_orders_by_pair[orders.currency_pair].orders.extend(orders.orders)
+                    else:
+                        open_orders_by_pair[orders.currency_pair] = orders
+            return list(open_orders_by_pair.values())
+
+    async def _open_orders_page(
+        self, _page: int, _limit: int, _priority: Priority
+    ) -> list[OpenOrders]:
+        response = await self.request(
+            "GET",
+            "/spot/open_orders",
+            {"page": _page, "limit": _limit},
+            _signed=True,
+            _priority=_priority,
         )
-        order_status = await self.gateio_instance.place_batch_orders(new_order)
-        return order_status[0]
+        return [
+            OpenOrders(
+                currency_pair=orders["currency_pair"],
+                total=int(orders.get("total") or 0),
+                orders=[to_exchange_order(order) for order in orders["orders"]],
+            )
+            for orders in response
+        ]
 
-    async def batch_buy(
+    async def list_orders(
         self,
-        _grid_lines: list[GridLine],
-        _currency_pair: str,
-        _usd_amount_to_spend: float,
-    ):
-        _orders_list = []
-        for _each_grid in _grid_lines:
-            _orders_list.append(
-                OrderToBePlaced(
-                    currency_pair=_currency_pair,
-                    price=_each_grid.price,
-                    amount=_usd_amount_to_spend / _each_grid.price,
-                    side="buy",
-                )
+        _ticker: str,
+        _status: Literal["open", "finished"],
+        _page: int = 1,
+        _limit: int = 100,
+        _priority: Priority = Priority.RECONCILIATION,
+    ) -> list[ExchangeOrder]:
+        """Orders of a single pair, finished orders are newest first"""
+        with API_CALL_SECONDS.time("gateio", "list_orders"):
+            response = await self.request(
+                "GET",
+                "/spot/orders",
+                {"currency_pair": _ticker, "status": _status, "page": _page, "limit": _limit},
+                _signed=True,
+                _priority=_priority,
             )
+            return [to_exchange_order(order) for order in response]
 
-        if len(_orders_list) < 1:
-            print(f"No grid lines avaialble for {_currency_pair}")
-            return
-        _orders_status = await self.gateio_instance.place_batch_orders(_orders_list)
-        return _orders_status
+    async def check_filled_order_status(
+        self,
+        _order_id: int,
+        _ticker: str,
+        _priority: Priority = Priority.RECONCILIATION,
+    ) -> ExchangeOrder:
+        with API_CALL_SECONDS.time("gateio", "check_filled_order_status"):
+            response = await self.request(
+                "GET",
+                f"/spot/orders/{_order_id}",
+                {"currency_pair": _ticker},
+                _signed=True,
+                _priority=_priority,
+            )
+            return to_exchange_order(response)
 
-    async def get_order_status(self, _order_id: int, _ticker: str):
-        orders_statuses = await self.gateio_instance.check_filled_order_status(
-            _order_id, _ticker
-        )
-        return orders_statuses
 
-    async def get_all_open_orders(self) -> OpenOrders:
-        return await self.gateio_instance.get_all_open_orders()
+class GateIOManager(ExchangeManager):
+    """ExchangeManager over a GateIO client"""
 
-    async def fetch_prices(self):
-        return await self.gateio_instance.prices()
+    def __init__(
+        self, _scheduler: Optional[RequestScheduler] = None, _host: str = GATEIO_HOST
+    ):
+        super().__init__(GateIO(_scheduler=_scheduler or RequestScheduler(), _host=_host))
+        self.gateio_instance = self.client
 
 
-class GateIOConnector:
-    """Takes in multiple lists of GridLIne objects then runs in loop to keep track
-    of prices for each ticker and place orders using GateIOManager class"""
+class GateIOConnector(ExchangeConnector):
+    """ExchangeConnector trading on Gate.io, see exchanges/connector.py"""
 
+    exchange = "gateio"
+    default_host = GATEIO_HOST
+    default_ws_url = GATEIO_WS_URL
     prices_objects: dict[str, PriceUpdate] = {}
 
-    def __init__(self, *grid_lines_objects: GridLineManager):
-        self.grid_line_managers = grid_lines_objects
-
-        # create prices_objects from grid_lines_objects.tickers
-        for grid_line_manager in self.grid_line_managers:
-            _ticker = grid_line_manager.ticker
-            GateIOConnector.prices_objects[_ticker] = PriceUpdate(_ticker)
-
-    async def check_order_status(
-        self, _grid_line: GridLine, _ticker: str, _giom: GateIOManager
-    ) -> bool:
-        order_status = await _giom.get_order_status(_grid_line.order_id, _ticker)
-        # @DEV If order was cancled by user(or due to some unforseen reason) handle .finish_as "closed/cancled"?
-        if order_status.finish_as == "filled":
-            if order_status.side == "buy":
-                _grid_line.buy_order_triggerd(order_status.amount)
-                return True
-            else:
-                _grid_line.sell_order_triggerd(order_status.amount)
-                return True
-        else:
-            return False
+    def make_manager(self) -> GateIOManager:
+        return GateIOManager(_scheduler=self.scheduler, _host=self.host)
 
-    async def buy(
-        self,
-        _grid_line: GridLine,
-        _grid_line_manager: GridLineManager,
-        _giom: GateIOManager,
-    ):
-        # @DEV check if _grid_line exeeds do_not_buy price
-        if (
-            _grid_line.price > _grid_line_manager.do_not_buy_above_price
-            or _grid_line.price < _grid_line_manager.do_not_buy_below_price
-        ):
-            # print("Restricted buy region")
-            return
-        gateio_manager = _giom
-        status = await gateio_manager.buy(
-            _order=_grid_line,
-            _currency_pair=_grid_line_manager.ticker,
-            _usd_amount_to_spend=_grid_line_manager.usd_to_buy_with,
-        )
-
-        if status.success:
-            _grid_line.buy_order_success(status.order_id)
-
-        elif status.label:
-            print(f"Failed to place Buy Order for ticker {_grid_line_manager.ticker}")
-        else:
-            print("Line 207 code should never reach here")
+    def price_stream(self) -> GateIOPriceStream:
+        return GateIOPriceStream(self.prices_objects, self.ws_url)
 
-    async def sell(
-        self,
-        _grid_line: GridLine,
-        _grid_line_manager: GridLineManager,
-        _giom: GateIOManager,
-    ):
-        # @DEV check if _grid_line exeeds do_not_buy price
-        if _grid_line is None:
-            return
-        if (
-            _grid_line.price > _grid_line_manager.do_not_buy_above_price
-            or _grid_line.price < _grid_line_manager.do_not_buy_below_price
-        ):
-            # print("Restricted buy region")
-            return
-        gateio_manager = _giom
-        status = await gateio_manager.sell(
-            _order=_grid_line,
-            _currency_pair=_grid_line_manager.ticker,
-            _usd_amount_to_spend=_grid_line_manager.usd_to_buy_with,
-        )
-
-        if status.success:
-            _grid_line.sell_order_success(status.order_id)
-
-        elif status.label:
-            print(
-                f"Failed to place an Sell Order for ticker {_grid_line_manager.ticker}"
-            )
-        else:
-            print("Line 207 code should never reach here")
-
-    async def remove_duplicate_orders(
-        self, _grid_line_manager: GridLineManager, _giom: GateIOManager
-    ) -> list[GridLine]:
-        _grids = []
-        orders_list: OpenOrders = await _giom.get_all_open_orders()
-
-        for orders in orders_list:
-            if orders.currency_pair == _grid_line_manager.ticker:
-                for order in orders.orders:
-                    for grid in _grid_line_manager:
-                        if round(float(order.price), 5) == round(float(grid.price), 5):
-                            if order.side == "buy":
-                                grid.buy_order_placed = True
-                                grid.order_id = order.id
-                                _grids.append(grid)
-
-                            elif order.side == "sell":
-                                # Last grid where buy was placed
-                                grid.last_grid_line.buy_order_filled = True
-                                grid.last_grid_line.total_buy_orders += 1
-                                # Current grid where sell order is placed
-                                grid.sell_order_placed = True
-                                grid.order_id = order.id
-                                _grids.append(grid)
-                                _grids.append(grid.last_grid_line)
-
-        return _grids
-
-    async def buy_batch_order(
-        self, _mp: float, _grid_line_manager: GridLineManager, _giom: GateIOManager
-    ):
-        orders_already_placed = await self.remove_duplicate_orders(
-            _grid_line_manager, _giom
-        )
-        _grids_where_order_are_to_be_placed = []
-        for _each_grid in _grid_line_manager:
-            if (
-                _mp > _each_grid.price
-                and _grid_line_manager.do_not_buy_below_price
-                < _each_grid.price
-                < _grid_line_manager.do_not_buy_above_price
-            ) and _each_grid not in orders_already_placed:
-                _grids_where_order_are_to_be_placed.append(_each_grid)
-
-        _statuses = await _giom.batch_buy(
-            _grid_lines=_grids_where_order_are_to_be_placed,
-            _currency_pair=_grid_line_manager.ticker,
-            _usd_amount_to_spend=_grid_line_manager.usd_to_buy_with,
+    def order_stream(self, _giom, _on_order, _on_connect) -> GateIOOrderStream:
+        return GateIOOrderStream(
+            [grid_line_manager.ticker for grid_line_manager in self.grid_line_managers],
+            _on_order,
+            self.ws_url,
+            _on_connect=_on_connect,
         )
-        if _statuses is None:
-            return
-        for status in _statuses:
-            if status.label is None and status.success:
-                grid = _grid_line_manager.grid_line_obj_map_price(status.price)
-                grid.buy_order_success(status.order_id)
-
-            else:
-                print(
-                    f"Placing Batch order failed {status.label=} : ticker : {_grid_line_manager.ticker}"
-                )
-                # @Dev for testing
-
-    async def entry_point(self):
-        """Start Loop to track prices for each class
-        Seperate Each ticker tracking create a worker using asyncio.get_loop"""
-        _tasks = []
-        _giom = GateIOManager()
-        # Task 1 global_price_updater
-        # * each GridLineManager watcher i.e : ticker_watcher
-        loop = asyncio.get_event_loop()
-        _tasks.append(
-            loop.create_task(self.global_price_updater(_giom))
-        )  # each task is grid for unique ticker
-        for _grid_line_manager in self.grid_line_managers:
-            _tasks.append(self.ticker_watcher(_grid_line_manager,_giom))
-        await asyncio.gather(*_tasks)
-
-    async def ticker_watcher(self, _grid_line_manager: GridLineManager, _giom:GateIOManager):
-        """Called with GridLineManager as param and places order on Gateio"""
-        # gateio manager
-        giom = _giom
-        _ticker = _grid_line_manager.ticker
-        print(_ticker, _grid_line_manager.grid_lines)
-        _decimals = _grid_line_manager.round_price_to
-
-        last_price = GateIOConnector.prices_objects[_ticker].market_price or 0
-
-        while last_price == 0:
-            await asyncio.sleep(0.1)
-            last_price = GateIOConnector.prices_objects[_ticker].market_price or 0
-
-        await self.buy_batch_order(last_price, _grid_line_manager, giom)
-        last_lower_grid, last_higher_grid = last_price, last_price
-        while True:
-            market_price: float = GateIOConnector.prices_objects[_ticker].market_price
-            lower_grid, higher_grid = _grid_line_manager.get_region(market_price)
-
-            # DEV check if price is within 1% of any grid
-            price_in_lower_grid_range = False
-            price_in_higher_grid_range = False
-            if round(market_price - (0.005 * market_price), _decimals) < lower_grid:
-                price_in_lower_grid_range = True
-
-            if round(market_price + (0.005 * market_price), _decimals) > higher_grid:
-                price_in_higher_grid_range = True
-
-            # if market_price != last_price:
-            print(f"{_ticker}  mp: {round(market_price,_decimals)}\t\t REGION : {lower_grid} : {higher_grid}")
-            if (
-                (last_lower_grid != lower_grid and last_higher_grid != higher_grid)
-                or price_in_lower_grid_range
-                or price_in_higher_grid_range
-            ):
-                await self.manage_trades(market_price, _grid_line_manager, giom)
-
-                # last_price = market_price
-            await asyncio.sleep(1.5)
-            last_lower_grid, last_higher_grid = lower_grid, higher_grid
-
-    async def manage_trades(
-        self, _mp: float, _grid_line_manager: GridLineManager, _giom: GateIOManager
-    ):
-        for _grid_line in _grid_line_manager:
-            # Handle if limit order is still there
-            # for lines below mp
-            if _grid_line.buy_order_placed:
-                # check if buy order placed got filled
-                if await self.check_order_status(
-                    _grid_line, _grid_line_manager.ticker, _giom
-                ):
-                    await self.sell(
-                        _grid_line.next_grid_line, _grid_line_manager, _giom
-                    )
-
-            # for gridlines below mp with active sell order
-            # check if sell order was triggerd to place buy order
-            elif _grid_line.sell_order_placed:
-                if await self.check_order_status(
-                    _grid_line, _grid_line_manager.ticker, _giom
-                ):
-                    await self.buy(_grid_line.last_grid_line, _grid_line_manager, _giom)
-
-            # for gridlines below mp with no active sell order nor buy order
-            # place buy order
-            elif _grid_line.price < _mp and not (
-                _grid_line.buy_order_filled or _grid_line.buy_order_placed
-            ):
-                await self.buy(_grid_line, _grid_line_manager, _giom)
-
-    async def global_price_updater(self,_giom:GateIOManager):
-        while True:
-            await asyncio.sleep(2)
-            try:
-                await GateIOConnector.update_prices(_giom)
-            except Exception as e:
-                print(f"Connection error Reconnecting in 3 ... {e}")
-                await asyncio.sleep(3)
-
-
-    @classmethod
-    async def update_prices(cls,_giom:GateIOManager):
-        """Call spot/ticker endpoint to fetch all prices and then get prices of
-        tickers in tickers_list
-        @DEVOnly update last price"""
-
-        # gate_prices = await _gate_io.prices()
-        gate_prices =  await _giom.fetch_prices()
-        for k, v in cls.prices_objects.items():  # k == ticker, v == price
-            cls.prices_objects[k].market_price = float(gate_prices[k])
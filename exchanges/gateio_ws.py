@@ -0,0 +1,140 @@
+# Gate.io websocket streams
+from typing import Callable, Optional
+
+# STD imports
+import hashlib, hmac, logging, time
+
+# Internal Imports
+from . import ExchangeOrder, PriceUpdate, GATEIO_KEY, GATEIO_SECRET, GATEIO_WS_URL
+from .websocket import WebsocketStream
+
+logger = logging.getLogger("dca.gateio")
+
+
+class GateIOPriceStream(WebsocketStream):
+    """Subscribes to the spot.tickers channel for every ticker in prices_objects and
+    writes highest_bid into the matching PriceUpdate as soon as an update arrives.
+    Reconnects (with backoff) and resubscribes whenever the connection drops"""
+
+    channel = "spot.tickers"
+
+    def __init__(
+        self,
+        _prices_objects: dict[str, PriceUpdate],
+        _url: str = GATEIO_WS_URL,
+        _reconnect_delay: float = 1,
+        _max_reconnect_delay: float = 30,
+        _heartbeat: float = 10,
+    ):
+        """_prices_objects: ticker -> PriceUpdate, same dict GateIOConnector polls into
+        _url: websocket endpoint, point it to a local server for testing
+        _heartbeat: seconds between websocket pings, dead connections are dropped
+        after missing a pong"""
+        super().__init__(_url, _reconnect_delay, _max_reconnect_delay, _heartbeat)
+        self.prices_objects = _prices_objects
+
+    def subscribe_message(self) -> dict:
+        return {
+            "time": int(time.time()),
+            "channel": self.channel,
+            "event": "subscribe",
+            "payload": list(self.prices_objects),
+        }
+
+    def handle_message(self, _message: dict) -> Optional[PriceUpdate]:
+        """Update PriceUpdate for ticker in message, returns updated PriceUpdate
+        or None if message was not a price update for a tracked ticker"""
+        if _message.get("channel") != self.channel:
+            return None
+        if _message.get("error"):
+            logger.warning(
+                "Gate.io websocket error %s", _message["error"],
+                extra={"fields": {"error": _message["error"]}},
+            )
+            return None
+        if _message.get("event") != "update":
+            return None
+
+        result = _message.get("result") or {}
+        price_object = self.prices_objects.get(result.get("currency_pair"))
+        if price_object is None or not result.get("highest_bid"):
+            return None
+        price_object.set_market_price(float(result["highest_bid"]))
+        return price_object
+
+
+def to_order_update(_data: dict) -> ExchangeOrder:
+    """Convert an order of a spot.orders update to ExchangeOrder, the channel
+    has no status field, it is derived from event (put/update/finish)"""
+    finish_as = _data.get("finish_as") or "open"
+    if _data.get("event") != "finish":
+        status, finish_as = "open", "open"
+    else:
+        status = "closed" if finish_as == "filled" else "cancelled"
+    return ExchangeOrder(
+        id=str(_data["id"]),
+        currency_pair=_data["currency_pair"],
+        price=float(_data["price"]),
+        amount=float(_data["amount"]),
+        side=_data["side"],
+        status=status,
+        finish_as=finish_as,
+        left=float(_data.get("left") or 0),
+        create_time=int(float(_data.get("create_time") or 0)),
+    )
+
+
+class GateIOOrderStream(WebsocketStream):
+    """Authenticated spot.orders channel of the account, every order event of
+    the subscribed tickers (placed, partly filled, finished) is passed to
+    _on_order as an ExchangeOrder"""
+
+    channel = "spot.orders"
+
+    def __init__(
+        self,
+        _tickers: list[str],
+        _on_order: Callable[[ExchangeOrder], None],
+        _url: str = GATEIO_WS_URL,
+        _key: Optional[str] = GATEIO_KEY,
+        _secret: Optional[str] = GATEIO_SECRET,
+        **kwargs,
+    ):
+        """_tickers: currency pairs to receive order events of
+        kwargs: WebsocketStream arguments i.e _on_connect"""
+        super().__init__(_url, **kwargs)
+        self.tickers = list(_tickers)
+        self.on_order = _on_order
+        self.key = _key or ""
+        self.secret = _secret or ""
+
+    def sign(self, _event: str, _time: int) -> str:
+        payload = f"channel={self.channel}&event={_event}&time={_time}"
+        return hmac.new(self.secret.encode(), payload.encode(), hashlib.sha512).hexdigest()
+
+    def subscribe_message(self) -> dict:
+        _time = int(time.time())
+        return {
+            "time": _time,
+            "channel": self.channel,
+            "event": "subscribe",
+            "payload": self.tickers,
+            "auth": {"method": "api_key", "KEY": self.key, "SIGN": self.sign("subscribe", _time)},
+        }
+
+    def handle_message(self, _message: dict) -> list[ExchangeOrder]:
+        """Pass each order of an update to on_order, returns them"""
+        if _message.get("channel") != self.channel:
+            return []
+        if _message.get("error"):
+            logger.warning(
+                "Gate.io order stream error %s", _message["error"],
+                extra={"fields": {"error": _message["error"]}},
+            )
+            return []
+        if _message.get("event") != "update":
+            return []
+        orders = [to_order_update(order) for order in _message.get("result") or []]
+        for order in orders:
+            self.on_order(order)
+        return orders
@@ -0,0 +1,118 @@
+# Latest prices shared between processes through one shared memory table
+from __future__ import annotations
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from typing import Optional
+
+# STD imports
+import asyncio
+
+# Third Party Imports
+import numpy as np
+
+# Internal Imports
+from . import PriceUpdate
+
+
+class PriceBoard:
+    """Latest price and version of every ticker in a block of shared memory.
+
+    One process (the price feed) publishes, every shard process maps the same
+    block and reads prices in place, there is no copy or IPC round trip per
+    price. A price is written before its version is bumped so a reader that
+    sees a new version also sees the new price (8 byte aligned stores don't
+    tear). Pickling a board (i.e passing it to a Process) attaches to the same
+    block by name"""
+
+    def __init__(self, _tickers: list[str], _shared_memory: shared_memory.SharedMemory):
+        self.tickers = list(_tickers)
+        self.slots = {ticker: slot for slot, ticker in enumerate(self.tickers)}
+        self.shared_memory = _shared_memory
+        n = len(self.tickers)
+        # 0 until first price of the ticker is published
+        self.versions = np.ndarray((n,), dtype=np.uint64, buffer=_shared_memory.buf)
+        self.prices = np.ndarray((n,), dtype=np.float64, buffer=_shared_memory.buf, offset=n * 8)
+
+    @classmethod
+    def create(cls, _tickers: list[str]) -> PriceBoard:
+        """New zeroed board, the creator has to unlink() it once every process is done"""
+        _shared_memory = shared_memory.SharedMemory(create=True, size=max(len(_tickers), 1) * 16)
+        board = cls(_tickers, _shared_memory)
+        board.versions[:] = 0
+        board.prices[:] = 0
+        return board
+
+    @classmethod
+    def attach(cls, _name: str, _tickers: list[str]) -> PriceBoard:
+        return cls(_tickers, shared_memory.SharedMemory(name=_name))
+
+    def __reduce__(self):
+        return PriceBoard.attach, (self.shared_memory.name, self.tickers)
+
+    def publish(self, _ticker: str, _price: float):
+        slot = self.slots[_ticker]
+        self.prices[slot] = _price
+        self.versions[slot] += 1
+
+    def price(self, _ticker: str) -> Optional[float]:
+        """Latest price or None if nothing was published for _ticker yet"""
+        slot = self.slots[_ticker]
+        return self.prices.item(slot) if self.versions.item(slot) else None
+
+    def close(self):
+        # numpy views hold the buffer, drop them before closing the mapping
+        self.versions = self.prices = None
+        self.shared_memory.close()
+
+    def unlink(self):
+        self.shared_memory.unlink()
+
+
+@dataclass
+class BoardPriceUpdate(PriceUpdate):
+    """PriceUpdate of the price feed process, every price change is also
+    published to the board"""
+    board: Optional[PriceBoard] = field(default=None, repr=False, compare=False)
+
+    def set_market_price(self, _price: float) -> bool:
+        changed = super().set_market_price(_price)
+        if changed and self.board is not None:
+            self.board.publish(self.ticker, _price)
+        return changed
+
+
+class PriceBoardReader:
+    """Copies board prices of a shard's tickers into their PriceUpdates, so
+    ticker watchers wake on price changes exactly like with a local price feed.
+    Every poll is one vectorized compare of the tickers' versions"""
+
+    def __init__(
+        self,
+        _board: PriceBoard,
+        _prices_objects: dict[str, PriceUpdate],
+        _interval: float = 0.05,
+    ):
+        """_prices_objects: ticker -> PriceUpdate, only these tickers are read
+        _interval: seconds between polls of the board"""
+        self.board = _board
+        self.prices_objects = _prices_objects
+        self.interval = _interval
+        self.tickers = list(_prices_objects)
+        self.board_slots = np.array([_board.slots[ticker] for ticker in self.tickers], dtype=np.int64)
+        self.seen_versions = np.zeros(len(self.tickers), dtype=np.uint64)
+
+    def poll(self) -> int:
+        """Apply prices published since last poll, returns number of tickers updated"""
+        versions = self.board.versions[self.board_slots]
+        changed = np.flatnonzero(versions != self.seen_versions)
+        for index in changed.tolist():
+            self.prices_objects[self.tickers[index]].set_market_price(
+                self.board.prices.item(self.board_slots.item(index))
+            )
+        self.seen_versions = versions
+        return len(changed)
+
+    async def run(self):
+        while True:
+            self.poll()
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,238 @@
+# Rate limiting of exchange api calls
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Optional
+
+# STD imports
+import asyncio, heapq, itertools, multiprocessing, time
+
+
+class Priority(IntEnum):
+    """Lower value is served first when requests have to wait for rate limit"""
+
+    FILL_FOLLOW_UP = 0
+    NEW_GRID_ORDER = 1
+    RECONCILIATION = 2
+    PRICE_POLL = 3
+
+
+# endpoint class -> (requests per second, burst)
+# https://www.gate.io/docs/developers/apiv4/#frequency-limit-rule
+GATEIO_RATE_LIMITS: dict[str, tuple[float, int]] = {
+    "public": (20, 20),  # 200r/10s per endpoint
+    "private": (20, 20),  # 200r/10s per endpoint
+    "order": (10, 10),  # spot order placement 10r/s
+    "cancel": (200, 200),  # spot order cancellation 200r/s
+}
+# Binance counts request weight (6000/min per IP) and orders (100/10s per account),
+# approximated per endpoint class. spot has no batch order endpoint so every
+# order and cancel is a request of its own
+BINANCE_RATE_LIMITS: dict[str, tuple[float, int]] = {
+    "public": (10, 20),  # bookTicker weight 2-4
+    "private": (5, 10),  # order queries weight 4-20, openOrders of all pairs 80
+    "order": (10, 10),  # 100 orders/10s
+    "cancel": (50, 50),  # weight 1
+}
+
+
+class TokenBucket:
+    def __init__(self, _rate: float, _capacity: int):
+        """_rate: tokens added per second, _capacity: max tokens i.e burst size"""
+        self.rate = _rate
+        self.capacity = _capacity
+        self.tokens: float = _capacity
+        self.last_refill = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def try_take(self) -> bool:
+        self.refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def time_until_token(self) -> float:
+        self.refill()
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+    def drain(self):
+        """Exchange said we are over the limit, wait for a full token before next call"""
+        self.refill()
+        self.tokens = min(self.tokens, 0)
+
+    def refund(self):
+        """Give back a token that was taken but not used"""
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+
+class SharedTokenBucket(TokenBucket):
+    """TokenBucket whose tokens live in shared memory, every process it is
+    passed to at start (Process args) draws from the same budget. time.monotonic
+    is system wide so refills agree between processes"""
+
+    def __init__(self, _rate: float, _capacity: int, _context=None):
+        _context = _context or multiprocessing.get_context()
+        # [tokens, last_refill]
+        self._state = _context.RawArray("d", 2)
+        # reentrant, try_take/time_until_token/drain call refill
+        self._lock = _context.RLock()
+        super().__init__(_rate, _capacity)
+
+    @property
+    def tokens(self) -> float:
+        return self._state[0]
+
+    @tokens.setter
+    def tokens(self, _tokens: float):
+        self._state[0] = _tokens
+
+    @property
+    def last_refill(self) -> float:
+        return self._state[1]
+
+    @last_refill.setter
+    def last_refill(self, _time: float):
+        self._state[1] = _time
+
+    def refill(self):
+        with self._lock:
+            super().refill()
+
+    def try_take(self) -> bool:
+        with self._lock:
+            return super().try_take()
+
+    def time_until_token(self) -> float:
+        with self._lock:
+            return super().time_until_token()
+
+    def drain(self):
+        with self._lock:
+            super().drain()
+
+    def refund(self):
+        with self._lock:
+            super().refund()
+
+
+def shared_buckets(
+    _rate_limits: Optional[dict[str, tuple[float, int]]] = None, _context=None
+) -> dict[str, SharedTokenBucket]:
+    """One SharedTokenBucket per endpoint class, pass to RequestScheduler of
+    every process that should share one global rate budget"""
+    _rate_limits = _rate_limits or GATEIO_RATE_LIMITS
+    return {
+        name: SharedTokenBucket(rate, capacity, _context)
+        for name, (rate, capacity) in _rate_limits.items()
+    }
+
+
+@dataclass
+class LaneStats:
+    """Counters for one priority lane"""
+    queued: int = 0
+    requests: int = 0
+    total_wait: float = 0
+    max_wait: float = 0
+
+    @property
+    def average_wait(self) -> float:
+        return self.total_wait / self.requests if self.requests else 0
+
+
+class RequestScheduler:
+    """Token bucket per endpoint class, requests that can't get a token wait in a
+    priority queue of that endpoint class and are released highest priority
+    (then oldest) first as tokens refill"""
+
+    def __init__(
+        self,
+        _rate_limits: Optional[dict[str, tuple[float, int]]] = None,
+        _buckets: Optional[dict[str, TokenBucket]] = None,
+    ):
+        """_buckets: use these (i.e shared_buckets()) instead of new ones from _rate_limits"""
+        _rate_limits = _rate_limits or GATEIO_RATE_LIMITS
+        self.buckets = _buckets or {
+            name: TokenBucket(rate, capacity) for name, (rate, capacity) in _rate_limits.items()
+        }
+        # endpoint class -> heap of (priority, sequence, enqueue time, future)
+        self._queues: dict[str, list[tuple[int, int, float, asyncio.Future]]] = {
+            name: [] for name in self.buckets
+        }
+        self._timers: dict[str, Optional[asyncio.TimerHandle]] = {
+            name: None for name in self.buckets
+        }
+        self._sequence = itertools.count()
+        self.lanes = {priority: LaneStats() for priority in Priority}
+
+    async def acquire(self, _endpoint_class: str, _priority: Priority):
+        """Wait until a request of _endpoint_class may be sent"""
+        bucket = self.buckets[_endpoint_class]
+        queue = self._queues[_endpoint_class]
+        if not queue and bucket.try_take():
+            self._record(_priority, 0)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(queue, (_priority, next(self._sequence), time.monotonic(), future))
+        self.lanes[_priority].queued += 1
+        self._schedule(_endpoint_class)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # cancelled after _dispatch handed it a token, nothing is sent with it
+                bucket.refund()
+                if queue:
+                    self._schedule(_endpoint_class)
+            raise
+        finally:
+            self.lanes[_priority].queued -= 1
+
+    def throttled(self, _endpoint_class: str):
+        """Call when exchange answered 429 for a request of _endpoint_class"""
+        self.buckets[_endpoint_class].drain()
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """Queue depth and wait times of each priority lane"""
+        return {
+            priority.name: {
+                "queued": lane.queued,
+                "requests": lane.requests,
+                "average_wait": lane.average_wait,
+                "max_wait": lane.max_wait,
+            }
+            for priority, lane in self.lanes.items()
+        }
+
+    def _record(self, _priority: Priority, _wait: float):
+        lane = self.lanes[_priority]
+        lane.requests += 1
+        lane.total_wait += _wait
+        lane.max_wait = max(lane.max_wait, _wait)
+
+    def _schedule(self, _endpoint_class: str):
+        if self._timers[_endpoint_class] is None:
+            delay = self.buckets[_endpoint_class].time_until_token()
+            self._timers[_endpoint_class] = asyncio.get_running_loop().call_later(
+                delay, self._dispatch, _endpoint_class
+            )
+
+    def _dispatch(self, _endpoint_class: str):
+        self._timers[_endpoint_class] = None
+        bucket = self.buckets[_endpoint_class]
+        queue = self._queues[_endpoint_class]
+        while queue and bucket.try_take():
+            priority, _, enqueued, future = heapq.heappop(queue)
+            if future.done():
+                # waiter was cancelled, give its token to the next one
+                bucket.refund()
+                continue
+            self._record(Priority(priority), time.monotonic() - enqueued)
+            future.set_result(None)
+        if queue:
+            self._schedule(_endpoint_class)
@@ -0,0 +1,741 @@
+# Local Gate.io stand-in for load testing GateIOConnector without real money
+#   python -m exchanges.simulator --pairs VANRY_USDT:0.197 CPOOL_USDT:0.1535 --path crash
+#   GATEIO_HOST=http://127.0.0.1:8080 GATEIO_WS_URL=ws://127.0.0.1:8080/ws/v4/ python calculate_returns.py
+# and of Binance for BinanceConnector
+#   python -m exchanges.simulator --exchange binance --pairs VANRYUSDT:0.197
+#   BINANCE_HOST=http://127.0.0.1:8080 BINANCE_WS_URL=ws://127.0.0.1:8080/ws
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, Literal, Optional
+import argparse, heapq, itertools, json, random, time
+
+# Third Party Imports
+import asyncio
+from aiohttp import web
+
+# Internal Imports
+from .rate_limiter import BINANCE_RATE_LIMITS, GATEIO_RATE_LIMITS, TokenBucket
+
+# a book is rebuilt without cancelled orders once they are more than this share of it
+DEAD_ENTRY_SHARE = 0.5
+
+
+@dataclass
+class SimulatedOrder:
+    id: str
+    currency_pair: str
+    side: Literal["buy", "sell"]
+    price: float
+    amount: float
+    text: str = ""
+    create_time: int = field(default_factory=lambda: int(time.time()))
+    status: str = "open"
+    finish_as: str = "open"
+    left: float = 0
+
+    def __post_init__(self):
+        self.left = self.amount
+
+    def to_json(self) -> dict:
+        """Same fields (as strings) Gate.io returns for an order"""
+        return {
+            "id": self.id,
+            "text": self.text,
+            "create_time": str(self.create_time),
+            "update_time": str(int(time.time())),
+            "currency_pair": self.currency_pair,
+            "status": self.status,
+            "type": "limit",
+            "account": "spot",
+            "side": self.side,
+            "amount": f"{self.amount}",
+            "price": f"{self.price}",
+            "left": f"{self.left}",
+            "filled_total": f"{(self.amount - self.left) * self.price}",
+            "finish_as": self.finish_as,
+        }
+
+
+class MatchingEngine:
+    """In memory limit order matching against a single market price per pair.
+
+    Buys fill once price <= order price, sells once price >= order price, orders
+    crossing the current price fill as soon as they are placed. Books are heaps
+    (best bid / best ask on top) so a price move only touches orders it fills,
+    cancelled orders are skipped when reached and a book is compacted once
+    they pass DEAD_ENTRY_SHARE of it.
+    Balances are not tracked, every order is accepted. listeners are called with
+    every order that was placed or finished, right after it happened"""
+
+    def __init__(self):
+        self.prices: dict[str, float] = {}
+        self.orders: dict[str, SimulatedOrder] = {}
+        # pair -> heap of (-price, sequence, order id) / (price, sequence, order id)
+        self._bids: dict[str, list[tuple[float, int, str]]] = {}
+        self._asks: dict[str, list[tuple[float, int, str]]] = {}
+        # pair -> finished orders, oldest first
+        self.finished: dict[str, list[SimulatedOrder]] = {}
+        # (side, pair) -> cancelled orders still in the book of side
+        self._dead: dict[tuple[str, str], int] = {}
+        self._ids = itertools.count(1)
+        self.listeners: list[Callable[[SimulatedOrder], None]] = []
+
+    def _notify(self, _order: SimulatedOrder):
+        for listener in self.listeners:
+            listener(_order)
+
+    def set_price(self, _pair: str, _price: float) -> list[SimulatedOrder]:
+        """Move market price of _pair, returns orders filled by the move"""
+        self.prices[_pair] = _price
+        filled = []
+        bids = self._bids.setdefault(_pair, [])
+        while bids and -bids[0][0] >= _price:
+            filled.extend(self._fill(self._pop("buy", _pair)))
+        asks = self._asks.setdefault(_pair, [])
+        while asks and asks[0][0] <= _price:
+            filled.extend(self._fill(self._pop("sell", _pair)))
+        return filled
+
+    def _books(self, _side: Literal["buy", "sell"]) -> dict[str, list[tuple[float, int, str]]]:
+        return self._bids if _side == "buy" else self._asks
+
+    def _pop(self, _side: Literal["buy", "sell"], _pair: str) -> str:
+        order_id = heapq.heappop(self._books(_side)[_pair])[2]
+        if self.orders[order_id].status == "cancelled":
+            self._dead[_side, _pair] -= 1
+        return order_id
+
+    def place(
+        self, _pair: str, _side: Literal["buy", "sell"], _price: float, _amount: float, _text: str = ""
+    ) -> SimulatedOrder:
+        order = SimulatedOrder(str(next(self._ids)), _pair, _side, _price, _amount, _text)
+        self.orders[order.id] = order
+        if _side == "buy":
+            heapq.heappush(self._bids.setdefault(_pair, []), (-_price, int(order.id), order.id))
+        else:
+            heapq.heappush(self._asks.setdefault(_pair, []), (_price, int(order.id), order.id))
+        self._notify(order)
+        if _pair in self.prices:
+            self.set_price(_pair, self.prices[_pair])
+        return order
+
+    def cancel(self, _order_id: str) -> Optional[SimulatedOrder]:
+        """Cancel open order, it stays in its heap and is skipped when reached
+        until the heap is compacted"""
+        order = self.orders.get(_order_id)
+        if order is None or order.status != "open":
+            return order
+        order.status, order.finish_as = "cancelled", "cancelled"
+        self.finished.setdefault(order.currency_pair, []).append(order)
+        key = (order.side, order.currency_pair)
+        self._dead[key] = self._dead.get(key, 0) + 1
+        if self._dead[key] > len(self._books(order.side)[order.currency_pair]) * DEAD_ENTRY_SHARE:
+            self._compact(order.side, order.currency_pair)
+        self._notify(order)
+        return order
+
+    def _compact(self, _side: Literal["buy", "sell"], _pair: str):
+        """Rebuild the _side heap of _pair with open orders only"""
+        books = self._books(_side)
+        book = [entry for entry in books[_pair] if self.orders[entry[2]].status == "open"]
+        heapq.heapify(book)
+        books[_pair] = book
+        self._dead[_side, _pair] = 0
+
+    def open_orders(self, _pair: str) -> list[SimulatedOrder]:
+        return [
+            self.orders[order_id]
+            for book in (self._bids, self._asks)
+            for _, _, order_id in book.get(_pair, [])
+            if self.orders[order_id].status == "open"
+        ]
+
+    def open_pairs(self) -> list[str]:
+        return [pair for pair in self._bids.keys() | self._asks.keys() if self.open_orders(pair)]
+
+    def _fill(self, _order_id: str) -> list[SimulatedOrder]:
+        order = self.orders[_order_id]
+        if order.status != "open":
+            return []
+        order.status, order.finish_as, order.left = "closed", "filled", 0
+        self.finished.setdefault(order.currency_pair, []).append(order)
+        self._notify(order)
+        return [order]
+
+
+def random_walk_path(
+    _start: float, _volatility: float = 0.002, _seed: Optional[int] = None
+) -> Iterator[float]:
+    """Endless geometric random walk, _volatility is std dev of each step"""
+    rng = random.Random(_seed)
+    price = _start
+    while True:
+        yield price
+        price *= 1 + rng.gauss(0, _volatility)
+
+
+def crash_path(_start: float, _drop: float = 0.5, _steps: int = 60) -> Iterator[float]:
+    """Price falls by _drop (0.5 == 50%) linearly over _steps then stays there"""
+    for step in range(_steps + 1):
+        yield _start * (1 - _drop * step / _steps)
+
+
+class GateIOSimulator:
+    """aiohttp app serving the spot endpoints GateIO/GateIOPriceStream call, on
+    top of a MatchingEngine driven by scripted price paths.
+
+    _price_paths: pair -> prices, one price is taken every _tick_interval seconds,
+                  an exhausted path keeps its last price
+    _latency: seconds added to every response (+ up to _latency_jitter)
+    _rate_limits: endpoint class -> (requests per second, burst), over the
+                  limit answers 429 TOO_MANY_REQUESTS like Gate.io
+
+    Order events (placed/filled/cancelled) are pushed to spot.orders subscribers
+    after the request or price tick that caused them"""
+
+    prefix = "/api/v4"
+    rate_limits = GATEIO_RATE_LIMITS
+
+    def __init__(
+        self,
+        _price_paths: dict[str, Iterable[float]],
+        _tick_interval: float = 1.0,
+        _latency: float = 0.0,
+        _latency_jitter: float = 0.0,
+        _rate_limits: Optional[dict[str, tuple[float, int]]] = None,
+    ):
+        self.engine = MatchingEngine()
+        self.price_paths = {pair: iter(path) for pair, path in _price_paths.items()}
+        self.tick_interval = _tick_interval
+        self.latency = _latency
+        self.latency_jitter = _latency_jitter
+        _rate_limits = _rate_limits or self.rate_limits
+        self.buckets = {
+            name: TokenBucket(rate, capacity) for name, (rate, capacity) in _rate_limits.items()
+        }
+        # endpoint class -> requests served / rejected, see GET /sim/stats
+        self.requests: dict[str, int] = {name: 0 for name in self.buckets}
+        self.rejected: dict[str, int] = {name: 0 for name in self.buckets}
+        self._subscribers: dict[web.WebSocketResponse, set[str]] = {}
+        # order stream websocket -> pairs it wants events of, None for all
+        self._order_subscribers: dict[web.WebSocketResponse, Optional[set[str]]] = {}
+        # (pair, event) waiting for push_order_events
+        self._order_events: list[tuple[str, dict]] = []
+        self.engine.listeners.append(self.queue_order_event)
+        self.step()
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self.middleware])
+        app.router.add_get(self.prefix + "/spot/tickers", self.tickers)
+        app.router.add_post(self.prefix + "/spot/batch_orders", self.batch_orders)
+        app.router.add_get(self.prefix + "/spot/orders", self.list_orders)
+        app.router.add_get(self.prefix + "/spot/orders/{order_id}", self.get_order)
+        app.router.add_delete(self.prefix + "/spot/orders/{order_id}", self.cancel_order)
+        app.router.add_get(self.prefix + "/spot/open_orders", self.open_orders)
+        app.router.add_post(self.prefix + "/spot/cancel_batch_orders", self.cancel_batch_orders)
+        app.router.add_get("/ws/v4/", self.websocket)
+        app.router.add_get("/sim/stats", self.stats)
+        app.cleanup_ctx.append(self._price_task)
+        return app
+
+    async def _price_task(self, _app: web.Application):
+        task = asyncio.create_task(self.run_price_paths())
+        yield
+        task.cancel()
+
+    async def run_price_paths(self):
+        while True:
+            await asyncio.sleep(self.tick_interval)
+            self.step()
+            await self.broadcast()
+            await self.push_order_events()
+
+    def step(self):
+        """Advance every price path by one price"""
+        for pair, path in self.price_paths.items():
+            price = next(path, None)
+            if price is not None:
+                self.engine.set_price(pair, round(price, 10))
+
+    @staticmethod
+    def endpoint_class(_request: web.Request) -> Optional[str]:
+        if _request.path.endswith("/cancel_batch_orders") or _request.method == "DELETE":
+            return "cancel"
+        if _request.path.endswith("/batch_orders"):
+            return "order"
+        if _request.path.endswith("/tickers"):
+            return "public"
+        if _request.path.startswith("/api/"):
+            return "private"
+        return None
+
+    @web.middleware
+    async def middleware(self, request: web.Request, handler):
+        # aiohttp passes request/handler by keyword, names can't take the _ prefix
+        endpoint_class = self.endpoint_class(request)
+        if endpoint_class is not None:
+            if not self.buckets[endpoint_class].try_take():
+                self.rejected[endpoint_class] += 1
+                return self.error(429, "TOO_MANY_REQUESTS", "Request Rate limit Exceeded")
+            self.requests[endpoint_class] += 1
+            if endpoint_class != "public" and not self.is_signed(request):
+                return self.error(401, "INVALID_KEY", "Missing signature headers")
+        if self.latency or self.latency_jitter:
+            await asyncio.sleep(self.latency + random.uniform(0, self.latency_jitter))
+        response = await handler(request)
+        await self.push_order_events()
+        return response
+
+    @staticmethod
+    def is_signed(_request: web.Request) -> bool:
+        return "SIGN" in _request.headers
+
+    @staticmethod
+    def error(_status: int, _label: str, _message: str) -> web.Response:
+        return web.json_response({"label": _label, "message": _message}, status=_status)
+
+    def ticker_json(self, _pair: str) -> dict:
+        price = f"{self.engine.prices[_pair]}"
+        return {"currency_pair": _pair, "last": price, "lowest_ask": price, "highest_bid": price}
+
+    async def tickers(self, _request: web.Request) -> web.Response:
+        pair = _request.query.get("currency_pair")
+        if pair is not None and pair not in self.engine.prices:
+            return self.error(400, "INVALID_CURRENCY_PAIR", f"{pair} not found")
+        pairs = [pair] if pair else list(self.engine.prices)
+        return web.json_response([self.ticker_json(pair) for pair in pairs])
+
+    async def batch_orders(self, _request: web.Request) -> web.Response:
+        response = []
+        for order in await _request.json():
+            if order["currency_pair"] not in self.engine.prices:
+                response.append(
+                    {"succeeded": False, "label": "INVALID_CURRENCY_PAIR", "message": "", "text": order.get("text", "")}
+                )
+                continue
+            placed = self.engine.place(
+                order["currency_pair"],
+                order["side"],
+                float(order["price"]),
+                float(order["amount"]),
+                order.get("text", ""),
+            )
+            response.append({**placed.to_json(), "succeeded": True})
+        return web.json_response(response)
+
+    async def get_order(self, _request: web.Request) -> web.Response:
+        order = self.engine.orders.get(_request.match_info["order_id"])
+        if order is None or order.currency_pair != _request.query.get("currency_pair"):
+            return self.error(404, "ORDER_NOT_FOUND", "Order not found")
+        return web.json_response(order.to_json())
+
+    async def cancel_order(self, _request: web.Request) -> web.Response:
+        order = self.engine.cancel(_request.match_info["order_id"])
+        if order is None or order.currency_pair != _request.query.get("currency_pair"):
+            return self.error(404, "ORDER_NOT_FOUND", "Order not found")
+        return web.json_response(order.to_json())
+
+    async def cancel_batch_orders(self, _request: web.Request) -> web.Response:
+        response = []
+        for order in await _request.json():
+            cancelled = self.engine.cancel(order["id"])
+            if cancelled is None or cancelled.currency_pair != order["currency_pair"]:
+                response.append(
+                    {**order, "succeeded": False, "label": "ORDER_NOT_FOUND", "message": "Order not found"}
+                )
+            elif cancelled.finish_as != "cancelled":
+                response.append(
+                    {**order, "succeeded": False, "label": "ORDER_CLOSED", "message": "Order already closed"}
+                )
+            else:
+                response.append({**order, "succeeded": True})
+        return web.json_response(response)
+
+    async def list_orders(self, _request: web.Request) -> web.Response:
+        pair = _request.query["currency_pair"]
+        page, limit = int(_request.query.get("page", 1)), int(_request.query.get("limit", 100))
+        if _request.query.get("status") == "finished":
+            orders = self.engine.finished.get(pair, [])[::-1]
+        else:
+            orders = self.engine.open_orders(pair)
+        return web.json_response(
+            [order.to_json() for order in orders[(page - 1) * limit : page * limit]]
+        )
+
+    async def open_orders(self, _request: web.Request) -> web.Response:
+        page, limit = int(_request.query.get("page", 1)), int(_request.query.get("limit", 100))
+        response = []
+        for pair in self.engine.open_pairs():
+            orders = self.engine.open_orders(pair)
+            page_orders = orders[(page - 1) * limit : page * limit]
+            if page_orders:
+                response.append(
+                    {
+                        "currency_pair": pair,
+                        "total": len(orders),
+                        "orders": [order.to_json() for order in page_orders],
+                    }
+                )
+        return web.json_response(response)
+
+    async def websocket(self, _request: web.Request) -> web.WebSocketResponse:
+        """spot.tickers channel, an update is pushed for subscribed pairs every tick.
+        spot.orders channel (subscribe needs auth), order events of subscribed pairs"""
+        ws = web.WebSocketResponse(heartbeat=10)
+        await ws.prepare(_request)
+        self._subscribers[ws] = set()
+        try:
+            async for msg in ws:
+                message = json.loads(msg.data)
+                if message.get("channel") == "spot.tickers" and message.get("event") == "subscribe":
+                    self._subscribers[ws].update(message.get("payload", []))
+                    await ws.send_json(
+                        {"time": int(time.time()), "channel": "spot.tickers", "event": "subscribe", "error": None, "result": {"status": "success"}}
+                    )
+                elif message.get("channel") == "spot.orders" and message.get("event") == "subscribe":
+                    if "SIGN" not in (message.get("auth") or {}):
+                        await ws.send_json(
+                            {"time": int(time.time()), "channel": "spot.orders", "event": "subscribe", "error": {"code": 2, "message": "Invalid key provided"}, "result": None}
+                        )
+                        continue
+                    self._order_subscribers.setdefault(ws, set()).update(message.get("payload", []))
+                    await ws.send_json(
+                        {"time": int(time.time()), "channel": "spot.orders", "event": "subscribe", "error": None, "result": {"status": "success"}}
+                    )
+        finally:
+            self._subscribers.pop(ws, None)
+            self._order_subscribers.pop(ws, None)
+        return ws
+
+    def ws_update(self, _pair: str) -> dict:
+        return {"time": int(time.time()), "channel": "spot.tickers", "event": "update", "result": self.ticker_json(_pair)}
+
+    async def broadcast(self):
+        for ws, pairs in list(self._subscribers.items()):
+            for pair in pairs & self.engine.prices.keys():
+                try:
+                    await ws.send_json(self.ws_update(pair))
+                except ConnectionResetError:
+                    self._subscribers.pop(ws, None)
+                    break
+
+    def queue_order_event(self, _order: SimulatedOrder):
+        """MatchingEngine listener, snapshot of the order as it is now"""
+        if self._order_subscribers:
+            self._order_events.append((_order.currency_pair, self.order_event_json(_order)))
+
+    def order_event_json(self, _order: SimulatedOrder) -> dict:
+        return dict(_order.to_json(), event="put" if _order.status == "open" else "finish")
+
+    def order_messages(self, _events: list[dict]) -> list[dict]:
+        """Websocket messages carrying _events, Gate.io batches them in one update"""
+        return [{"time": int(time.time()), "channel": "spot.orders", "event": "update", "result": _events}]
+
+    async def push_order_events(self):
+        events, self._order_events = self._order_events, []
+        if not events:
+            return
+        for ws, pairs in list(self._order_subscribers.items()):
+            pair_events = [event for pair, event in events if pairs is None or pair in pairs]
+            if not pair_events:
+                continue
+            try:
+                for message in self.order_messages(pair_events):
+                    await ws.send_json(message)
+            except ConnectionResetError:
+                self._order_subscribers.pop(ws, None)
+
+    async def stats(self, _request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "requests": self.requests,
+                "rejected": self.rejected,
+                "open_orders": sum(len(self.engine.open_orders(pair)) for pair in self.engine.prices),
+                "filled_orders": sum(
+                    order.finish_as == "filled"
+                    for orders in self.engine.finished.values()
+                    for order in orders
+                ),
+                "prices": self.engine.prices,
+            }
+        )
+
+
+# simulator labels -> Binance error codes
+BINANCE_ERROR_CODES = {
+    "TOO_MANY_REQUESTS": -1003,
+    "INVALID_KEY": -2015,
+    "INVALID_CURRENCY_PAIR": -1121,
+    "ORDER_NOT_FOUND": -2013,
+    "CANCEL_REJECTED": -2011,
+    "LISTEN_KEY_NOT_FOUND": -1125,
+    "FILTER_FAILURE": -1013,
+}
+# LOT_SIZE stepSize / PRICE_FILTER tickSize of symbols without their own filters
+BINANCE_DEFAULT_FILTERS = ("0.00000001", "0.00000001")
+BINANCE_ORDER_STATUS = {"open": "NEW", "filled": "FILLED", "cancelled": "CANCELED"}
+
+
+def on_step(_value: float, _step: float) -> bool:
+    """_value is a whole number of _step, within float error"""
+    steps = _value / _step
+    return abs(steps - round(steps)) < 1e-6
+
+
+def binance_order_json(_order: SimulatedOrder) -> dict:
+    """Same fields (numbers as strings) Binance returns for an order"""
+    return {
+        "symbol": _order.currency_pair,
+        "orderId": int(_order.id),
+        "clientOrderId": _order.text,
+        "price": f"{_order.price}",
+        "origQty": f"{_order.amount}",
+        "executedQty": f"{_order.amount - _order.left}",
+        "status": BINANCE_ORDER_STATUS[_order.finish_as],
+        "timeInForce": "GTC",
+        "type": "LIMIT",
+        "side": _order.side.upper(),
+        "time": _order.create_time * 1000,
+        "transactTime": _order.create_time * 1000,
+    }
+
+
+class BinanceSimulator(GateIOSimulator):
+    """Binance spot endpoints (symbols like SIMUSDT) on the same MatchingEngine,
+    price paths and rate limiting as GateIOSimulator, errors come back as
+    {"code", "msg"}, prices stream as <symbol>@bookTicker on /ws and order
+    events as executionReport on /ws/<listen key> (see POST /userDataStream).
+    Orders off the symbol's step/tick size are rejected with -1013 like Binance"""
+
+    prefix = "/api/v3"
+    rate_limits = BINANCE_RATE_LIMITS
+
+    def __init__(self, *args, _filters: Optional[dict[str, tuple[str, str]]] = None, **kwargs):
+        """_filters: symbol -> (stepSize, tickSize) served by /exchangeInfo,
+        others get BINANCE_DEFAULT_FILTERS"""
+        super().__init__(*args, **kwargs)
+        self.filters = _filters or {}
+        # handed out by POST /userDataStream
+        self.listen_keys: set[str] = set()
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self.middleware])
+        app.router.add_get(self.prefix + "/ticker/bookTicker", self.tickers)
+        app.router.add_get(self.prefix + "/exchangeInfo", self.exchange_info)
+        app.router.add_post(self.prefix + "/order", self.place_order)
+        app.router.add_get(self.prefix + "/order", self.get_order)
+        app.router.add_delete(self.prefix + "/order", self.cancel_order)
+        app.router.add_get(self.prefix + "/openOrders", self.open_orders)
+        app.router.add_get(self.prefix + "/allOrders", self.all_orders)
+        app.router.add_post(self.prefix + "/userDataStream", self.new_listen_key)
+        app.router.add_put(self.prefix + "/userDataStream", self.keepalive_listen_key)
+        app.router.add_get("/ws", self.websocket)
+        app.router.add_get("/ws/{listen_key}", self.user_data_websocket)
+        app.router.add_get("/sim/stats", self.stats)
+        app.cleanup_ctx.append(self._price_task)
+        return app
+
+    @staticmethod
+    def endpoint_class(_request: web.Request) -> Optional[str]:
+        if _request.path.endswith("/order") and _request.method == "DELETE":
+            return "cancel"
+        if _request.path.endswith("/order") and _request.method == "POST":
+            return "order"
+        if _request.path.endswith(("/bookTicker", "/exchangeInfo")):
+            return "public"
+        if _request.path.startswith("/api/"):
+            return "private"
+        return None
+
+    @staticmethod
+    def is_signed(_request: web.Request) -> bool:
+        # user data stream endpoints take the api key only
+        if _request.path.endswith("/userDataStream"):
+            return "X-MBX-APIKEY" in _request.headers
+        return "X-MBX-APIKEY" in _request.headers and "signature" in _request.query
+
+    @staticmethod
+    def error(_status: int, _label: str, _message: str) -> web.Response:
+        return web.json_response(
+            {"code": BINANCE_ERROR_CODES.get(_label, -1000), "msg": _message}, status=_status
+        )
+
+    def ticker_json(self, _pair: str) -> dict:
+        price = f"{self.engine.prices[_pair]}"
+        return {"symbol": _pair, "bidPrice": price, "bidQty": "1", "askPrice": price, "askQty": "1"}
+
+    async def tickers(self, _request: web.Request) -> web.Response:
+        symbols = json.loads(_request.query.get("symbols", "null")) or list(self.engine.prices)
+        missing = [symbol for symbol in symbols if symbol not in self.engine.prices]
+        if missing:
+            return self.error(400, "INVALID_CURRENCY_PAIR", f"Invalid symbol {missing[0]}")
+        return web.json_response([self.ticker_json(symbol) for symbol in symbols])
+
+    async def exchange_info(self, _request: web.Request) -> web.Response:
+        """Symbols with their LOT_SIZE and PRICE_FILTER only"""
+        if "symbol" in _request.query:
+            symbols = [_request.query["symbol"]]
+        else:
+            symbols = json.loads(_request.query.get("symbols", "null")) or list(self.engine.prices)
+        missing = [symbol for symbol in symbols if symbol not in self.engine.prices]
+        if missing:
+            return self.error(400, "INVALID_CURRENCY_PAIR", f"Invalid symbol {missing[0]}")
+        info = []
+        for symbol in symbols:
+            step, tick = self.filters.get(symbol, BINANCE_DEFAULT_FILTERS)
+            info.append({
+                "symbol": symbol,
+                "status": "TRADING",
+                "filters": [
+                    {"filterType": "PRICE_FILTER", "minPrice": tick, "maxPrice": "0", "tickSize": tick},
+                    {"filterType": "LOT_SIZE", "minQty": step, "maxQty": "0", "stepSize": step},
+                ],
+            })
+        return web.json_response({"timezone": "UTC", "symbols": info})
+
+    async def place_order(self, _request: web.Request) -> web.Response:
+        query = _request.query
+        if query["symbol"] not in self.engine.prices:
+            return self.error(400, "INVALID_CURRENCY_PAIR", "Invalid symbol.")
+        step, tick = self.filters.get(query["symbol"], BINANCE_DEFAULT_FILTERS)
+        for name, value, size in (("LOT_SIZE", query["quantity"], step), ("PRICE_FILTER", query["price"], tick)):
+            if not on_step(float(value), float(size)):
+                return self.error(400, "FILTER_FAILURE", f"Filter failure: {name}")
+        placed = self.engine.place(
+            query["symbol"], query["side"].lower(), float(query["price"]), float(query["quantity"])
+        )
+        return web.json_response(binance_order_json(placed))
+
+    def find_order(self, _request: web.Request) -> Optional[SimulatedOrder]:
+        order = self.engine.orders.get(_request.query.get("orderId", ""))
+        if order is None or order.currency_pair != _request.query.get("symbol"):
+            return None
+        return order
+
+    async def get_order(self, _request: web.Request) -> web.Response:
+        order = self.find_order(_request)
+        if order is None:
+            return self.error(400, "ORDER_NOT_FOUND", "Order does not exist.")
+        return web.json_response(binance_order_json(order))
+
+    async def cancel_order(self, _request: web.Request) -> web.Response:
+        order = self.find_order(_request)
+        if order is None or order.status != "open":
+            return self.error(400, "CANCEL_REJECTED", "Unknown order sent.")
+        return web.json_response(binance_order_json(self.engine.cancel(order.id)))
+
+    async def open_orders(self, _request: web.Request) -> web.Response:
+        symbol = _request.query.get("symbol")
+        symbols = [symbol] if symbol else self.engine.open_pairs()
+        return web.json_response(
+            [binance_order_json(order) for symbol in symbols for order in self.engine.open_orders(symbol)]
+        )
+
+    async def all_orders(self, _request: web.Request) -> web.Response:
+        """Oldest first, the last `limit` orders of the symbol"""
+        symbol = _request.query["symbol"]
+        limit = int(_request.query.get("limit", 500))
+        orders = sorted(
+            (order for order in self.engine.orders.values() if order.currency_pair == symbol),
+            key=lambda order: int(order.id),
+        )
+        return web.json_response([binance_order_json(order) for order in orders[-limit:]])
+
+    async def websocket(self, _request: web.Request) -> web.WebSocketResponse:
+        """SUBSCRIBE to <symbol>@bookTicker streams, an update is pushed for
+        subscribed symbols every tick"""
+        ws = web.WebSocketResponse(heartbeat=10)
+        await ws.prepare(_request)
+        self._subscribers[ws] = set()
+        try:
+            async for msg in ws:
+                message = json.loads(msg.data)
+                if message.get("method") == "SUBSCRIBE":
+                    self._subscribers[ws].update(
+                        stream.split("@")[0].upper() for stream in message.get("params", [])
+                    )
+                    await ws.send_json({"result": None, "id": message.get("id")})
+        finally:
+            self._subscribers.pop(ws, None)
+        return ws
+
+    async def new_listen_key(self, _request: web.Request) -> web.Response:
+        listen_key = f"{random.getrandbits(128):032x}"
+        self.listen_keys.add(listen_key)
+        return web.json_response({"listenKey": listen_key})
+
+    async def keepalive_listen_key(self, _request: web.Request) -> web.Response:
+        if _request.query.get("listenKey") not in self.listen_keys:
+            return self.error(400, "LISTEN_KEY_NOT_FOUND", "This listenKey does not exist.")
+        return web.json_response({})
+
+    async def user_data_websocket(self, _request: web.Request) -> web.StreamResponse:
+        """executionReport of every order event, for listen keys handed out by
+        POST /userDataStream"""
+        if _request.match_info["listen_key"] not in self.listen_keys:
+            return self.error(400, "LISTEN_KEY_NOT_FOUND", "This listenKey does not exist.")
+        ws = web.WebSocketResponse(heartbeat=10)
+        await ws.prepare(_request)
+        self._order_subscribers[ws] = None
+        try:
+            async for _ in ws:
+                pass
+        finally:
+            self._order_subscribers.pop(ws, None)
+        return ws
+
+    def order_event_json(self, _order: SimulatedOrder) -> dict:
+        order = binance_order_json(_order)
+        return {
+            "e": "executionReport",
+            "E": int(time.time() * 1000),
+            "s": order["symbol"],
+            "S": order["side"],
+            "o": order["type"],
+            "q": order["origQty"],
+            "p": order["price"],
+            "x": {"FILLED": "TRADE", "CANCELED": "CANCELED"}.get(order["status"], "NEW"),
+            "X": order["status"],
+            "i": order["orderId"],
+            "z": order["executedQty"],
+            "O": order["time"],
+        }
+
+    def order_messages(self, _events: list[dict]) -> list[dict]:
+        # one message per event
+        return _events
+
+    def ws_update(self, _pair: str) -> dict:
+        price = f"{self.engine.prices[_pair]}"
+        return {"u": int(time.time() * 1000), "s": _pair, "b": price, "B": "1", "a": price, "A": "1"}
+
+
+def main(_args: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Local Gate.io / Binance spot stand-in")
+    parser.add_argument("--exchange", choices=["gateio", "binance"], default="gateio")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--pairs", nargs="+", required=True, help="PAIR:start_price")
+    parser.add_argument("--path", choices=["random", "crash"], default="random")
+    parser.add_argument("--volatility", type=float, default=0.002, help="random path step std dev")
+    parser.add_argument("--drop", type=float, default=0.5, help="crash path total drop")
+    parser.add_argument("--steps", type=int, default=60, help="crash path length in ticks")
+    parser.add_argument("--tick", type=float, default=1.0, help="seconds between prices")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    args = parser.parse_args(_args)
+
+    price_paths = {}
+    for index, pair_and_price in enumerate(args.pairs):
+        pair, price = pair_and_price.split(":")
+        if args.path == "crash":
+            price_paths[pair] = crash_path(float(price), args.drop, args.steps)
+        else:
+            price_paths[pair] = random_walk_path(float(price), args.volatility, index)
+
+    simulator_class = BinanceSimulator if args.exchange == "binance" else GateIOSimulator
+    simulator = simulator_class(price_paths, args.tick, args.latency, args.jitter)
+    web.run_app(simulator.app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# Reconnecting websocket client the exchange streams are built on
+from typing import Callable, Optional
+
+# STD imports
+import asyncio, aiohttp, logging
+
+logger = logging.getLogger("dca.websocket")
+
+
+class WebsocketStream:
+    """Connects to url, sends subscribe_messages() and passes every json message
+    to handle_message. Reconnects (with backoff) and resubscribes whenever the
+    connection drops, subclasses say what to subscribe to and what a message means"""
+
+    def __init__(
+        self,
+        _url: str,
+        _reconnect_delay: float = 1,
+        _max_reconnect_delay: float = 30,
+        _heartbeat: float = 10,
+        _on_connect: Optional[Callable[[], None]] = None,
+    ):
+        """_url: websocket endpoint, point it to a local server for testing
+        _heartbeat: seconds between websocket pings, dead connections are dropped
+        after missing a pong
+        _on_connect: called after every (re)subscription, i.e to catch up on
+        what was missed while disconnected"""
+        self.url = _url
+        self.reconnect_delay = _reconnect_delay
+        self.max_reconnect_delay = _max_reconnect_delay
+        self.heartbeat = _heartbeat
+        self.on_connect = _on_connect
+        # number of (re)connections made, useful to check resubscription
+        self.connections = 0
+
+    def subscribe_messages(self) -> list[dict]:
+        return [self.subscribe_message()]
+
+    def subscribe_message(self) -> dict:
+        raise NotImplementedError
+
+    def handle_message(self, _message: dict):
+        raise NotImplementedError
+
+    async def connect_url(self, _session: aiohttp.ClientSession) -> str:
+        """Url of the next connection"""
+        return self.url
+
+    async def run(self):
+        """Stream forever"""
+        delay = self.reconnect_delay
+        async with aiohttp.ClientSession() as session:
+            while True:
+                _connections = self.connections
+                try:
+                    await self.stream(session)
+                    # server closed connection cleanly
+                    delay = self.reconnect_delay
+                    logger.warning(
+                        "%s closed Reconnecting in %s ...", type(self).__name__, delay,
+                        extra={"fields": {"stream": type(self).__name__, "delay": delay}},
+                    )
+                    await asyncio.sleep(delay)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    if self.connections > _connections:
+                        # dropped after connecting, backoff is for failing to connect
+                        delay = self.reconnect_delay
+                    logger.warning(
+                        "%s connection error Reconnecting in %s ... %s", type(self).__name__, delay, e,
+                        extra={"fields": {"stream": type(self).__name__, "delay": delay, "error": repr(e)}},
+                    )
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def stream(self, _session: aiohttp.ClientSession):
+        """Single connection, returns when the server closes it"""
+        async with _session.ws_connect(await self.connect_url(_session), heartbeat=self.heartbeat) as ws:
+            self.connections += 1
+            for message in self.subscribe_messages():
+                await ws.send_json(message)
+            if self.on_connect is not None:
+                self.on_connect()
+            async for msg in ws:
+                if msg.type == aiohttp.WSMsgType.TEXT:
+                    # a bad message (or a bug in what it triggers) must not drop the
+                    # stream, reconnecting is for transport errors only
+                    try:
+                        self.handle_message(msg.json())
+                    except Exception as e:
+                        logger.exception(
+                            "%s failed to handle message : %s", type(self).__name__, e,
+                            extra={"fields": {"stream": type(self).__name__, "message": msg.data[:1000]}},
+                        )
+                elif msg.type == aiohttp.WSMsgType.ERROR:
+                    raise aiohttp.ClientError(f"websocket error {ws.exception()}")
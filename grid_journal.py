@@ -0,0 +1,241 @@
+# Durable journal of grid line state, restores GridLineManagers after a restart
+import asyncio, logging, sqlite3, threading, time
+
+# Third Party Imports
+import numpy as np
+
+# Internal Imports
+from grid_line_machine import GridLineManager, GridLineStore
+
+logger = logging.getLogger("dca.journal")
+
+GRID_JOURNAL_FILE = "grid_state.db"
+# journal rows written before they are folded into the snapshot table
+COMPACT_AFTER_ROWS = 10_000
+
+# GridLineStore columns saved for every grid line, besides order_id
+NUMERIC_COLUMNS = (
+    "total_buy_orders",
+    "total_sell_orders",
+    "total_cost",
+    "total_tokens",
+    "total_fee",
+    "state",
+)
+ROW_COLUMNS = ("ticker", "level", "price", "order_id", *NUMERIC_COLUMNS)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    time REAL NOT NULL,
+    ticker TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    price REAL NOT NULL,
+    order_id TEXT NOT NULL,
+    total_buy_orders INTEGER NOT NULL,
+    total_sell_orders INTEGER NOT NULL,
+    total_cost REAL NOT NULL,
+    total_tokens REAL NOT NULL,
+    total_fee REAL NOT NULL,
+    state INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS journal_ticker ON journal (ticker, seq);
+CREATE TABLE IF NOT EXISTS snapshot (
+    ticker TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    price REAL NOT NULL,
+    order_id TEXT NOT NULL,
+    total_buy_orders INTEGER NOT NULL,
+    total_sell_orders INTEGER NOT NULL,
+    total_cost REAL NOT NULL,
+    total_tokens REAL NOT NULL,
+    total_fee REAL NOT NULL,
+    state INTEGER NOT NULL,
+    PRIMARY KEY (ticker, level)
+);
+"""
+
+
+class GridJournal:
+    """Write ahead journal of grid line state in SQLite (WAL mode)
+
+    Tracked stores are diffed against the last journaled copy of their columns
+    on every flush, each grid line that changed since (buy_order_success,
+    triggers, cancels, bulk restores ...) is appended as one row holding its
+    full state. Flushes are batched, one transaction every _flush_interval
+    seconds, and every COMPACT_AFTER_ROWS rows the journal is folded into a
+    snapshot of the latest row per grid line.
+
+    Rows are keyed on a grid line's level (index - store.offset), which stays
+    the same when a sliding grid adds lines below. restore() loads snapshot +
+    journal back into a GridLineManager, lines are matched on level and price
+    so a changed grid config never restores stale state"""
+
+    def __init__(
+        self,
+        _path: str = GRID_JOURNAL_FILE,
+        _flush_interval: float = 1.0,
+        _compact_after_rows: int = COMPACT_AFTER_ROWS,
+    ):
+        self.path = _path
+        self.flush_interval = _flush_interval
+        self.compact_after_rows = _compact_after_rows
+        # sqlite writes run in worker threads, one at a time
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(_path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL survives process crashes, only an OS crash can lose the last commit
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self.rows_since_snapshot = self.connection.execute(
+            "SELECT COUNT(*) FROM journal"
+        ).fetchone()[0]
+        # ticker -> (store, copy of its columns as last journaled, store.offset of the copy)
+        self._tracked: dict[str, tuple[GridLineStore, dict[str, np.ndarray], int]] = {}
+
+    def track(self, _grid_line_manager: GridLineManager, _journaled: bool = False):
+        """Journal changes of _grid_line_manager, every grid line not in its
+        initial state is written on next flush unless _journaled (state already
+        came from this journal)"""
+        store = _grid_line_manager.store
+        if _journaled:
+            last = {name: getattr(store, name).copy() for name in NUMERIC_COLUMNS}
+            last["order_id"] = store.order_id.copy()
+        else:
+            last = {name: np.zeros_like(getattr(store, name)) for name in NUMERIC_COLUMNS}
+            last["order_id"] = np.zeros(len(store), dtype=object)
+        self._tracked[store.ticker] = (store, last, store.offset)
+
+    def restore(self, _grid_line_manager: GridLineManager) -> int:
+        """Load latest journaled state of each grid line into _grid_line_manager
+        and start tracking it, returns number of grid lines restored"""
+        store = _grid_line_manager.store
+        with self._lock:
+            rows = self.connection.execute(
+                f"""SELECT {", ".join(ROW_COLUMNS)} FROM (
+                    SELECT {", ".join(ROW_COLUMNS)}, 0 AS seq FROM snapshot WHERE ticker = ?
+                    UNION ALL
+                    SELECT {", ".join(ROW_COLUMNS)}, seq FROM journal WHERE ticker = ?
+                ) ORDER BY seq""",
+                (store.ticker, store.ticker),
+            ).fetchall()
+
+        # later rows overwrite earlier ones of the same grid line
+        latest = {row[1]: row for row in rows}
+        if latest and _grid_line_manager.window:
+            # sliding grid may have grown past its initial lines before restart
+            _grid_line_manager.extend_to(min(row[2] for row in latest.values()))
+            _grid_line_manager.extend_to(max(row[2] for row in latest.values()))
+        restored = [
+            row
+            for level, row in latest.items()
+            if 0 <= level + store.offset < len(store)
+            and _grid_line_manager.price_to_tick(row[2])
+            == _grid_line_manager.price_to_tick(store.price[level + store.offset])
+        ]
+        if len(restored) < len(latest):
+            logger.warning(
+                "Grid journal : %s %s grid lines no longer match grid config, ignored",
+                store.ticker, len(latest) - len(restored),
+                extra={"fields": {"ticker": store.ticker, "ignored": len(latest) - len(restored)}},
+            )
+        if restored:
+            indices = np.array([row[1] + store.offset for row in restored], dtype=np.int64)
+            store.set_order_ids(indices, [0 if row[3] == "0" else row[3] for row in restored])
+            for position, name in enumerate(NUMERIC_COLUMNS, start=4):
+                getattr(store, name)[indices] = [row[position] for row in restored]
+        self.track(_grid_line_manager, _journaled=True)
+        return len(restored)
+
+    def collect(self) -> list[tuple]:
+        """Rows of every grid line that changed since last collect, vectorized
+        diff of each store against its last journaled copy. Runs on the event
+        loop so it never sees a grid line half way through a transition"""
+        now = time.time()
+        rows = []
+        for ticker, (store, last, offset) in self._tracked.items():
+            if offset != store.offset or len(last["state"]) != len(store):
+                last = self._realign(store, last, offset)
+                self._tracked[ticker] = (store, last, store.offset)
+            changed = store.order_id != last["order_id"]
+            for name in NUMERIC_COLUMNS:
+                changed |= getattr(store, name) != last[name]
+            for index in np.flatnonzero(changed):
+                rows.append(
+                    (
+                        now,
+                        ticker,
+                        int(index) - store.offset,
+                        store.price.item(index),
+                        str(store.order_id[index]),
+                        *(getattr(store, name).item(index) for name in NUMERIC_COLUMNS),
+                    )
+                )
+                last["order_id"][index] = store.order_id[index]
+                for name in NUMERIC_COLUMNS:
+                    last[name][index] = getattr(store, name)[index]
+        return rows
+
+    @staticmethod
+    def _realign(
+        _store: GridLineStore, _last: dict[str, np.ndarray], _offset: int
+    ) -> dict[str, np.ndarray]:
+        """Pad copy of columns with initial state for lines a sliding grid added"""
+        below = _store.offset - _offset
+        above = len(_store) - len(_last["state"]) - below
+        return {
+            name: np.concatenate(
+                [np.zeros(below, dtype=column.dtype), column, np.zeros(above, dtype=column.dtype)]
+            )
+            for name, column in _last.items()
+        }
+
+    def write(self, _rows: list[tuple]):
+        """Append rows in one transaction"""
+        if not _rows:
+            return
+        with self._lock:
+            with self.connection:
+                self.connection.execute("BEGIN")
+                self.connection.executemany(
+                    f"INSERT INTO journal (time, {', '.join(ROW_COLUMNS)}) VALUES ({', '.join('?' * (len(ROW_COLUMNS) + 1))})",
+                    _rows,
+                )
+            self.rows_since_snapshot += len(_rows)
+
+    def flush(self) -> int:
+        """Collect and write changes now, returns rows written"""
+        rows = self.collect()
+        self.write(rows)
+        return len(rows)
+
+    def compact(self):
+        """Fold journal into snapshot (latest row per grid line) and empty it"""
+        columns = ", ".join(ROW_COLUMNS)
+        with self._lock:
+            with self.connection:
+                self.connection.execute("BEGIN")
+                self.connection.execute(
+                    f"""INSERT OR REPLACE INTO snapshot ({columns})
+                    SELECT {columns} FROM journal WHERE seq IN (
+                        SELECT MAX(seq) FROM journal GROUP BY ticker, level
+                    )"""
+                )
+                self.connection.execute("DELETE FROM journal")
+            self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self.rows_since_snapshot = 0
+
+    async def run(self):
+        """Flush every flush_interval seconds, compact once enough rows piled up"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            rows = self.collect()
+            await asyncio.to_thread(self.write, rows)
+            if self.rows_since_snapshot >= self.compact_after_rows:
+                await asyncio.to_thread(self.compact)
+
+    def close(self):
+        """Write pending changes and close database"""
+        self.flush()
+        with self._lock:
+            self.connection.close()
@@ -1,39 +1,312 @@
 # Standard Library Imports
 from __future__ import annotations
-from dataclasses import dataclass
-from functools import lru_cache
-import logging
-
-logging.basicConfig(
-    filename='DCALOGS.log',
-    format='%(asctime)s %(levelname)-8s %(message)s',
-    level=logging.INFO,
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Iterable, List, Tuple, Optional
+import logging, operator
+
 # Third Party Imports
-from typing import List, Tuple, Optional, Generic, TypeVar
+import numpy as np
+
+# Handlers are set up by bot_logging.setup_logging
+logger = logging.getLogger("dca.grid")
+
+# Max number of market prices each GridLineManager remembers the region for
+REGION_CACHE_SIZE = 1024
+
+# Distance between grids is rounded to this many decimals (0.001 == 0.1%)
+TP_DECIMALS = 3
+
+# GridLineStore.state bits
+BUY_ORDER_PLACED = 1
+SELL_ORDER_PLACED = 2
+BUY_ORDER_FILLED = 4
+SELL_ORDER_FILLED = 8
+
+
+class GridLineViews(dict):
+    """GridLine view of each row of a GridLineStore, created on first access so
+    a grid of any width costs nothing per line until its lines are used.
+    Indexing, slicing (returns a list), len and iteration behave like a list
+    of every view, a view that exists is a plain dict hit"""
+
+    def __init__(self, _store: GridLineStore):
+        super().__init__()
+        self.store = _store
+
+    def __getitem__(self, index):
+        if index.__class__ is slice:
+            return [self[_index] for _index in range(*index.indices(len(self.store)))]
+        return dict.__getitem__(self, index)
+
+    def __missing__(self, index: int) -> GridLine:
+        # numpy ints are stored as python ints, GridLine.index does arithmetic
+        index = operator.index(index)
+        n = len(self.store)
+        if not -n <= index < n:
+            raise IndexError("grid line index out of range")
+        if index < 0:
+            return self[index + n]
+        view = self[index] = GridLine(self.store, index)
+        return view
+
+    def __len__(self):
+        return len(self.store)
+
+    def __iter__(self):
+        for index in range(len(self.store)):
+            yield self.get(index) or self[index]
+
+    def views(self, _indices: List[int]) -> List[GridLine]:
+        """Views of _indices (python ints), existing views are fetched with
+        dict.get instead of going through __getitem__ one by one"""
+        _views = list(map(self.get, _indices))
+        if None in _views:
+            _views = [_view or self[_index] for _view, _index in zip(_views, _indices)]
+        return _views
+
+    def materialized(self) -> List[GridLine]:
+        """Views created so far"""
+        return list(self.values())
+
+    def extend(self, _below: int):
+        """Re-index created views after _below lines were added under the
+        store's first line, views keep pointing at their line"""
+        views = self.materialized()
+        self.clear()
+        for view in views:
+            view.index += _below
+            self[view.index] = view
+
+
+class GridLineStore:
+    """State of every grid line of a GridLineManager kept as numpy columns (one
+    row per grid line, sorted by price) instead of one object per grid line, so
+    questions about the whole grid are single vectorized operations.
+
+    GridLine objects are thin views over a row of the store"""
+
+    def __init__(self, _prices: List[float], _ticker: str = ""):
+        self.ticker = _ticker
+        self.price = np.asarray(_prices, dtype=np.float64)
+        # same prices as python floats, bisect and single reads on a list are
+        # faster than on the array (or a memoryview of it)
+        self.price_list: List[float] = self.price.tolist()
+        n = len(self.price)
+        # str ids as returned by exchange, 0 when grid line has no order.
+        # Written through set_order_id(s) so order_index stays in step
+        self.order_id = np.zeros(n, dtype=object)
+        # str(order id) -> row holding it, order events find their grid line
+        # in O(1). May keep ids a line no longer holds, see index_of_order
+        self.order_index: dict[str, int] = {}
+        self.total_buy_orders = np.zeros(n, dtype=np.int64)
+        self.total_sell_orders = np.zeros(n, dtype=np.int64)
+        self.total_cost = np.zeros(n, dtype=np.float64)
+        self.total_tokens = np.zeros(n, dtype=np.float64)
+        self.total_fee = np.zeros(n, dtype=np.float64)
+        # BUY_ORDER_PLACED | SELL_ORDER_PLACED | BUY_ORDER_FILLED | SELL_ORDER_FILLED
+        self.state = np.zeros(n, dtype=np.uint8)
+        # GridLine view of each row, created on first access
+        self.lines = GridLineViews(self)
+        # lines added below the initial grid, index - offset is a line's level
+        # which never changes (journal and names use it)
+        self.offset = 0
+
+    def __len__(self):
+        return len(self.price)
+
+    def extend(self, _below: List[float], _above: List[float]):
+        """Add grid lines in initial state below (ascending) and above the grid,
+        existing GridLine views are re-indexed and keep pointing at their line"""
+        _columns = {
+            "total_buy_orders": np.int64,
+            "total_sell_orders": np.int64,
+            "total_cost": np.float64,
+            "total_tokens": np.float64,
+            "total_fee": np.float64,
+            "state": np.uint8,
+            "order_id": object,
+        }
+        n_below, n_above = len(_below), len(_above)
+        self.price = np.concatenate(
+            [np.asarray(_below, dtype=np.float64), self.price, np.asarray(_above, dtype=np.float64)]
+        )
+        self.price_list = self.price.tolist()
+        for name, dtype in _columns.items():
+            setattr(
+                self,
+                name,
+                np.concatenate(
+                    [np.zeros(n_below, dtype=dtype), getattr(self, name), np.zeros(n_above, dtype=dtype)]
+                ),
+            )
+        self.offset += n_below
+        self.lines.extend(n_below)
+        # rebuilt from the column, which drops ids no grid line holds anymore
+        self.order_index = {
+            str(_order_id): _index for _index, _order_id in enumerate(self.order_id.tolist()) if _order_id != 0
+        }
+
+    def set_order_id(self, _index: int, _order_id: int | str):
+        """Order held by grid line _index, 0 for none"""
+        _old = self.order_id[_index]
+        self.order_id[_index] = _order_id
+        if _order_id != 0:
+            self.order_index[str(_order_id)] = _index
+        elif _old != 0:
+            self.order_index.pop(str(_old), None)
+
+    def set_order_ids(self, _indices: np.ndarray | List[int], _order_ids: np.ndarray | List):
+        """set_order_id for many grid lines at once. Ids they held before stay
+        in order_index until reused, index_of_order ignores them"""
+        self.order_id[_indices] = _order_ids
+        self.order_index.update(
+            (str(_order_id), _index)
+            for _index, _order_id in zip(np.asarray(_indices).tolist(), self.order_id[_indices].tolist())
+            if _order_id != 0
+        )
+
+    def index_of_order(self, _order_id: int | str) -> Optional[int]:
+        """Row holding order _order_id, None if no grid line has it"""
+        _order_id = str(_order_id)
+        _index = self.order_index.get(_order_id)
+        if _index is None or str(self.order_id[_index]) != _order_id:
+            return None
+        return _index
+
+    def has_state(self, _bits: int) -> np.ndarray:
+        """Mask of grid lines with any of _bits set"""
+        return (self.state & _bits) != 0
+
+    def set_state(self, _bits: int, _mask: np.ndarray | int, _value: bool):
+        if isinstance(_mask, int):
+            # single grid line, .item() avoids numpy scalar arithmetic
+            _state = self.state.item(_mask)
+            self.state[_mask] = _state | _bits if _value else _state & ~_bits
+            return
+        if _value:
+            self.state[_mask] |= _bits
+        else:
+            self.state[_mask] &= ~np.uint8(_bits)
+
 
+class GridLine:
+    """View of one row of a GridLineStore, reads and writes go straight to the
+    store's columns. One view exists per grid line so views can be compared
+    with `is` and last/next grid line always return the same objects"""
+
+    __slots__ = ("store", "index")
+
+    def __init__(self, _store: GridLineStore, _index: int):
+        self.store = _store
+        self.index = _index
 
-T = TypeVar("T")
-@dataclass
-class GridLine(Generic[T]):
     # Grid Info
-    name: str
-    price: float
-    order_id : int = 0
-    last_grid_line: Optional[GridLine[T]] = None
-    next_grid_line: Optional[GridLine[T]] = None
+    @property
+    def name(self) -> str:
+        return f"grid_line_{self.index - self.store.offset + 1}"
+
+    @property
+    def price(self) -> float:
+        return self.store.price_list[self.index]
+
+    @property
+    def order_id(self) -> int | str:
+        return self.store.order_id[self.index]
+
+    @order_id.setter
+    def order_id(self, _order_id: int | str):
+        self.store.set_order_id(self.index, _order_id)
+
+    @property
+    def last_grid_line(self) -> Optional[GridLine]:
+        return self.store.lines[self.index - 1] if self.index > 0 else None
+
+    @property
+    def next_grid_line(self) -> Optional[GridLine]:
+        if self.index + 1 < len(self.store):
+            return self.store.lines[self.index + 1]
+        return None
+
     # Grid stats
-    total_buy_orders: int = 0
-    total_sell_orders: int = 0
-    total_cost : float = 0
-    total_tokens : float = 0
-    total_fee : float = 0
+    @property
+    def total_buy_orders(self) -> int:
+        return self.store.total_buy_orders.item(self.index)
+
+    @total_buy_orders.setter
+    def total_buy_orders(self, _value: int):
+        self.store.total_buy_orders[self.index] = _value
+
+    @property
+    def total_sell_orders(self) -> int:
+        return self.store.total_sell_orders.item(self.index)
+
+    @total_sell_orders.setter
+    def total_sell_orders(self, _value: int):
+        self.store.total_sell_orders[self.index] = _value
+
+    @property
+    def total_cost(self) -> float:
+        return self.store.total_cost.item(self.index)
+
+    @total_cost.setter
+    def total_cost(self, _value: float):
+        self.store.total_cost[self.index] = _value
+
+    @property
+    def total_tokens(self) -> float:
+        return self.store.total_tokens.item(self.index)
+
+    @total_tokens.setter
+    def total_tokens(self, _value: float):
+        self.store.total_tokens[self.index] = _value
+
+    @property
+    def total_fee(self) -> float:
+        return self.store.total_fee.item(self.index)
+
+    @total_fee.setter
+    def total_fee(self, _value: float):
+        self.store.total_fee[self.index] = _value
+
     # Grid order status
-    buy_order_placed : Optional[bool] = False
-    sell_order_placed : Optional[bool] = False
-    buy_order_filled: Optional[bool] = False
-    sell_order_filled: Optional[bool] = False
+    def _get_state(self, _bit: int) -> bool:
+        return bool(self.store.state.item(self.index) & _bit)
+
+    def _set_state(self, _bit: int, _value: bool):
+        self.store.set_state(_bit, self.index, _value)
+
+    @property
+    def buy_order_placed(self) -> bool:
+        return self._get_state(BUY_ORDER_PLACED)
+
+    @buy_order_placed.setter
+    def buy_order_placed(self, _value: bool):
+        self._set_state(BUY_ORDER_PLACED, _value)
+
+    @property
+    def sell_order_placed(self) -> bool:
+        return self._get_state(SELL_ORDER_PLACED)
+
+    @sell_order_placed.setter
+    def sell_order_placed(self, _value: bool):
+        self._set_state(SELL_ORDER_PLACED, _value)
+
+    @property
+    def buy_order_filled(self) -> bool:
+        return self._get_state(BUY_ORDER_FILLED)
+
+    @buy_order_filled.setter
+    def buy_order_filled(self, _value: bool):
+        self._set_state(BUY_ORDER_FILLED, _value)
+
+    @property
+    def sell_order_filled(self) -> bool:
+        return self._get_state(SELL_ORDER_FILLED)
+
+    @sell_order_filled.setter
+    def sell_order_filled(self, _value: bool):
+        self._set_state(SELL_ORDER_FILLED, _value)
 
     def buy_order_success(self, _order_id:int):
         self.buy_order_placed = True
@@ -64,10 +337,30 @@ class GridLine(Generic[T]):
         self.order_id = 0
         self.ppp("Sell Order Triggerd")
 
+    def order_cancelled(self):
+        self.buy_order_placed = False
+        self.sell_order_placed = False
+        self.order_id = 0
+        self.ppp("Order Cancelled")
+
     def ppp(self,_action:str):
-        logging.info(f"{self.name} {_action}")
-        print(f"{self.name} {_action}")
-        logging.info(self.__repr__())
+        """Log state change as one structured event, message and json are built
+        on the logging thread from a snapshot of this grid line"""
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("%s %s", self.name, _action, extra={"fields": self.snapshot()})
+
+    def snapshot(self) -> dict:
+        return {
+            "ticker": self.store.ticker,
+            "grid_line": self.name,
+            "price": self.price,
+            "order_id": self.order_id,
+            "total_buy_orders": self.total_buy_orders,
+            "total_sell_orders": self.total_sell_orders,
+            "total_tokens": self.total_tokens,
+            # BUY_ORDER_PLACED | SELL_ORDER_PLACED | BUY_ORDER_FILLED | SELL_ORDER_FILLED bits
+            "state": self.store.state.item(self.index),
+        }
 
     def __str__(self):
         return f"""
@@ -108,6 +401,7 @@ class GridLineManager:  # Calculate Grid Lines and keeps track of between which
         _do_not_buy_above_this_price,
         _do_not_buy_below_this_price,
         _round_prices_to: int  ,
+        _window: Optional[int] = None,
     ):
         """Given a _grid_start_price (x) will generate grids with
         (_number_of_grids_on_each_side_of_grid_start_price)
@@ -115,7 +409,10 @@ class GridLineManager:  # Calculate Grid Lines and keeps track of between which
 
         _grid_start_price: price where to center grid around
         _distance_between_grids: Distance between each grid in percentage i.e (0.1 == 10%)
-        _round_prices_to: how many decimals the price of ticker is"""
+        _round_prices_to: how many decimals the price of ticker is
+        _window: sliding grid, only this many grid lines around market price
+                 hold orders and grid lines are added as price moves past the
+                 last one. None keeps every grid line of the static grid active"""
 
         # Total usd to spend per grid
         self.usd_to_buy_with = _usd_amount_to_buy_with
@@ -125,16 +422,27 @@ class GridLineManager:  # Calculate Grid Lines and keeps track of between which
 
         self.ticker = _ticker
         self.round_price_to = _round_prices_to
-        self.tp = round(_distance_between_grids, 3)
+        self.tp = round(_distance_between_grids, TP_DECIMALS)
         self.grids_on_each_side_of_grid_start_price = (
             _number_of_grids_on_each_side_of_grid_start_price
         )
         self.central_grid_price = round(_central_grid_price, _round_prices_to)
+        if _window is not None and _window < 2:
+            raise ValueError("window needs at least 2 grid lines")
+        self.window = _window
 
-        # First calculate grid lines list bcz it is used by create grid line objects
-        self.grid_lines = self.calculate_grid_lines()
+        # First calculate grid line prices bcz store and grid line objects are built on them
+        self.store = GridLineStore(self.calculate_grid_lines(), _ticker)
 
         self.grid_lines_as_objects = self.create_grid_line_objects()
+        # price in integer ticks of 10**-round_price_to -> index of grid line,
+        # built on first lookup and dropped when the grid grows
+        self._tick_index: Optional[dict[int, int]] = None
+        # ticks of every grid line (sorted like the prices) for grid_line_indices,
+        # built and dropped like _tick_index
+        self._ticks: Optional[np.ndarray] = None
+        # market price (rounded to round_price_to) -> index of lower grid line
+        self._region_cache: OrderedDict[float, int] = OrderedDict()
         self.current_grid_line_number = 0
         # self.max_number_of_grid_lines = 11
         self.do_not_buy_above_price: float = _do_not_buy_above_this_price
@@ -154,109 +462,269 @@ class GridLineManager:  # Calculate Grid Lines and keeps track of between which
         raise StopIteration
 
     def __getitem__(self, index):
-        if index < len(self.grid_lines_as_objects):
-            return self.grid_lines_as_objects[index]
-        raise IndexError("Index out of range")
+        # GridLineViews raises IndexError for an index out of range
+        return self.grid_lines_as_objects[index]
         
-    # @DEV for testing now
-    def grid_line_obj_map_price(self,_price:float)->GridLine:
-        for _grid in self.grid_lines_as_objects:
-            if _grid.price == float(_price) :
-                return _grid
-
-
-    def calculate_grid_lines(self) -> List[float]:
-        """
-        _grid_start_price : First price where grid should start spanning above
-                            and below as in mid point for grid i.e central_grid_price
-        """
-
-        _grid_start_price = self.central_grid_price
-        grid_lines: List[float] = [_grid_start_price]
-        _number_of_gridlines_on_each_side = self.grids_on_each_side_of_grid_start_price
-
-        # Grid line above mp
-        _next_line_price = _grid_start_price
-        # Grid line below mp
-        _last_line_price = _grid_start_price
-
-        # 5 grid lines above current mp
-        for _ in range(_number_of_gridlines_on_each_side):
-            _next_line_price = round(
-                _next_line_price + (_next_line_price * self.tp), self.round_price_to
-            )
-            grid_lines.append(_next_line_price)
-
-        # 5 grid lines below current mp
-        for _ in range(_number_of_gridlines_on_each_side):
-            _last_line_price = round(
-                _last_line_price - (_last_line_price * self.tp), self.round_price_to
-            )
-            grid_lines.append(_last_line_price)
-
-        grid_lines.sort()
-        return grid_lines
-
-    def create_grid_line_objects(self) -> List[GridLine]:
-        grid_lines = self.grid_lines
-        grid_lines_obj_list: List[GridLine] = []
-
-        for index, grid_line in enumerate(grid_lines, start=1):
-            current_grid_line = GridLine(
-                name=f"grid_line_{index}",  # here last grid line is first grid line
-                price=grid_line,
+    def price_to_tick(self, _price: float | str) -> int:
+        """Convert a price (float or string as returned by exchange) to an
+        integer number of ticks, a tick being 10**-round_price_to"""
+        return round(float(_price) * 10**self.round_price_to)
+
+    def create_tick_index(self) -> dict[int, int]:
+        # same rounding as price_to_tick, rint rounds half to even like round()
+        _ticks = np.rint(self.store.price * 10**self.round_price_to)
+        # built from the top so if rounding collapsed two grid lines onto one
+        # price the lower one wins, lines too far up for int64 ticks are left out
+        _indices = np.flatnonzero(_ticks < 2**62)[::-1]
+        return dict(zip(_ticks[_indices].astype(np.int64).tolist(), _indices.tolist()))
+
+    def tick_index(self) -> dict[int, int]:
+        """price_to_tick(price) -> index of the grid line at that price"""
+        if self._tick_index is None:
+            self._tick_index = self.create_tick_index()
+        return self._tick_index
+
+    def grid_line_index(self, _price: float | str) -> Optional[int]:
+        """Index of grid line placed at _price or None, doesn't create its view"""
+        return self.tick_index().get(self.price_to_tick(_price))
+
+    def grid_line_indices(self, _prices: Iterable[float | str]) -> np.ndarray:
+        """grid_line_index of many prices in one go, -1 where no grid line is"""
+        if self._ticks is None:
+            self._ticks = np.rint(self.store.price * 10**self.round_price_to)
+        _ticks = np.rint(np.asarray(_prices, dtype=np.float64) * 10**self.round_price_to)
+        # leftmost match so the lower of two collapsed grid lines wins, like create_tick_index
+        _indices = np.searchsorted(self._ticks, _ticks)
+        _found = self._ticks.take(_indices, mode="clip") == _ticks
+        return np.where(_found, _indices, -1)
+
+    def grid_line_obj_map_price(self, _price: float | str) -> Optional[GridLine]:
+        """Returns GridLine placed at _price or None if no grid line is at that price"""
+        # grid_line_index inlined, it is called for every order of every cycle
+        _tick_index = self._tick_index
+        if _tick_index is None:
+            _tick_index = self.tick_index()
+        _index = _tick_index.get(round(float(_price) * 10**self.round_price_to))
+        if _index is None:
+            return None
+        # .get skips the slice check of GridLineViews.__getitem__ once the view exists
+        _lines = self.grid_lines_as_objects
+        return _lines.get(_index) or _lines[_index]
+
+
+    def grid_prices(self, _steps: Iterable[int] | np.ndarray) -> np.ndarray:
+        """Prices of the grid lines _steps grid lines away from central grid
+        price (negative below). Closed form, central * (1 + tp)**step above and
+        central * (1 - tp)**-step below rounded once, so any grid line is
+        computed directly and rounding error doesn't add up line after line"""
+        _steps = np.asarray(_steps, dtype=np.int64)
+        _prices = self.central_grid_price * np.power(
+            np.where(_steps < 0, 1 - self.tp, 1 + self.tp), np.abs(_steps)
+        )
+        # multiply/rint/divide like np.round without its per call overhead, which
+        # dominates for small grids. rint rounds exact halves to even where
+        # round() goes by the unscaled price (0.95 is 0.9499.. so 0.9 at 1
+        # decimal, 9.5 rounds to 10), those few lines are rounded by round()
+        _scale = 10.0**self.round_price_to
+        _scaled = _prices * _scale
+        _rounded = np.rint(_scaled)
+        _halves = np.flatnonzero(np.abs(_scaled - _rounded) == 0.5).tolist()
+        _rounded /= _scale
+        for _index in _halves:
+            _rounded[_index] = round(_prices.item(_index), self.round_price_to)
+        return _rounded
+
+    def calculate_grid_lines(self) -> np.ndarray:
+        """Sorted prices of the initial grid, central_grid_price and
+        grids_on_each_side_of_grid_start_price lines above and below it"""
+        _n = self.grids_on_each_side_of_grid_start_price
+        return self.grid_prices(np.arange(-_n, _n + 1))
+
+    @property
+    def first_step(self) -> int:
+        """Step (see grid_prices) of the lowest grid line"""
+        return -(self.grids_on_each_side_of_grid_start_price + self.store.offset)
+
+    @property
+    def grid_lines(self) -> List[float]:
+        """Sorted grid line prices"""
+        return self.store.price.tolist()
+
+    def create_grid_line_objects(self) -> GridLineViews:
+        """GridLine views of self.store ordered by price so grid_line_1 is the
+        lowest grid line, each view is created on first access"""
+        self.store.lines = GridLineViews(self.store)
+        return self.store.lines
+
+    def snap_to_decimals(self, _decimals: int) -> bool:
+        """Round every grid price to _decimals when the exchange's price tick is
+        coarser than round_price_to, so prices it returns land on a grid line.
+        Only before any order is tracked, returns True if prices changed"""
+        if _decimals >= self.round_price_to:
+            return False
+        if self.store.state.any() or self.store.offset:
+            raise ValueError("grid prices can only be snapped before any order is tracked")
+        self.round_price_to = _decimals
+        self.central_grid_price = round(self.central_grid_price, _decimals)
+        self.store = GridLineStore(self.calculate_grid_lines(), self.ticker)
+        self.grid_lines_as_objects = self.create_grid_line_objects()
+        self._tick_index = None
+        self._ticks = None
+        self._region_cache.clear()
+        return True
+
+    def extend_to(self, _price: float) -> int:
+        """Sliding grid only: add grid lines until there are window lines on
+        each side of _price, returns number of lines added.
+
+        The grid grows by at least its current size each time so creating a
+        line is amortized O(1), existing GridLines keep their state. New prices
+        come from grid_prices in bulk"""
+        if not self.window:
+            return 0
+        store = self.store
+        n = len(store)
+        _first_step = self.first_step
+        # lines at or below _price are 0.._index
+        _index = bisect_right(store.price_list, _price) - 1
+
+        _below = np.empty(0)
+        _missing = self.window - (_index + 1)
+        _count = max(n, _missing)
+        while _missing > 0:
+            _prices = self.grid_prices(np.arange(_first_step - _count, _first_step))
+            # rounding collapses grid lines together far below, there are no
+            # lower lines than the last distinct positive one
+            _collapsed = np.flatnonzero(
+                (_prices <= 0) | (_prices >= np.append(_prices[1:], store.price_list[0]))
             )
-            grid_lines_obj_list.append(current_grid_line)
-
-        # next Grid Line above current grid line  3
-        # current Grid Line current grid line     2
-        # last Grid Line below current grid line  1
-
-        # add next/last properties to grid line objects making them a linked list with referances
-        # to last and next grid lines
-        for index, grid_line_obj in enumerate(grid_lines_obj_list):
-
-            try:
-                next_grid_line = grid_lines_obj_list[index + 1]
-            except IndexError as e:
-                next_grid_line = None
-
-            current_grid_line = grid_line_obj
-            last_grid_line = grid_lines_obj_list[index - 1] if index > 0 else None
-
-            current_grid_line.next_grid_line = next_grid_line
-            current_grid_line.last_grid_line = last_grid_line
-
-        return grid_lines_obj_list
+            _below = _prices[_collapsed[-1] + 1 :] if len(_collapsed) else _prices
+            if len(_below) < _count or np.count_nonzero(_below <= _price) >= _missing:
+                break
+            _count *= 2
+
+        _above = np.empty(0)
+        _missing = self.window - (n - 1 - _index)
+        _count = max(n, _missing)
+        while _missing > 0:
+            _above = self.grid_prices(np.arange(_first_step + n, _first_step + n + _count))
+            _above = _above[np.isfinite(_above)]
+            if len(_above) < _count or np.count_nonzero(_above > _price) >= _missing:
+                break
+            _count *= 2
+
+        if not (len(_below) or len(_above)):
+            return 0
+        store.extend(_below, _above)
+        self.grid_lines_as_objects = store.lines
+        # indices moved, tick index is rebuilt on next lookup
+        self._tick_index = None
+        self._ticks = None
+        # cached indices moved or were clamped to the old last region
+        self._region_cache.clear()
+        return len(_below) + len(_above)
+
+    def window_range(self, _mp: float) -> Tuple[int, int]:
+        """[first, last] index of the grid lines allowed to hold orders, window//2
+        lines at or below _mp and the rest above. Whole grid for static grids"""
+        if not self.window:
+            return 0, len(self.store) - 1
+        _first = max(self.get_region_index(_mp) - self.window // 2 + 1, 0)
+        return _first, min(_first + self.window - 1, len(self.store) - 1)
+
+    def window_mask(self, _mp: float) -> np.ndarray:
+        _first, _last = self.window_range(_mp)
+        _mask = np.zeros(len(self.store), dtype=bool)
+        _mask[_first : _last + 1] = True
+        return _mask
+
+    def grid_lines_outside_window(self, _mp: float) -> List[GridLine]:
+        """Grid lines holding an order that the window moved away from"""
+        _mask = self.store.has_state(BUY_ORDER_PLACED | SELL_ORDER_PLACED) & ~self.window_mask(_mp)
+        return self.grid_lines_as_objects.views(np.flatnonzero(_mask).tolist())
+
+    def grid_lines_to_resell(self, _mp: float) -> List[GridLine]:
+        """Grid lines inside the window whose grid line below holds bought
+        tokens but which have no sell order, i.e the sell was retired when the
+        window moved away and has to be placed again"""
+        store = self.store
+        _mask = np.zeros(len(store), dtype=bool)
+        _mask[1:] = store.has_state(BUY_ORDER_FILLED)[:-1]
+        _mask &= ~store.has_state(BUY_ORDER_PLACED | SELL_ORDER_PLACED) & self.window_mask(_mp)
+        return self.grid_lines_as_objects.views(np.flatnonzero(_mask).tolist())
+
+    def buy_bounds_mask(self) -> np.ndarray:
+        """Mask of grid lines inside do_not_buy prices"""
+        price = self.store.price
+        return (self.do_not_buy_below_price <= price) & (price <= self.do_not_buy_above_price)
+
+    def grid_lines_with_orders(self) -> List[GridLine]:
+        """Grid lines with a buy or sell order placed"""
+        _mask = self.store.has_state(BUY_ORDER_PLACED | SELL_ORDER_PLACED)
+        return self.grid_lines_as_objects.views(np.flatnonzero(_mask).tolist())
+
+    def grid_line_by_order_id(self, _order_id) -> Optional[GridLine]:
+        """Grid line holding order _order_id, None if no grid line has it"""
+        _index = self.store.index_of_order(_order_id)
+        if _index is None or not self.store.state.item(_index) & (BUY_ORDER_PLACED | SELL_ORDER_PLACED):
+            return None
+        return self.grid_lines_as_objects[_index]
+
+    def free_grid_lines_below(
+        self, _price: float, _exclude: Iterable[GridLine] = ()
+    ) -> List[GridLine]:
+        """Grid lines below _price inside do_not_buy prices (and the window of a
+        sliding grid) with no order placed and nothing bought, i.e where a new
+        buy order can go"""
+        store = self.store
+        _mask = (
+            (store.price < _price)
+            & self.buy_bounds_mask()
+            & ~store.has_state(BUY_ORDER_PLACED | SELL_ORDER_PLACED | BUY_ORDER_FILLED)
+        )
+        if self.window:
+            _mask &= self.window_mask(_price)
+        _excluded = [_grid.index for _grid in _exclude]
+        if _excluded:
+            _mask[_excluded] = False
+        return self.grid_lines_as_objects.views(np.flatnonzero(_mask).tolist())
+
+    def get_region_index(self, market_price: float) -> int:
+        """Index of the lower grid line of the region market_price is in, the
+        upper grid line is always index + 1.
+
+        Binary search on the sorted price column so lookup is O(log n), prices below
+        the lowest or above the highest grid line are clamped to the first/last
+        region. Results are kept in a per manager LRU cache of REGION_CACHE_SIZE"""
+
+        _price = round(float(market_price), self.round_price_to)
+        _index = self._region_cache.get(_price)
+        if _index is not None:
+            self._region_cache.move_to_end(_price)
+            return _index
+
+        # grid_lines[_index] <= _price < grid_lines[_index + 1]
+        _index = bisect_right(self.store.price_list, _price) - 1
+        _index = min(max(_index, 0), len(self.store) - 2)
+
+        self._region_cache[_price] = _index
+        if len(self._region_cache) > REGION_CACHE_SIZE:
+            self._region_cache.popitem(last=False)
+        return _index
 
-    @lru_cache
     def get_region(self, market_price: float) -> Tuple[float, float]:
         """
-        For Later Use when Implement Dynamic Grids Which have Ability to Move with
-        prices @Dev not used anywhere for now
-        Returns (lower grid, upper grid)
+        Returns (lower grid, upper grid) prices bracketing market_price
         market_price : current mp
         """
-
-        grid_lines = self.grid_lines
-        # generates a list[(grid_lines, disctance)]
-        distances = list(
-            zip(
-                grid_lines,
-                map(
-                    lambda _x: round(abs(market_price - _x), self.round_price_to),
-                    grid_lines,
-                ),
-            )
+        _index = self.get_region_index(market_price)
+        _prices = self.store.price_list
+        return _prices[_index], _prices[_index + 1]
+
+    def get_region_grid_lines(self, market_price: float) -> Tuple[GridLine, GridLine]:
+        """Same as get_region but returns (lower, upper) GridLine objects"""
+        _index = self.get_region_index(market_price)
+        return (
+            self.grid_lines_as_objects[_index],
+            self.grid_lines_as_objects[_index + 1],
         )
-        # Sort list based on distances @Dev lines are sorted based on distances,
-        # lower distance to mp doesn't
-        # equate to grid lines is lower then mp
-        distances.sort(key=lambda _x: _x[1])
-        lower_grid = distances[0][0]
-        upper_grid = distances[1][0]
-
-        if lower_grid > upper_grid:
-            return upper_grid, lower_grid
-
-        return lower_grid, upper_grid
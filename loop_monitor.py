@@ -0,0 +1,202 @@
+# Event loop lag monitor and on demand profiling of the running bot
+#   monitor = LoopMonitor()
+#   monitor.start()          # on the event loop, kill -USR1 <pid> profiles for 30s
+# A watchdog thread logs the stack of any callback blocking the loop longer
+# than _threshold, profiles are written as .pstats (cProfile) and .folded
+# (sampled stacks, flamegraph.pl / speedscope input)
+from collections import Counter
+from typing import Optional
+import asyncio, cProfile, logging, os, signal, sys, threading, time, traceback
+
+# Internal Imports
+from metrics import REGISTRY, Gauge, Histogram
+
+# seconds, lag buckets start where a loop stall starts to matter
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+PROFILE_SECONDS = 30
+# seconds between stack samples while profiling
+SAMPLE_INTERVAL = 0.005
+PROFILE_DIR = "profiles"
+
+LOOP_LAG_SECONDS: Histogram = REGISTRY.register(
+    Histogram("dca_loop_lag_seconds", "How late the event loop ran a timer", _buckets=LAG_BUCKETS)
+)
+LOOP_LAG_MAX_SECONDS: Gauge = REGISTRY.register(
+    Gauge("dca_loop_lag_max_seconds", "Longest event loop lag since start")
+)
+
+logger = logging.getLogger("dca.loop")
+
+
+def frame_stack(_frame) -> list[str]:
+    """Outermost first, module:function:line of each frame"""
+    return [
+        f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}:{line}"
+        for frame, line in traceback.walk_stack(_frame)
+    ][::-1]
+
+
+class LoopMonitor:
+    """Measures how late the loop wakes up a timer every _interval seconds,
+    anything above zero is time some callback held the loop.
+
+    A daemon thread watches the heartbeat of that timer, once it is older than
+    _threshold the loop thread is stuck in one callback and its current stack
+    is logged (once per stall) to the dca.loop logger"""
+
+    def __init__(
+        self,
+        _interval: float = 0.1,
+        _threshold: float = 0.1,
+        _profile_signal: Optional[int] = getattr(signal, "SIGUSR1", None),
+        _profile_seconds: float = PROFILE_SECONDS,
+        _profile_dir: str = PROFILE_DIR,
+        _profile_on_start: bool = False,
+    ):
+        """_interval: seconds between lag measurements
+        _threshold: seconds a callback may block before its stack is logged
+        _profile_signal: signal that starts a profile window, None to not listen
+        _profile_seconds: length of a profile window
+        _profile_on_start: start a profile window as soon as the monitor starts"""
+        self.interval = _interval
+        self.threshold = _threshold
+        self.profile_signal = _profile_signal
+        self.profile_seconds = _profile_seconds
+        self.profile_dir = _profile_dir
+        self.profile_on_start = _profile_on_start
+        self.max_lag = 0.0
+        # stalls longer than threshold seen by the watchdog
+        self.stalls = 0
+        self.heartbeat = time.monotonic()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread_id: Optional[int] = None
+        self.profile: Optional[Profile] = None
+        self._tasks: list[asyncio.Task] = []
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start measuring, call from a coroutine running on the loop to watch"""
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.heartbeat = time.monotonic()
+        self._stop.clear()
+        self._tasks.append(self.loop.create_task(self.run()))
+        self._watchdog = threading.Thread(target=self.watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        if self.profile_signal is not None and threading.current_thread() is threading.main_thread():
+            self.loop.add_signal_handler(self.profile_signal, self.start_profile)
+        if self.profile_on_start:
+            self.start_profile()
+
+    async def stop(self):
+        self._stop.set()
+        if self.profile_signal is not None and threading.current_thread() is threading.main_thread():
+            self.loop.remove_signal_handler(self.profile_signal)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        if self._watchdog is not None:
+            self._watchdog.join()
+
+    async def run(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.heartbeat = now = time.monotonic()
+            lag = max(now - start - self.interval, 0.0)
+            LOOP_LAG_SECONDS.observe(lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+                LOOP_LAG_MAX_SECONDS.set(lag)
+
+    def watch(self):
+        """Watchdog thread, logs the loop thread's stack once per stall"""
+        reported = None
+        while not self._stop.wait(self.threshold / 2):
+            heartbeat = self.heartbeat
+            blocked = time.monotonic() - heartbeat - self.interval
+            if blocked <= self.threshold or reported == heartbeat:
+                continue
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is None:
+                continue
+            reported = heartbeat
+            self.stalls += 1
+            stack = frame_stack(frame)
+            logger.warning(
+                "Event loop blocked for %.3fs in %s",
+                blocked, stack[-1] if stack else "?",
+                extra={"fields": {"blocked_seconds": round(blocked, 3), "stack": stack}},
+            )
+
+    def start_profile(self, _seconds: Optional[float] = None) -> Optional["Profile"]:
+        """Profile the loop thread for _seconds (profile_seconds by default),
+        ignored while a profile is running. Files are written when it ends"""
+        if self.profile is not None:
+            return None
+        self.profile = Profile(self.loop_thread_id, self.profile_dir)
+        self.profile.start()
+        logger.warning("Profiling event loop for %ss", _seconds or self.profile_seconds)
+        self._tasks.append(self.loop.create_task(self._end_profile(_seconds or self.profile_seconds)))
+        return self.profile
+
+    async def _end_profile(self, _seconds: float):
+        try:
+            await asyncio.sleep(_seconds)
+        finally:
+            profile, self.profile = self.profile, None
+            if profile is not None and profile.running:
+                profile.stop()
+                pstats_path, folded_path = await asyncio.to_thread(profile.write)
+                logger.warning("Profile written to %s and %s", pstats_path, folded_path)
+
+
+class Profile:
+    """cProfile of the loop thread plus stack samples taken by a thread every
+    SAMPLE_INTERVAL, folded as "outer;...;inner count" lines per distinct stack.
+    Both see every callback the loop runs, ticker_watcher and manage_trades
+    cycles show up under their coroutine frames. A sample is taken when the
+    loop thread lets go of the GIL, callbacks shorter then the switch interval
+    (5ms) mostly land on the selector, the pstats file has those"""
+
+    def __init__(self, _thread_id: int, _directory: str = PROFILE_DIR):
+        self.thread_id = _thread_id
+        self.directory = _directory
+        self.profiler = cProfile.Profile()
+        self.samples: Counter[str] = Counter()
+        self.running = False
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    def start(self):
+        """Call on the thread to profile"""
+        self.running = True
+        self.profiler.enable()
+        self._sampler = threading.Thread(target=self.sample, name="loop-sampler", daemon=True)
+        self._sampler.start()
+
+    def sample(self):
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[";".join(frame_stack(frame))] += 1
+
+    def stop(self):
+        """Call on the profiled thread, cProfile only stops for the thread calling disable"""
+        self.profiler.disable()
+        self.running = False
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+
+    def write(self) -> tuple[str, str]:
+        """Write files of a stopped profile, returns (pstats path, folded path)"""
+        os.makedirs(self.directory, exist_ok=True)
+        prefix = os.path.join(self.directory, f"profile-{os.getpid()}-{int(time.time() * 1000)}")
+        self.profiler.dump_stats(prefix + ".pstats")
+        with open(prefix + ".folded", "w") as folded:
+            for stack, count in self.samples.most_common():
+                folded.write(f"{stack} {count}\n")
+        return prefix + ".pstats", prefix + ".folded"
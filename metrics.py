@@ -0,0 +1,180 @@
+# Prometheus style metrics of the bot, served as text on a local HTTP endpoint
+#   runner = await start_metrics_server(9108)   # GET http://127.0.0.1:9108/metrics
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+import time
+
+# Third Party Imports
+from aiohttp import web
+
+METRICS_PORT = 9108
+# seconds, Prometheus client defaults
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(_value: str) -> str:
+    return _value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_labels(_names: tuple[str, ...], _values: tuple[str, ...], _extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(_names, _values)]
+    if _extra:
+        pairs.append(_extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(_value: float) -> str:
+    if _value == float("inf"):
+        return "+Inf"
+    return repr(float(_value)) if not float(_value).is_integer() else str(int(_value))
+
+
+class Metric:
+    """Base of every metric, samples are kept per tuple of label values"""
+
+    kind = "untyped"
+
+    def __init__(self, _name: str, _help: str, _labels: tuple[str, ...] = ()):
+        self.name = _name
+        self.help = _help
+        self.label_names = _labels
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self.samples()
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, _name: str, _help: str, _labels: tuple[str, ...] = ()):
+        super().__init__(_name, _help, _labels)
+        self.values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *_label_values: str, _amount: float = 1):
+        self.values[_label_values] = self.values.get(_label_values, 0) + _amount
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in self.values.items():
+            yield f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, _value: float, *_label_values: str):
+        self.values[_label_values] = _value
+
+
+class Histogram(Metric):
+    """Counts observations per bucket, each observe is one bisect and two adds.
+    Buckets are made cumulative only when rendered"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        _name: str,
+        _help: str,
+        _labels: tuple[str, ...] = (),
+        _buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        super().__init__(_name, _help, _labels)
+        self.buckets = tuple(sorted(_buckets))
+        # label values -> [count per bucket (+Inf last)..., sum]
+        self.values: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, _value: float, *_label_values: str):
+        counts = self.values.get(_label_values)
+        if counts is None:
+            counts = self.values[_label_values] = [0] * (len(self.buckets) + 2)
+        # le buckets, a value equal to a bound falls in that bucket
+        counts[bisect_left(self.buckets, _value)] += 1
+        counts[-1] += _value
+
+    @contextmanager
+    def time(self, *_label_values: str):
+        """Observe seconds spent in the with block, also when it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *_label_values)
+
+    def count(self, *_label_values: str) -> int:
+        counts = self.values.get(_label_values)
+        return int(sum(counts[:-1])) if counts else 0
+
+    def samples(self) -> Iterator[str]:
+        for labels, counts in self.values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.label_names, labels)} {_format_value(counts[-1])}"
+            yield f"{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}"
+
+
+class Registry:
+    """Metrics rendered by the endpoint, collectors are called right before
+    rendering to refresh gauges that are cheaper to compute on scrape"""
+
+    def __init__(self):
+        self.metrics: dict[str, Metric] = {}
+        self.collectors: list[Callable[[], None]] = []
+
+    def register(self, _metric: Metric) -> Metric:
+        self.metrics[_metric.name] = _metric
+        return _metric
+
+    def add_collector(self, _collector: Callable[[], None]):
+        if _collector not in self.collectors:
+            self.collectors.append(_collector)
+
+    def render(self) -> str:
+        for collector in self.collectors:
+            collector()
+        lines = [line for metric in self.metrics.values() for line in metric.render()]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+API_CALL_SECONDS: Histogram = REGISTRY.register(
+    Histogram("dca_api_call_seconds", "Exchange call latency incl. rate limit wait", ("exchange", "method"))
+)
+API_ERRORS: Counter = REGISTRY.register(
+    Counter("dca_api_errors_total", "Exchange error responses by label", ("exchange", "label"))
+)
+MANAGE_TRADES_SECONDS: Histogram = REGISTRY.register(
+    Histogram("dca_manage_trades_seconds", "Duration of one manage_trades cycle", ("exchange", "ticker"))
+)
+PRICE_STALENESS_SECONDS: Gauge = REGISTRY.register(
+    Gauge("dca_price_staleness_seconds", "Seconds since price feed last reported the ticker", ("exchange", "ticker"))
+)
+
+
+async def start_metrics_server(
+    _port: int = METRICS_PORT, _host: str = "127.0.0.1", _registry: Optional[Registry] = None
+) -> web.AppRunner:
+    """Serve GET /metrics until runner.cleanup() is awaited"""
+    _registry = _registry or REGISTRY
+
+    async def metrics(_request: web.Request) -> web.Response:
+        return web.Response(
+            text=_registry.render(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, _host, _port).start()
+    return runner
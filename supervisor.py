@@ -0,0 +1,237 @@
+# Run grids sharded across worker processes
+#   Supervisor(grid_configs, _shards=4).run()
+# One price feed process publishes prices into a shared memory PriceBoard which
+# every shard process reads, order throughput of all processes is held to one
+# global rate budget by shared token buckets
+from multiprocessing.connection import wait
+from typing import Literal, Optional
+import asyncio, multiprocessing, os, signal, threading, time
+
+# Internal Imports
+from bot_logging import LOG_FILE, setup_logging
+from exchanges import GATEIO_HOST, GATEIO_WS_URL
+from exchanges.gateio import GateIOConnector, GateIOManager
+from exchanges.gateio_ws import GateIOPriceStream
+from exchanges.price_board import BoardPriceUpdate, PriceBoard
+from exchanges.rate_limiter import RequestScheduler, SharedTokenBucket, shared_buckets
+from grid_journal import GRID_JOURNAL_FILE, GridJournal
+from grid_line_machine import GridLineManager
+from loop_monitor import LoopMonitor
+
+# seconds between REST polls of the price feed process
+PRICE_POLL_INTERVAL = 2
+
+
+def grid_line_count(_grid_config: dict) -> int:
+    """Lines a grid tracks, what a shard's load is balanced on"""
+    return _grid_config.get("_window") or (
+        2 * _grid_config["_number_of_grids_on_each_side_of_grid_start_price"] + 1
+    )
+
+
+def shard_grid_configs(_grid_configs: list[dict], _shards: int) -> list[list[dict]]:
+    """Split GridLineManager arguments into at most _shards groups of about the
+    same number of grid lines, biggest grids go first to the least loaded shard"""
+    shards: list[list[dict]] = [[] for _ in range(min(_shards, len(_grid_configs)))]
+    loads = [0] * len(shards)
+    for config in sorted(_grid_configs, key=grid_line_count, reverse=True):
+        index = loads.index(min(loads))
+        shards[index].append(config)
+        loads[index] += grid_line_count(config)
+    return shards
+
+
+def shard_log_path(_log_path: str, _name: str) -> str:
+    """DCALOGS.log -> DCALOGS.shard-0.log, one file per process so rotation
+    never races between processes"""
+    root, extension = os.path.splitext(_log_path)
+    return f"{root}.{_name}{extension}"
+
+
+async def publish_prices(
+    _board: PriceBoard,
+    _buckets: dict[str, SharedTokenBucket],
+    _price_feed: Literal["websocket", "rest"],
+    _ws_url: str,
+    _host: str,
+):
+    """Price feed for every ticker on the board, each change is published to it"""
+    prices_objects = {ticker: BoardPriceUpdate(ticker, board=_board) for ticker in _board.tickers}
+    if _price_feed == "websocket":
+        await GateIOPriceStream(prices_objects, _ws_url).run()
+        return
+
+    giom = GateIOManager(_scheduler=RequestScheduler(_buckets=_buckets), _host=_host)
+    try:
+        while True:
+            try:
+                prices = await giom.fetch_prices(_board.tickers)
+                for ticker, price in prices.items():
+                    prices_objects[ticker].set_market_price(float(price))
+            except Exception as e:
+                print(f"Price feed error Reconnecting in 3 ... {e}")
+                await asyncio.sleep(3)
+            await asyncio.sleep(PRICE_POLL_INTERVAL)
+    finally:
+        await giom.close()
+
+
+async def _cancel_on_sigterm(_coroutine):
+    """Run _coroutine, SIGTERM cancels it so its finally blocks (journal close,
+    session close) run before the process exits"""
+    task = asyncio.ensure_future(_coroutine)
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, task.cancel)
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def run_price_feed(
+    _board: PriceBoard,
+    _buckets: dict[str, SharedTokenBucket],
+    _price_feed: Literal["websocket", "rest"],
+    _ws_url: str,
+    _host: str,
+    _log_path: str,
+):
+    """Price feed process"""
+    setup_logging(_path=_log_path)
+    asyncio.run(_cancel_on_sigterm(publish_prices(_board, _buckets, _price_feed, _ws_url, _host)))
+
+
+def run_shard(
+    _grid_configs: list[dict],
+    _board: PriceBoard,
+    _buckets: dict[str, SharedTokenBucket],
+    _host: str,
+    _journal_path: Optional[str],
+    _log_path: str,
+    _metrics_port: Optional[int] = None,
+    _ws_url: Optional[str] = None,
+):
+    """Shard process, one GateIOConnector over its grids reading prices from the board.
+    _ws_url: fills of the shard's grids come from the order stream there, polled if None"""
+    setup_logging(_path=_log_path)
+    managers = [GridLineManager(**config) for config in _grid_configs]
+    connector = GateIOConnector(
+        *managers,
+        _host=_host,
+        _journal=GridJournal(_journal_path) if _journal_path else None,
+        _ws_url=_ws_url,
+        _price_board=_board,
+        _order_stream=_ws_url is not None,
+        _scheduler=RequestScheduler(_buckets=_buckets),
+        _metrics_port=_metrics_port,
+        # kill -USR1 <shard pid> profiles that shard
+        _loop_monitor=LoopMonitor(),
+    )
+    asyncio.run(_cancel_on_sigterm(connector.entry_point()))
+
+
+class Supervisor:
+    """Starts the price feed and shard processes, restarts any that exit until
+    stop() is called (or the supervisor gets Ctrl+C / SIGTERM). Restarted shards
+    pick up their grid state from the journal"""
+
+    def __init__(
+        self,
+        _grid_configs: list[dict],
+        _shards: Optional[int] = None,
+        _price_feed: Literal["websocket", "rest"] = "websocket",
+        _ws_url: str = GATEIO_WS_URL,
+        _host: str = GATEIO_HOST,
+        _journal_path: Optional[str] = GRID_JOURNAL_FILE,
+        _log_path: str = LOG_FILE,
+        _rate_limits: Optional[dict[str, tuple[float, int]]] = None,
+        _restart_delay: float = 1.0,
+        _metrics_port: Optional[int] = None,
+    ):
+        """_grid_configs: GridLineManager keyword arguments of each grid, grids
+                          are built inside their shard process
+        _shards: worker processes, defaults to number of cores
+        _journal_path: None runs without journal (shards restart from scratch)
+        _rate_limits: global budget of every process together, per endpoint class
+        _metrics_port: shard n serves its metrics on _metrics_port + n"""
+        self.shards = shard_grid_configs(_grid_configs, _shards or os.cpu_count() or 1)
+        self.tickers = [config["_ticker"] for config in _grid_configs]
+        self.price_feed = _price_feed
+        self.ws_url = _ws_url
+        self.host = _host
+        self.journal_path = _journal_path
+        self.log_path = _log_path
+        self.rate_limits = _rate_limits
+        self.restart_delay = _restart_delay
+        self.metrics_port = _metrics_port
+        # spawn, forking a process with running threads (log listener) isn't safe
+        self.context = multiprocessing.get_context("spawn")
+        self.processes: dict[str, multiprocessing.Process] = {}
+        # process name -> number of times it was restarted
+        self.restarts: dict[str, int] = {}
+        self._stop = threading.Event()
+
+    def process_targets(self, _board: PriceBoard, _buckets: dict[str, SharedTokenBucket]) -> dict:
+        """process name -> (target, args)"""
+        targets = {
+            "price-feed": (
+                run_price_feed,
+                (_board, _buckets, self.price_feed, self.ws_url, self.host,
+                 shard_log_path(self.log_path, "price-feed")),
+            )
+        }
+        for index, grid_configs in enumerate(self.shards):
+            name = f"shard-{index}"
+            targets[name] = (
+                run_shard,
+                (grid_configs, _board, _buckets, self.host, self.journal_path,
+                 shard_log_path(self.log_path, name),
+                 None if self.metrics_port is None else self.metrics_port + index,
+                 # every shard streams the order events of its own grids
+                 self.ws_url if self.price_feed == "websocket" else None),
+            )
+        return targets
+
+    def start(self, _name: str, _target, _args: tuple):
+        process = self.context.Process(target=_target, args=_args, name=_name, daemon=True)
+        process.start()
+        self.processes[_name] = process
+
+    def run(self):
+        """Block until stop(), Ctrl+C or SIGTERM"""
+        board = PriceBoard.create(self.tickers)
+        buckets = shared_buckets(self.rate_limits, self.context)
+        targets = self.process_targets(board, buckets)
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *_: self.stop())
+        try:
+            for name, (target, args) in targets.items():
+                self.start(name, target, args)
+            while not self._stop.is_set():
+                # wake up when a process exits, or now and then to check _stop
+                wait([process.sentinel for process in self.processes.values()], timeout=0.2)
+                for name, process in list(self.processes.items()):
+                    if process.is_alive() or self._stop.is_set():
+                        continue
+                    print(f"Supervisor : {name} exited with {process.exitcode} restarting in {self.restart_delay} ...")
+                    self.restarts[name] = self.restarts.get(name, 0) + 1
+                    time.sleep(self.restart_delay)
+                    self.start(name, *targets[name])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.shutdown()
+            board.close()
+            board.unlink()
+
+    def stop(self):
+        self._stop.set()
+
+    def shutdown(self, _timeout: float = 10):
+        """SIGTERM every process (they close journal and sessions) and wait for them"""
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+        for process in self.processes.values():
+            process.join(_timeout)
+            if process.is_alive():
+                process.kill()
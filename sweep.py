@@ -0,0 +1,181 @@
+# Parameter sweep of GridLineManager settings over historical candles
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Iterator, Optional
+import argparse, itertools, os, tempfile
+
+# Third Party Imports
+import numpy as np
+import pandas as pd
+
+# Internal Imports
+from backtest import Backtester, DEFAULT_FEE_RATE, load_candles
+from grid_line_machine import GridLineManager, TP_DECIMALS
+
+# GridLineManager arguments that can be swept
+SWEEP_PARAMETERS = ("distance", "grids", "usd", "above", "below")
+RESULT_COLUMNS = [*SWEEP_PARAMETERS, "pnl", "cash", "tokens_held", "buy_fills", "sell_fills", "max_capital_locked"]
+
+# open, high, low, close rows of the memory mapped candles, set in each worker
+_candles: Optional[np.ndarray] = None
+
+
+def parse_values(_text: str) -> list[float]:
+    """"0.1" -> [0.1], "0.01:0.05:0.01" -> [0.01, 0.02, 0.03, 0.04, 0.05] (stop included)"""
+    if ":" not in _text:
+        return [float(_text)]
+    start, stop, step = (float(part) for part in _text.split(":"))
+    count = int(round((stop - start) / step)) + 1
+    return [round(start + step * index, 10) for index in range(count)]
+
+
+def configurations(_ranges: dict[str, list[float]]) -> Iterator[dict[str, float]]:
+    """Every combination of _ranges, skips combinations where below >= above.
+    Values are first rounded the way GridLineManager takes them (distance to
+    TP_DECIMALS, grids to int) and duplicates dropped, i.e a distance step
+    finer than 0.001 doesn't backtest the same grid twice"""
+    _ranges = {
+        **_ranges,
+        "distance": [round(value, TP_DECIMALS) for value in _ranges["distance"]],
+        "grids": [int(value) for value in _ranges["grids"]],
+    }
+    _ranges = {name: list(dict.fromkeys(values)) for name, values in _ranges.items()}
+    for values in itertools.product(*(_ranges[name] for name in SWEEP_PARAMETERS)):
+        configuration = dict(zip(SWEEP_PARAMETERS, values))
+        if configuration["below"] < configuration["above"]:
+            yield configuration
+
+
+def _attach_candles(_path: str):
+    """Worker initializer, maps the candles file instead of receiving a pickled copy"""
+    global _candles
+    _candles = np.load(_path, mmap_mode="r")
+
+
+def evaluate(
+    _configurations: list[dict[str, float]],
+    _central_price: float,
+    _decimals: int,
+    _fee_rate: float,
+) -> list[dict[str, float]]:
+    """Backtest a chunk of configurations on the worker's candles"""
+    open_, high, low, close = _candles
+    rows = []
+    for configuration in _configurations:
+        manager = GridLineManager(
+            _central_grid_price=_central_price,
+            _distance_between_grids=configuration["distance"],
+            _ticker="SWEEP",
+            _usd_amount_to_buy_with=configuration["usd"],
+            _number_of_grids_on_each_side_of_grid_start_price=configuration["grids"],
+            _do_not_buy_above_this_price=configuration["above"],
+            _do_not_buy_below_this_price=configuration["below"],
+            _round_prices_to=_decimals,
+        )
+        result = Backtester(manager, _fee_rate).run_arrays(open_, high, low, close)
+        rows.append(
+            {
+                **configuration,
+                "pnl": result.pnl,
+                "cash": result.cash,
+                "tokens_held": result.tokens_held,
+                "buy_fills": result.buy_fills,
+                "sell_fills": result.sell_fills,
+                "max_capital_locked": result.max_capital_locked,
+            }
+        )
+    return rows
+
+
+def run_sweep(
+    _candles_frame: pd.DataFrame,
+    _ranges: dict[str, list[float]],
+    _central_price: Optional[float] = None,
+    _decimals: int = 5,
+    _fee_rate: float = DEFAULT_FEE_RATE,
+    _workers: Optional[int] = None,
+    _chunk_size: int = 16,
+    _on_result: Optional[Callable[[pd.DataFrame, int, int], None]] = None,
+) -> pd.DataFrame:
+    """Backtest every configuration of _ranges in a process pool, returns results
+    ranked by pnl
+
+    Candles are written once to a temporary .npy file which every worker memory
+    maps, so market data is neither pickled per task nor copied per process.
+    _on_result(ranked results so far, done, total) is called as chunks finish"""
+    _central_price = _central_price or float(_candles_frame["open"].iloc[0])
+    all_configurations = list(configurations(_ranges))
+    chunks = [
+        all_configurations[start : start + _chunk_size]
+        for start in range(0, len(all_configurations), _chunk_size)
+    ]
+    arrays = np.ascontiguousarray(
+        _candles_frame[["open", "high", "low", "close"]].to_numpy(dtype=np.float64).T
+    )
+
+    rows: list[dict[str, float]] = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "candles.npy")
+        np.save(path, arrays)
+        with ProcessPoolExecutor(
+            max_workers=_workers, initializer=_attach_candles, initargs=(path,)
+        ) as executor:
+            futures = [
+                executor.submit(evaluate, chunk, _central_price, _decimals, _fee_rate)
+                for chunk in chunks
+            ]
+            for future in as_completed(futures):
+                rows.extend(future.result())
+                if _on_result is not None:
+                    _on_result(rank(rows), len(rows), len(all_configurations))
+    return rank(rows)
+
+
+def rank(_rows: list[dict[str, float]]) -> pd.DataFrame:
+    return (
+        pd.DataFrame(_rows, columns=RESULT_COLUMNS)
+        .sort_values("pnl", ascending=False, kind="stable")
+        .reset_index(drop=True)
+    )
+
+
+def main(_args: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Rank grid settings by backtest pnl, values are lists or start:stop:step ranges"
+    )
+    parser.add_argument("candles", help=".csv or .parquet file with open/high/low/close columns")
+    parser.add_argument("--central-price", type=float, help="defaults to first open")
+    parser.add_argument("--distance", nargs="+", required=True, help="0.1 == 10%%")
+    parser.add_argument("--grids", nargs="+", required=True, help="grid lines on each side")
+    parser.add_argument("--usd", nargs="+", default=["11"], help="usd per grid line")
+    parser.add_argument("--above", nargs="+", required=True, help="do not buy above this price")
+    parser.add_argument("--below", nargs="+", required=True, help="do not buy below this price")
+    parser.add_argument("--decimals", type=int, default=5)
+    parser.add_argument("--fee-rate", type=float, default=DEFAULT_FEE_RATE)
+    parser.add_argument("--workers", type=int, default=None, help="defaults to all cores")
+    parser.add_argument("--top", type=int, default=10, help="rows of ranked table to show")
+    args = parser.parse_args(_args)
+
+    ranges = {
+        name: [value for text in getattr(args, name) for value in parse_values(text)]
+        for name in SWEEP_PARAMETERS
+    }
+
+    def show_progress(_ranked: pd.DataFrame, _done: int, _total: int):
+        print(f"\n{_done}/{_total} configurations")
+        print(_ranked.head(args.top).to_string())
+
+    ranked = run_sweep(
+        load_candles(args.candles),
+        ranges,
+        _central_price=args.central_price,
+        _decimals=args.decimals,
+        _fee_rate=args.fee_rate,
+        _workers=args.workers,
+        _on_result=show_progress,
+    )
+    print("\nFinal ranking")
+    print(ranked.head(args.top).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import pytest
+import asyncio
+import numpy as np
+import pandas as pd
+from aiohttp.test_utils import TestServer
+
+from backtest import Backtester, load_candles
+from exchanges.gateio import GateIOConnector, GateIOManager
+from exchanges.simulator import GateIOSimulator
+from grid_line_machine import GridLineManager, BUY_ORDER_PLACED, SELL_ORDER_PLACED
+
+
+@pytest.fixture
+def manager():
+    # grid lines 0.81 0.9 1.0 1.1 1.21
+    return GridLineManager(
+        _central_grid_price=1.0,
+        _distance_between_grids=0.1,
+        _ticker="TEST_USDT",
+        _usd_amount_to_buy_with=10,
+        _number_of_grids_on_each_side_of_grid_start_price=2,
+        _do_not_buy_above_this_price=2,
+        _do_not_buy_below_this_price=0.5,
+        _round_prices_to=5,
+    )
+
+
+CANDLES = pd.DataFrame(
+    {
+        "open": [1.05, 1.03, 0.99, 1.11],
+        "high": [1.06, 1.03, 1.12, 1.11],
+        "low": [1.02, 0.98, 0.99, 0.95],
+        "close": [1.03, 0.99, 1.11, 0.96],
+    }
+)
+
+
+def test_backtest_fills(manager):
+    result = Backtester(manager, _fee_rate=0.002).run(CANDLES)
+    fills = result.fills_per_grid_line.set_index("price")
+
+    # 1.0 bought on candle 1, sold at 1.1 on candle 2, bought again on candle 3
+    assert fills.loc[1.0, "buys"] == 2
+    assert fills.loc[1.1, "sells"] == 1
+    # 1.1 was handled (its sell filled) on candle 2 and price is below it after
+    assert fills.loc[[0.81, 0.9, 1.1, 1.21], "buys"].sum() == 0
+
+    assert result.buy_fills == 2 and result.sell_fills == 1
+    assert result.cash == pytest.approx(-10 - 3 * 10 * 0.002)
+    # sells are sized at the sell line's price, 10 / 1.1 of the 20 bought are sold
+    assert result.tokens_held == pytest.approx(20 - 10 / 1.1)
+    assert result.pnl == pytest.approx(result.cash + result.tokens_held * 0.96)
+    # 0.81, 0.9 and 1.0 buys, the 1.0 buy is replaced once it sold at 1.1
+    assert result.max_capital_locked == 30
+
+
+def test_backtest_keeps_one_order_per_grid_line(manager):
+    # 1.0 and 0.9 buys fill together, the 1.0 line then holds the sell of 0.9
+    candles = pd.DataFrame(
+        {"open": [1.05, 0.88], "high": [1.05, 0.88], "low": [0.88, 0.88], "close": [0.88, 0.88]}
+    )
+    Backtester(manager).run(candles)
+    store = manager.store
+    assert not (store.has_state(BUY_ORDER_PLACED) & store.has_state(SELL_ORDER_PLACED)).any()
+    assert manager.grid_line_obj_map_price(1.0).sell_order_placed
+    assert manager.grid_line_obj_map_price(1.1).sell_order_placed
+    assert manager.grid_line_obj_map_price(0.81).buy_order_placed
+
+
+def test_backtest_without_candles(manager):
+    # i.e a sweep window or csv slice with no rows
+    result = Backtester(manager).run(CANDLES.iloc[:0])
+    assert (result.pnl, result.cash, result.tokens_held, result.fees) == (0, 0, 0, 0)
+    assert (result.buy_fills, result.sell_fills) == (0, 0)
+    assert (result.max_capital_locked, result.average_capital_locked) == (0, 0)
+    assert not manager.store.state.any()
+
+
+def test_backtest_matches_connector_on_simulator():
+    path = [1.0, 0.85, 0.95, 1.05, 0.78, 1.15, 0.88, 1.12, 0.7, 0.97]
+
+    def make():
+        return GridLineManager(
+            _central_grid_price=1.0,
+            _distance_between_grids=0.1,
+            _ticker="SIM_USDT",
+            _usd_amount_to_buy_with=10,
+            _number_of_grids_on_each_side_of_grid_start_price=5,
+            _do_not_buy_above_this_price=1.2,
+            _do_not_buy_below_this_price=0.6,
+            _round_prices_to=5,
+        )
+
+    live = make()
+    simulator = GateIOSimulator({"SIM_USDT": path}, _tick_interval=3600)
+
+    async def run():
+        server = TestServer(simulator.app())
+        await server.start_server()
+        host = f"http://{server.host}:{server.port}"
+        giom = GateIOManager(_host=host)
+        connector = GateIOConnector(live, _price_feed="rest", _host=host)
+        try:
+            for price in path:
+                await connector.manage_trades(price, live, giom)
+                simulator.step()
+        finally:
+            await giom.close()
+            await server.close()
+
+    asyncio.run(run())
+
+    backtested = make()
+    Backtester(backtested).run(
+        pd.DataFrame({"open": path, "high": path, "low": path, "close": path})
+    )
+    assert backtested.store.total_buy_orders.sum() > 0
+    assert backtested.store.total_sell_orders.sum() > 0
+    for column in ("state", "total_buy_orders", "total_sell_orders", "total_tokens"):
+        assert np.allclose(getattr(backtested.store, column), getattr(live.store, column)), column
+
+
+def test_backtest_updates_grid_lines(manager):
+    Backtester(manager).run(CANDLES)
+    line_1_0 = manager.grid_line_obj_map_price(1.0)
+    line_1_1 = manager.grid_line_obj_map_price(1.1)
+
+    assert line_1_0.total_buy_orders == 2 and line_1_0.buy_order_filled
+    assert line_1_1.total_sell_orders == 1 and line_1_1.sell_order_placed
+    assert manager.grid_line_obj_map_price(0.9).buy_order_placed
+
+
+def test_load_candles(tmp_path):
+    path = tmp_path / "candles.csv"
+    CANDLES.rename(columns=str.upper).to_csv(path, index=False)
+    assert load_candles(str(path)).equals(CANDLES)
+
+    CANDLES.drop(columns="low").to_csv(path, index=False)
+    with pytest.raises(ValueError):
+        load_candles(str(path))
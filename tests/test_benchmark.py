@@ -0,0 +1,20 @@
+import json
+
+from benchmark import BASELINE_PATH, compare, run_benchmarks
+
+
+def test_benchmarks_run_and_match_baseline_names():
+    results = run_benchmarks((11, 101), (1, 20), _repeat=1)
+    with open(BASELINE_PATH) as f:
+        baseline = json.load(f)["results"]
+
+    assert "manage_trades/20x101" in results
+    assert all(result["median"] > 0 for result in results.values())
+    # every small scale benchmark is tracked by the checked in baseline
+    assert results.keys() <= baseline.keys()
+
+
+def test_compare_flags_regressions():
+    baseline = {"a": {"median": 1.0}, "b": {"median": 1.0}}
+    results = {"a": {"median": 1.4}, "b": {"median": 1.6}, "new": {"median": 9.0}}
+    assert compare(results, baseline, 1.5) == ["b"]
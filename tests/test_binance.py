@@ -0,0 +1,366 @@
+import asyncio, hashlib, hmac, pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from exchanges import OrderToBePlaced, PriceUpdate
+from exchanges.binance import Binance, BinanceApiException, BinanceConnector, BinanceManager
+from exchanges.binance import format_decimal, format_to_step, to_exchange_order
+from exchanges.binance_ws import BinanceOrderStream, BinancePriceStream
+from exchanges.connector import price_caches, run_connectors
+from exchanges.rate_limiter import BINANCE_RATE_LIMITS
+from exchanges.gateio import GateIOConnector
+from exchanges.simulator import BinanceSimulator, GateIOSimulator
+from grid_line_machine import GridLineManager
+from tests.test_simulator import make_manager, start
+
+# rate limits aren't under test, client and server buckets may drift apart
+NO_RATE_LIMITS = {name: (1000, 1000) for name in ("public", "private", "order", "cancel")}
+
+
+def make_binance_manager() -> GridLineManager:
+    return GridLineManager(
+        _central_grid_price=1.0,
+        _distance_between_grids=0.1,
+        _ticker="SIMUSDT",
+        _usd_amount_to_buy_with=10,
+        _number_of_grids_on_each_side_of_grid_start_price=5,
+        _do_not_buy_above_this_price=10,
+        _do_not_buy_below_this_price=0.1,
+        _round_prices_to=5,
+    )
+
+
+def test_sign_and_order_conversion():
+    binance = Binance(_secret="secret")
+    assert binance.sign("symbol=SIMUSDT&timestamp=1") == hmac.new(
+        b"secret", b"symbol=SIMUSDT&timestamp=1", hashlib.sha256
+    ).hexdigest()
+    assert format_decimal(10 / 0.59049) == "16.93508781"
+    assert format_decimal(2.0) == "2"
+    # Binance budget, not Gate.io's
+    assert BinanceManager().scheduler.buckets["order"].capacity == BINANCE_RATE_LIMITS["order"][1]
+
+    order = to_exchange_order(
+        {"symbol": "SIMUSDT", "orderId": 7, "price": "0.9", "origQty": "10", "executedQty": "4",
+         "status": "PARTIALLY_FILLED", "side": "BUY", "time": 1700000000123}
+    )
+    assert (order.id, order.side, order.status, order.finish_as, order.left) == ("7", "buy", "open", "open", 6)
+    assert order.create_time == 1700000000
+    filled = to_exchange_order(
+        {"symbol": "SIMUSDT", "orderId": 8, "price": "0.9", "origQty": "10", "status": "FILLED", "side": "SELL"}
+    )
+    assert (filled.status, filled.finish_as) == ("closed", "filled")
+
+
+def test_client_trades_against_simulator():
+    simulator = BinanceSimulator({"SIMUSDT": [1.0, 0.85], "OTHERUSDT": [5.0]}, _tick_interval=3600)
+
+    async def run():
+        server, host = await start(simulator)
+        binance = Binance(_key="key", _secret="secret", _host=host)
+        try:
+            prices = await binance.prices(["SIMUSDT", "OTHERUSDT"])
+            placed = await binance.place_batch_orders(
+                [
+                    OrderToBePlaced("SIMUSDT", 0.9, 10, "buy"),
+                    OrderToBePlaced("SIMUSDT", 0.8, 10, "buy"),
+                    OrderToBePlaced("NOPEUSDT", 0.8, 10, "buy"),
+                    OrderToBePlaced("OTHERUSDT", 6.0, 1, "sell"),
+                ]
+            )
+            all_open = await binance.get_all_open_orders()
+            cancelled = await binance.cancel_batch_orders(
+                [("SIMUSDT", placed[1].order_id), ("SIMUSDT", "999")]
+            )
+            simulator.step()
+            filled = await binance.check_filled_order_status(placed[0].order_id, "SIMUSDT")
+            open_orders = await binance.list_orders("SIMUSDT", "open")
+            finished = await binance.list_orders("SIMUSDT", "finished")
+        finally:
+            await binance.close()
+            await server.close()
+        return prices, placed, all_open, cancelled, filled, open_orders, finished
+
+    prices, placed, all_open, cancelled, filled, open_orders, finished = asyncio.run(run())
+    assert prices == {"SIMUSDT": "1.0", "OTHERUSDT": "5.0"}
+    assert [status.success for status in placed] == [True, True, False, True]
+    # -1121 invalid symbol, reported per order
+    assert placed[2].label == "-1121"
+    assert placed[3].side == "sell" and placed[3].price == 6.0
+    assert sorted((orders.currency_pair, orders.total) for orders in all_open) == [
+        ("OTHERUSDT", 1), ("SIMUSDT", 2),
+    ]
+    assert cancelled == {placed[1].order_id}
+    assert filled.finish_as == "filled" and filled.side == "buy"
+    assert open_orders == []
+    # newest first
+    assert [order.id for order in finished] == sorted(
+        [placed[0].order_id, placed[1].order_id], key=int, reverse=True
+    )
+    assert {order.id: order.finish_as for order in finished} == {
+        placed[0].order_id: "filled", placed[1].order_id: "cancelled"
+    }
+
+
+def test_orders_rounded_to_symbol_filters():
+    assert format_to_step(16.935087, "0.01000000", _round_down=True) == "16.93"
+    assert format_to_step(0.3, "0.10000000", _round_down=True) == "0.3"
+    assert format_to_step(123.7, "1.00000000", _round_down=True) == "123"
+    assert format_to_step(0.59049, "0.00010000") == "0.5905"
+
+    simulator = BinanceSimulator(
+        {"SIMUSDT": [1.0], "OTHERUSDT": [5.0]},
+        _tick_interval=3600,
+        _filters={"SIMUSDT": ("0.01000000", "0.00100000")},
+    )
+
+    async def run():
+        server, host = await start(simulator)
+        binance = Binance(_key="key", _secret="secret", _host=host)
+        try:
+            # 8 decimals, rejected like Binance does
+            async with binance.session.post(
+                f"{host}/api/v3/order?symbol=SIMUSDT&side=BUY&quantity=16.93508781&price=0.59049",
+                headers={"X-MBX-APIKEY": "key"},
+                params={"signature": "x"},
+            ) as r:
+                unrounded = r.status, await r.json()
+            first = await binance.place_batch_orders(
+                [OrderToBePlaced("SIMUSDT", 0.59049, 10 / 0.59049, "buy"),
+                 OrderToBePlaced("NOPEUSDT", 0.5, 1, "buy")]
+            )
+            second = await binance.place_batch_orders(
+                [OrderToBePlaced("SIMUSDT", 0.6, 10 / 0.6, "buy"),
+                 OrderToBePlaced("OTHERUSDT", 6.123456789, 1, "sell")]
+            )
+        finally:
+            await binance.close()
+            await server.close()
+        return unrounded, first, second, binance.filters
+
+    unrounded, first, second, filters = asyncio.run(run())
+    assert unrounded == (400, {"code": -1013, "msg": "Filter failure: LOT_SIZE"})
+    assert [placed.success for placed in first + second] == [True, False, True, True]
+    assert (first[0].tokens, first[0].price) == (16.93, 0.59)
+    assert first[1].label == "-1121"
+    assert (second[0].tokens, second[0].price) == (16.66, 0.6)
+    assert second[1].price == 6.12345679
+    # asked once per symbol, unknown symbols aren't cached
+    assert filters == {"SIMUSDT": ("0.01000000", "0.00100000"), "OTHERUSDT": ("0.00000001", "0.00000001")}
+    assert simulator.requests["public"] == 3
+
+
+@pytest.mark.parametrize("tick", ["0.00100000", "0.00500000"])
+def test_connector_tracks_orders_rounded_to_tick(tick):
+    # price wobbles above the buys so several manage_trades cycles run without fills
+    simulator = BinanceSimulator(
+        {"SIMUSDT": [1.0, 0.999] * 40},
+        _tick_interval=0.02,
+        _rate_limits=NO_RATE_LIMITS,
+        _filters={"SIMUSDT": ("0.01000000", tick)},
+    )
+    manager = make_binance_manager()
+
+    async def run():
+        server, host = await start(simulator)
+        connector = BinanceConnector(
+            manager, _host=host, _ws_url=host.replace("http", "ws") + "/ws", _log_ticks=False
+        )
+        task = asyncio.create_task(run_connectors(connector))
+        try:
+            for _ in range(100):
+                if sum(grid.buy_order_placed for grid in manager) == 5:
+                    break
+                await asyncio.sleep(0.02)
+            # more cycles, tracked lines get no second order
+            await asyncio.sleep(0.3)
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await server.close()
+
+    asyncio.run(run())
+    # grid snapped to the tick's decimals
+    assert manager.round_price_to == 3
+    assert manager.grid_lines[:5] == [0.59, 0.656, 0.729, 0.81, 0.9]
+    open_orders = simulator.engine.open_orders("SIMUSDT")
+    assert len(open_orders) == 5
+    assert [grid.order_id for grid in manager if grid.buy_order_placed] == [
+        order.id for order in sorted(open_orders, key=lambda order: order.price)
+    ]
+
+
+def test_api_errors_and_auth():
+    simulator = BinanceSimulator({"SIMUSDT": [1.0]})
+
+    async def run():
+        server, host = await start(simulator)
+        binance = Binance(_host=host)
+        try:
+            async with binance.session.get(f"{host}/api/v3/openOrders") as r:
+                unsigned = r.status, await r.json()
+            try:
+                await binance.check_filled_order_status(12345, "SIMUSDT")
+            except BinanceApiException as error:
+                return unsigned, error
+        finally:
+            await binance.close()
+            await server.close()
+
+    unsigned, error = asyncio.run(run())
+    assert unsigned == (401, {"code": -2015, "msg": "Missing signature headers"})
+    assert error.status == 400 and error.label == "-2013"
+
+
+def test_non_json_error_response_raises():
+    async def get_order(request):
+        return web.Response(text="<html>502 Bad Gateway</html>", status=502, content_type="text/html")
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/api/v3/order", get_order)
+        async with TestServer(app) as server:
+            binance = Binance(_key="key", _secret="secret", _host=f"http://{server.host}:{server.port}")
+            try:
+                await binance.check_filled_order_status(7, "SIMUSDT")
+            finally:
+                await binance.close()
+
+    with pytest.raises(BinanceApiException) as ex:
+        asyncio.run(run())
+    assert ex.value.status == 502 and ex.value.label == "502"
+    assert ex.value.message == "<html>502 Bad Gateway</html>"
+
+
+def test_price_stream_against_simulator():
+    simulator = BinanceSimulator({"SIMUSDT": [1.0, 0.9, 0.8]}, _tick_interval=0.01)
+    prices_objects = {"SIMUSDT": PriceUpdate("SIMUSDT")}
+    stream = BinancePriceStream(prices_objects)
+    assert stream.handle_message({"result": None, "id": 1}) is None
+    assert stream.handle_message({"s": "UNKNOWNUSDT", "b": "1"}) is None
+
+    async def run():
+        server, host = await start(simulator)
+        stream.url = host.replace("http", "ws") + "/ws"
+        task = asyncio.create_task(stream.run())
+        try:
+            version = 0
+            while prices_objects["SIMUSDT"].market_price != 0.8:
+                version = await asyncio.wait_for(
+                    prices_objects["SIMUSDT"].wait_for_change(version), 2
+                )
+        finally:
+            task.cancel()
+            await server.close()
+        return stream.subscribe_message()
+
+    subscribe = asyncio.run(run())
+    assert subscribe["method"] == "SUBSCRIBE" and subscribe["params"] == ["simusdt@bookTicker"]
+
+
+def test_user_data_stream_against_simulator():
+    simulator = BinanceSimulator({"SIMUSDT": [1.0, 0.85]}, _tick_interval=3600)
+    orders = []
+
+    async def run():
+        server, host = await start(simulator)
+        binance = Binance(_key="key", _secret="secret", _host=host)
+        stream = BinanceOrderStream(binance, orders.append, host.replace("http", "ws") + "/ws")
+        task = asyncio.create_task(stream.run())
+        try:
+            while not simulator._order_subscribers:
+                await asyncio.sleep(0.01)
+            await binance.keepalive_listen_key(stream.listen_key)
+            placed = await binance.place_batch_orders(OrderToBePlaced("SIMUSDT", 0.9, 10, "buy"))
+            simulator.step()
+            await simulator.push_order_events()
+            while len(orders) < 2:
+                await asyncio.sleep(0.01)
+        finally:
+            task.cancel()
+            await binance.close()
+            await server.close()
+        return placed[0], stream
+
+    placed, stream = asyncio.run(run())
+    assert stream.listen_key in simulator.listen_keys
+    assert [(order.id, order.status, order.finish_as) for order in orders] == [
+        (placed.order_id, "open", "open"), (placed.order_id, "closed", "filled"),
+    ]
+    assert orders[1].left == 0 and orders[1].side == "buy" and orders[1].currency_pair == "SIMUSDT"
+    # balance updates etc aren't order events
+    assert stream.handle_message({"e": "outboundAccountPosition"}) is None
+
+
+def test_listen_key_keepalive_survives_timeouts():
+    calls = []
+
+    class Client:
+        async def keepalive_listen_key(self, _listen_key):
+            calls.append(_listen_key)
+            if len(calls) == 1:
+                raise asyncio.TimeoutError()
+
+    stream = BinanceOrderStream(Client(), lambda _order: None, _keepalive_interval=0.01)
+    stream.listen_key = "key"
+
+    async def run():
+        task = asyncio.create_task(stream.keepalive())
+        while len(calls) < 3 and not task.done():
+            await asyncio.sleep(0.01)
+        alive = not task.done()
+        task.cancel()
+        return alive
+
+    assert asyncio.run(run())
+    assert calls == ["key"] * 3
+
+
+def test_gateio_and_binance_grids_on_one_loop():
+    # grids are placed at 1.0, price drops to 0.85 half a second later
+    path = [1.0] * 5 + [0.85]
+    gate_simulator = GateIOSimulator(
+        {"SIM_USDT": path}, _tick_interval=0.1, _rate_limits=NO_RATE_LIMITS
+    )
+    binance_simulator = BinanceSimulator(
+        {"SIMUSDT": path}, _tick_interval=0.1, _rate_limits=NO_RATE_LIMITS
+    )
+    gate_manager, binance_manager = make_manager(), make_binance_manager()
+
+    async def run():
+        gate_server, gate_host = await start(gate_simulator)
+        binance_server, binance_host = await start(binance_simulator)
+        gate = GateIOConnector(
+            gate_manager, _host=gate_host, _ws_url=gate_host.replace("http", "ws") + "/ws/v4/",
+            _log_ticks=False,
+        )
+        binance = BinanceConnector(
+            binance_manager, _host=binance_host, _ws_url=binance_host.replace("http", "ws") + "/ws",
+            _log_ticks=False,
+        )
+        task = asyncio.create_task(run_connectors(gate, binance))
+        try:
+            # both grids follow the drop to 0.85, fill their 0.9 buy and sell on 1.0
+            for _ in range(100):
+                if gate_manager.grid_line_obj_map_price(1.0).sell_order_placed and (
+                    binance_manager.grid_line_obj_map_price(1.0).sell_order_placed
+                ):
+                    break
+                await asyncio.sleep(0.05)
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await gate_server.close()
+            await binance_server.close()
+
+    asyncio.run(run())
+    for simulator, symbol in ((gate_simulator, "SIM_USDT"), (binance_simulator, "SIMUSDT")):
+        assert [order.price for order in simulator.engine.finished[symbol]] == [0.9]
+        assert sorted((order.side, order.price) for order in simulator.engine.open_orders(symbol)) == [
+            ("buy", 0.59049), ("buy", 0.6561), ("buy", 0.729), ("buy", 0.81), ("sell", 1.0),
+        ]
+    # each exchange keeps its own price cache
+    caches = price_caches()
+    assert caches["gateio"] is GateIOConnector.prices_objects
+    assert caches["binance"]["SIMUSDT"].market_price == 0.85
+    assert "SIMUSDT" not in caches["gateio"]
@@ -0,0 +1,61 @@
+import gzip, json, logging, threading
+
+from bot_logging import setup_logging, stop_logging
+from grid_line_machine import GridLineManager
+
+
+class RecordsThread:
+    """Log arg whose str() remembers which thread formatted it"""
+
+    def __init__(self):
+        self.thread = None
+
+    def __str__(self):
+        self.thread = threading.current_thread()
+        return "arg"
+
+
+def test_grid_line_events_are_json_lines(tmp_path):
+    path = tmp_path / "bot.log"
+    manager = GridLineManager(
+        _central_grid_price=1.0,
+        _distance_between_grids=0.1,
+        _ticker="TEST_USDT",
+        _usd_amount_to_buy_with=10,
+        _number_of_grids_on_each_side_of_grid_start_price=2,
+        _do_not_buy_above_this_price=2,
+        _do_not_buy_below_this_price=0.5,
+        _round_prices_to=5,
+    )
+    arg = RecordsThread()
+    setup_logging(str(path))
+    try:
+        manager[1].buy_order_success("7")
+        logging.getLogger("dca.test").info("lazy %s", arg)
+    finally:
+        stop_logging()
+
+    events = [json.loads(line) for line in path.read_text().splitlines()]
+    assert events[0]["message"] == "grid_line_2 Buy Order Placed"
+    assert events[0]["ticker"] == "TEST_USDT" and events[0]["order_id"] == "7"
+    assert events[0]["logger"] == "dca.grid"
+    assert events[1]["message"] == "lazy arg"
+    # message was built by the listener thread, not the caller
+    assert arg.thread is not threading.main_thread()
+
+
+def test_rotated_logs_are_compressed(tmp_path):
+    path = tmp_path / "bot.log"
+    setup_logging(str(path), _max_bytes=500, _backup_count=2)
+    try:
+        for index in range(50):
+            logging.getLogger("dca.test").info("event %s", index)
+    finally:
+        stop_logging()
+
+    with gzip.open(f"{path}.1.gz", "rt") as f:
+        rotated = [json.loads(line)["message"] for line in f]
+    assert rotated and all(message.startswith("event") for message in rotated)
+    assert not (tmp_path / "bot.log.3.gz").exists()
+    # nothing goes to the queue once stopped
+    assert not any(type(h).__name__ == "LazyQueueHandler" for h in logging.getLogger().handlers)
@@ -27,10 +27,14 @@ def setup(request):
     }
 
     grid_line_manager = GridLineManager(
-        _grid_price,
-        _distance_between_grids,
-        _number_of_grids_on_each_side,
-        _decimals,
+        _central_grid_price=_grid_price,
+        _distance_between_grids=_distance_between_grids,
+        _ticker="TEST_USDT",
+        _usd_amount_to_buy_with=10,
+        _number_of_grids_on_each_side_of_grid_start_price=_number_of_grids_on_each_side,
+        _do_not_buy_above_this_price=10,
+        _do_not_buy_below_this_price=0,
+        _round_prices_to=_decimals,
     )
     return grid_line_manager, param_dict
 
@@ -78,35 +82,22 @@ def test_calculate_grid_lines(setup):
     central_grid_index = len(grid_lines) // 2
     central_grid_price = grid_lines[central_grid_index]
 
-    grids_above_mid_point = grid_lines[central_grid_index:]
-    # sort the grid prices below current grid for % percision
-    starting_grid_price = grid_lines[central_grid_index]
+    # prices are computed in closed form from central grid price, rounding
+    # error of one grid line doesn't carry over to the next
+    _central = setup[1]["_grid_price"]
+    _tp = setup[1]["_distance_between_grids"]
     _decimal = 0.01
 
-    for grid_price in grids_above_mid_point[1:]:
-        assert round(
-            (
-                starting_grid_price * setup[1]["_distance_between_grids"]
-                + starting_grid_price
-            ),
-            setup[1]["_decimals"],
-        ) == pytest.approx(grid_price, _decimal)
-        starting_grid_price = grid_price
-
-    grids_below_mid_point = sorted(grid_lines[:central_grid_index], reverse=True)
-    starting_grid_price = grids_below_mid_point[0]
-    for grid_price in grids_below_mid_point[1:]:
-        print(starting_grid_price)
-        print(grids_below_mid_point)
-        print(grid_price)
-        assert round(
-            (
-                starting_grid_price
-                - (starting_grid_price * setup[1]["_distance_between_grids"])
-            ),
-            setup[1]["_decimals"],
-        ) == pytest.approx(grid_price, _decimal)
-        starting_grid_price = grid_price
+    for step, grid_price in enumerate(grid_lines[central_grid_index:]):
+        assert central_grid_price == _central
+        assert round(_central * (1 + _tp) ** step, setup[1]["_decimals"]) == pytest.approx(
+            grid_price, _decimal
+        )
+
+    for step, grid_price in enumerate(reversed(grid_lines[: central_grid_index + 1])):
+        assert round(_central * (1 - _tp) ** step, setup[1]["_decimals"]) == pytest.approx(
+            grid_price, _decimal
+        )
 
 def test_grid_line_objects(setup):
     # Should always return GridLine object
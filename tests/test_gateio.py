@@ -0,0 +1,275 @@
+import pytest
+import asyncio, hashlib, hmac, json
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from exchanges import OrderToBePlaced, PlacedOrders
+from exchanges.gateio import GateIO, GateApiException, chunk_batch_orders
+from exchanges.gateio import PER_PAIR_TICKERS_LIMIT, MAX_BATCH_ORDERS_PER_PAIR, MAX_BATCH_PAIRS
+
+TICKERS = [
+    {"currency_pair": f"T{index}_USDT", "highest_bid": f"{index}.5", "last": f"{index}.5"}
+    for index in range(50)
+]
+
+
+async def gateio_stand_in(_handler_calls: list) -> TestServer:
+    async def tickers(request):
+        _handler_calls.append(dict(request.query))
+        pair = request.query.get("currency_pair")
+        if pair is None:
+            return web.json_response(TICKERS)
+        return web.json_response([t for t in TICKERS if t["currency_pair"] == pair])
+
+    app = web.Application()
+    app.router.add_get("/api/v4/spot/tickers", tickers)
+    server = TestServer(app)
+    await server.start_server()
+    return server
+
+
+def make_gateio(_server: TestServer) -> GateIO:
+    gateio = GateIO()
+    gateio.host = f"http://{_server.host}:{_server.port}"
+    return gateio
+
+
+def test_prices_reuses_one_session():
+    calls = []
+
+    async def run():
+        server = await gateio_stand_in(calls)
+        gateio = make_gateio(server)
+        try:
+            all_prices = await gateio.prices()
+            session = gateio.session
+            few_prices = await gateio.prices(["T1_USDT", "T2_USDT"])
+            assert gateio.session is session
+        finally:
+            await gateio.close()
+            await server.close()
+        assert session.closed
+        return all_prices, few_prices
+
+    all_prices, few_prices = asyncio.run(run())
+    assert len(all_prices) == len(TICKERS)
+    assert few_prices == {"T1_USDT": "1.5", "T2_USDT": "2.5"}
+    # one full fetch then one request per tracked pair
+    assert calls[0] == {}
+    assert sorted(call.get("currency_pair", "") for call in calls[1:]) == ["T1_USDT", "T2_USDT"]
+
+
+def test_prices_filters_many_pairs():
+    calls = []
+    pairs = [t["currency_pair"] for t in TICKERS[: PER_PAIR_TICKERS_LIMIT + 1]]
+
+    async def run():
+        server = await gateio_stand_in(calls)
+        gateio = make_gateio(server)
+        try:
+            return await gateio.prices(pairs)
+        finally:
+            await gateio.close()
+            await server.close()
+
+    prices = asyncio.run(run())
+    assert sorted(prices) == sorted(pairs)
+    assert calls == [{}]
+
+
+### signed private endpoints
+def verify_signature(_request, _body: str, _secret: str = "secret") -> bool:
+    payload = "\n".join(
+        [
+            _request.method,
+            _request.path,
+            _request.query_string,
+            hashlib.sha512(_body.encode()).hexdigest(),
+            _request.headers["Timestamp"],
+        ]
+    )
+    expected = hmac.new(_secret.encode(), payload.encode(), hashlib.sha512).hexdigest()
+    return _request.headers["KEY"] == "key" and _request.headers["SIGN"] == expected
+
+
+def test_private_endpoints_are_signed(caplog):
+    async def batch_orders(request):
+        body = await request.text()
+        if not verify_signature(request, body):
+            return web.json_response({"label": "INVALID_SIGNATURE", "message": ""}, status=401)
+        return web.json_response(
+            [
+                {**order, "id": str(index), "succeeded": True, "create_time": "1"}
+                for index, order in enumerate(json.loads(body))
+            ]
+        )
+
+    async def get_order(request):
+        assert verify_signature(request, "")
+        return web.json_response(
+            {
+                "id": request.match_info["order_id"],
+                "currency_pair": request.query["currency_pair"],
+                "price": "0.2",
+                "amount": "50",
+                "side": "buy",
+                "status": "closed",
+                "finish_as": "filled",
+            }
+        )
+
+    async def run():
+        app = web.Application()
+        app.router.add_post("/api/v4/spot/batch_orders", batch_orders)
+        app.router.add_get("/api/v4/spot/orders/{order_id}", get_order)
+        async with TestServer(app) as server:
+            gateio = GateIO("key", "secret")
+            gateio.host = f"http://{server.host}:{server.port}"
+            try:
+                placed = await gateio.place_batch_orders(
+                    [OrderToBePlaced("VANRY_USDT", 0.2, 50, "buy")]
+                )
+                status = await gateio.check_filled_order_status("7", "VANRY_USDT")
+
+                gateio.secret = "wrong"
+                failed = await gateio.place_batch_orders(
+                    OrderToBePlaced("VANRY_USDT", 0.2, 50, "buy")
+                )
+            finally:
+                await gateio.close()
+            return placed, status, failed
+
+    placed, status, failed = asyncio.run(run())
+    assert placed == [PlacedOrders(0.2, 50, "0", 1, "VANRY_USDT", "buy", True, None)]
+    assert status.id == "7" and status.finish_as == "filled" and status.amount == 50
+    assert failed[0].success is False and failed[0].label == "GateApiException"
+    # rejected batch is logged like every other exchange error
+    [record] = [record for record in caplog.records if record.name == "dca.gateio"]
+    assert record.levelname == "WARNING"
+    assert record.fields == {"orders": 1, "label": "INVALID_SIGNATURE"}
+
+
+def test_error_response_raises():
+    async def get_order(request):
+        return web.json_response({"label": "ORDER_NOT_FOUND", "message": "no order"}, status=404)
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/api/v4/spot/orders/{order_id}", get_order)
+        async with TestServer(app) as server:
+            gateio = make_gateio(server)
+            try:
+                await gateio.check_filled_order_status("7", "VANRY_USDT")
+            finally:
+                await gateio.close()
+
+    with pytest.raises(GateApiException) as ex:
+        asyncio.run(run())
+    assert ex.value.label == "ORDER_NOT_FOUND"
+
+
+def test_non_json_error_response_raises():
+    async def get_order(request):
+        return web.Response(text="<html>502 Bad Gateway</html>", status=502, content_type="text/html")
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/api/v4/spot/orders/{order_id}", get_order)
+        async with TestServer(app) as server:
+            gateio = make_gateio(server)
+            try:
+                await gateio.check_filled_order_status("7", "VANRY_USDT")
+            finally:
+                await gateio.close()
+
+    with pytest.raises(GateApiException) as ex:
+        asyncio.run(run())
+    assert ex.value.status == 502
+    assert ex.value.message == "<html>502 Bad Gateway</html>"
+
+
+### batch orders chunking
+def test_chunk_batch_orders():
+    orders = [OrderToBePlaced("A_USDT", 1, 1, "buy") for _ in range(25)]
+    orders += [OrderToBePlaced(f"{pair}_USDT", 1, 1, "buy") for pair in "BCDE"]
+    chunks = chunk_batch_orders(orders)
+
+    assert sorted(index for chunk in chunks for index in chunk) == list(range(len(orders)))
+    for chunk in chunks:
+        pairs = [orders[index].currency_pair for index in chunk]
+        assert len(set(pairs)) <= MAX_BATCH_PAIRS
+        assert all(pairs.count(pair) <= MAX_BATCH_ORDERS_PER_PAIR for pair in pairs)
+    # 3 batches needed for A_USDT, the other pairs fit in them
+    assert len(chunks) == 3
+
+
+def test_place_batch_orders_keeps_input_order():
+    batch_sizes = []
+
+    async def batch_orders(request):
+        body = await request.json()
+        batch_sizes.append(len(body))
+        if any(order["currency_pair"] == "BAD_USDT" for order in body):
+            return web.json_response({"label": "INVALID_CURRENCY", "message": ""}, status=400)
+        return web.json_response(
+            [{**order, "id": order["price"], "succeeded": True} for order in body]
+        )
+
+    orders = [OrderToBePlaced("A_USDT", index, 1, "buy") for index in range(1, 24)]
+    orders.insert(5, OrderToBePlaced("BAD_USDT", 0.5, 1, "sell"))
+
+    async def run():
+        app = web.Application()
+        app.router.add_post("/api/v4/spot/batch_orders", batch_orders)
+        async with TestServer(app) as server:
+            gateio = make_gateio(server)
+            try:
+                return await gateio.place_batch_orders(orders)
+            finally:
+                await gateio.close()
+
+    placed = asyncio.run(run())
+    assert len(placed) == len(orders)
+    assert max(batch_sizes) <= MAX_BATCH_ORDERS_PER_PAIR * MAX_BATCH_PAIRS
+    for order, placed_order in zip(orders, placed):
+        if order.currency_pair == "BAD_USDT":
+            assert not placed_order.success and placed_order.side == "sell"
+        elif placed_order.success:
+            assert placed_order.price == order.price
+    # the batch carrying the invalid pair (with the first 10 A_USDT orders) fails
+    # as a whole, the other batches go through
+    assert sum(not placed_order.success for placed_order in placed) == MAX_BATCH_ORDERS_PER_PAIR + 1
+
+
+### open orders pagination
+def test_get_all_open_orders_fetches_every_page():
+    orders_by_pair = {
+        "A_USDT": [{"id": str(i), "currency_pair": "A_USDT", "price": "1", "amount": "1", "side": "buy"} for i in range(250)],
+        "B_USDT": [{"id": f"b{i}", "currency_pair": "B_USDT", "price": "1", "amount": "1", "side": "sell"} for i in range(3)],
+    }
+    pages = []
+
+    async def open_orders(request):
+        page, limit = int(request.query["page"]), int(request.query["limit"])
+        pages.append(page)
+        response = []
+        for pair, orders in orders_by_pair.items():
+            page_orders = orders[(page - 1) * limit : page * limit]
+            if page_orders:
+                response.append({"currency_pair": pair, "total": len(orders), "orders": page_orders})
+        return web.json_response(response)
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/api/v4/spot/open_orders", open_orders)
+        async with TestServer(app) as server:
+            gateio = make_gateio(server)
+            try:
+                return await gateio.get_all_open_orders()
+            finally:
+                await gateio.close()
+
+    open_orders = {orders.currency_pair: orders for orders in asyncio.run(run())}
+    assert sorted(pages) == [1, 2, 3]
+    assert [order.id for order in open_orders["A_USDT"].orders] == [str(i) for i in range(250)]
+    assert len(open_orders["B_USDT"].orders) == 3
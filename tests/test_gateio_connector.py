@@ -0,0 +1,345 @@
+import asyncio
+import aiohttp
+import numpy as np
+
+from exchanges import ExchangeOrder, OpenOrders, PlacedOrders, PriceUpdate
+from exchanges.gateio import GateApiException, GateIOConnector
+from grid_line_machine import GridLineManager
+
+
+def make_manager(_window=None) -> GridLineManager:
+    return GridLineManager(
+        _central_grid_price=1.0,
+        _distance_between_grids=0.1,
+        _ticker="TEST_USDT",
+        _usd_amount_to_buy_with=10,
+        _number_of_grids_on_each_side_of_grid_start_price=5,
+        _do_not_buy_above_this_price=10,
+        _do_not_buy_below_this_price=0.1,
+        _round_prices_to=5,
+        _window=_window,
+    )
+
+
+class FakeGateIOManager:
+    """Stands in for GateIOManager, orders are kept in memory and every call is recorded"""
+
+    def __init__(self):
+        self.calls: list[str] = []
+        self.open_orders: dict[str, ExchangeOrder] = {}
+        self.finished_orders: dict[str, ExchangeOrder] = {}
+        self.next_order_id = 1
+
+    def place(self, _grid_line, _currency_pair, _usd_amount_to_spend, _side) -> PlacedOrders:
+        order_id = str(self.next_order_id)
+        self.next_order_id += 1
+        amount = _usd_amount_to_spend / _grid_line.price
+        self.open_orders[order_id] = ExchangeOrder(
+            order_id, _currency_pair, _grid_line.price, amount, _side, "open", "open"
+        )
+        return PlacedOrders(_grid_line.price, amount, order_id, 0, _currency_pair, _side, True)
+
+    def fill(self, _order_id: str):
+        order = self.open_orders.pop(str(_order_id))
+        order.status, order.finish_as = "closed", "filled"
+        self.finished_orders[order.id] = order
+
+    async def batch_buy(self, _grid_lines, _currency_pair, _usd_amount_to_spend):
+        self.calls.append("batch_buy")
+        return [
+            self.place(_grid_line, _currency_pair, _usd_amount_to_spend, "buy")
+            for _grid_line in _grid_lines
+        ]
+
+    async def batch_orders(
+        self, _grid_lines_and_sides, _currency_pair, _usd_amount_to_spend, _priority=None
+    ):
+        self.calls.append("batch_orders")
+        return [
+            self.place(_grid_line, _currency_pair, _usd_amount_to_spend, _side)
+            for _grid_line, _side in _grid_lines_and_sides
+        ]
+
+    async def cancel_orders(self, _grid_lines, _currency_pair, _priority=None):
+        self.calls.append("cancel_orders")
+        cancelled = set()
+        for _grid_line in _grid_lines:
+            order = self.open_orders.pop(str(_grid_line.order_id), None)
+            if order is not None:
+                order.status, order.finish_as = "cancelled", "cancelled"
+                self.finished_orders[order.id] = order
+                cancelled.add(order.id)
+        return cancelled
+
+    async def get_orders(self, _ticker, _status):
+        self.calls.append(f"get_orders:{_status}")
+        orders = self.open_orders if _status == "open" else self.finished_orders
+        return [order for order in orders.values() if order.currency_pair == _ticker]
+
+    async def get_order_status(self, _order_id, _ticker):
+        self.calls.append("get_order_status")
+        return self.open_orders.get(str(_order_id)) or self.finished_orders[str(_order_id)]
+
+    async def get_all_open_orders(self):
+        self.calls.append("get_all_open_orders")
+        return [
+            OpenOrders(order.currency_pair, 1, [order]) for order in self.open_orders.values()
+        ]
+
+
+def test_manage_trades_reconciles_with_one_call_per_status():
+    manager = make_manager()
+    connector = GateIOConnector(manager)
+    giom = FakeGateIOManager()
+    mp = manager.central_grid_price * 1.05
+
+    asyncio.run(connector.manage_trades(mp, manager, giom))
+    buy_grids = [grid for grid in manager if grid.buy_order_placed]
+    assert len(buy_grids) == len([price for price in manager.grid_lines if price < mp])
+
+    # fill two buy orders then run one cycle
+    for grid in buy_grids[-2:]:
+        giom.fill(grid.order_id)
+    giom.calls.clear()
+    asyncio.run(connector.manage_trades(mp, manager, giom))
+
+    assert giom.calls.count("get_orders:open") == 1
+    assert giom.calls.count("get_orders:finished") == 1
+    assert "get_order_status" not in giom.calls
+    for grid in buy_grids[-2:]:
+        assert grid.buy_order_filled and grid.total_buy_orders == 1
+        assert grid.next_grid_line.sell_order_placed
+
+
+def test_buy_batch_order_includes_do_not_buy_bounds():
+    manager = make_manager()
+    # bounds sit exactly on grid lines 0.6561 and 0.9
+    manager.do_not_buy_below_price = manager.grid_lines[1]
+    manager.do_not_buy_above_price = manager.grid_lines[4]
+    connector = GateIOConnector(manager)
+    asyncio.run(connector.buy_batch_order(1.05, manager, FakeGateIOManager()))
+
+    bought = [grid.index for grid in manager if grid.buy_order_placed]
+    assert bought == [1, 2, 3, 4]
+    # same lines restore/resell and single order placement accept
+    assert np.flatnonzero(manager.buy_bounds_mask()).tolist() == bought
+    assert [grid.index for grid in manager if connector.can_place_order(grid, manager)] == bought
+
+
+def test_manage_trades_batches_follow_up_orders():
+    manager = make_manager()
+    connector = GateIOConnector(manager)
+    giom = FakeGateIOManager()
+    mp = manager.central_grid_price * 1.05
+    asyncio.run(connector.manage_trades(mp, manager, giom))
+
+    # price drops through three grid lines
+    filled_grids = [grid for grid in manager if grid.buy_order_placed][-3:]
+    for grid in filled_grids:
+        giom.fill(grid.order_id)
+    giom.calls.clear()
+    asyncio.run(connector.manage_trades(filled_grids[0].price * 0.99, manager, giom))
+
+    assert giom.calls.count("batch_orders") == 1
+    assert "buy" not in giom.calls and "sell" not in giom.calls
+    sell_grids = [grid.next_grid_line for grid in filled_grids]
+    for grid in sell_grids:
+        assert grid.sell_order_placed
+        assert giom.open_orders[grid.order_id].side == "sell"
+        assert giom.open_orders[grid.order_id].price == grid.price
+
+
+def test_sliding_grid_retires_and_resells_orders():
+    manager = make_manager(_window=4)
+    connector = GateIOConnector(manager)
+    giom = FakeGateIOManager()
+    asyncio.run(connector.manage_trades(1.05, manager, giom))
+    # window holds 1.0 + one line below, both get a buy
+    bought = manager.grid_line_obj_map_price(1.0)
+    assert [grid.price for grid in manager if grid.buy_order_placed] == [0.9, 1.0]
+
+    giom.fill(bought.order_id)
+    asyncio.run(connector.manage_trades(1.05, manager, giom))
+    sell_grid = bought.next_grid_line
+    assert sell_grid.sell_order_placed
+
+    # price runs far up, every order left behind is cancelled in one batch
+    giom.calls.clear()
+    asyncio.run(connector.manage_trades(3.0, manager, giom))
+    assert giom.calls.count("cancel_orders") == 1
+    assert not sell_grid.sell_order_placed and bought.buy_order_filled
+    assert len(giom.open_orders) <= 4
+    assert all(order.price > 2 for order in giom.open_orders.values())
+
+    # window comes back, held tokens get their sell order again
+    asyncio.run(connector.manage_trades(1.05, manager, giom))
+    assert sell_grid.sell_order_placed
+    assert giom.open_orders[sell_grid.order_id].side == "sell"
+    assert len(giom.open_orders) <= 4
+
+
+def test_reconcile_orders_handles_cancelled_orders():
+    manager = make_manager()
+    connector = GateIOConnector(manager)
+    giom = FakeGateIOManager()
+    grid = manager[2]
+    asyncio.run(connector.place_orders([(grid, "buy")], manager, giom))
+
+    cancelled = giom.open_orders.pop(str(grid.order_id))
+    cancelled.status, cancelled.finish_as = "cancelled", "cancelled"
+    giom.finished_orders[cancelled.id] = cancelled
+
+    assert asyncio.run(connector.reconcile_orders(manager, giom)) == []
+    assert not grid.buy_order_placed and grid.order_id == 0
+
+
+def test_reconcile_orders_skips_cycle_on_api_errors():
+    manager = make_manager()
+    connector = GateIOConnector(manager)
+    giom = FakeGateIOManager()
+    grids = [manager[2], manager[3]]
+    asyncio.run(connector.place_orders([(grid, "buy") for grid in grids], manager, giom))
+    for grid in grids:
+        giom.fill(grid.order_id)
+    # both fills fall off the finished list, looked up one by one
+    hidden = {grid.order_id: giom.finished_orders.pop(grid.order_id) for grid in grids}
+    lookups = []
+
+    async def get_order_status(_order_id, _ticker):
+        lookups.append(_order_id)
+        if len(lookups) == 1:
+            raise GateApiException(429, "TOO_MANY_REQUESTS", "")
+        return hidden[_order_id]
+
+    giom.get_order_status = get_order_status
+    assert asyncio.run(connector.reconcile_orders(manager, giom)) == []
+    assert all(grid.buy_order_placed and not grid.buy_order_filled for grid in grids)
+
+    async def fail(_ticker, _status):
+        raise aiohttp.ClientConnectionError("reset")
+
+    get_orders, giom.get_orders = giom.get_orders, fail
+    assert asyncio.run(connector.reconcile_orders(manager, giom)) == []
+
+    giom.get_orders = get_orders
+    filled = asyncio.run(connector.reconcile_orders(manager, giom))
+    assert [grid for grid, _ in filled] == grids
+    assert all(grid.buy_order_filled for grid in grids)
+
+
+def test_remove_duplicate_orders_restores_grid_state():
+    manager = make_manager()
+    connector = GateIOConnector(manager)
+    giom = FakeGateIOManager()
+    buy_grid, sell_grid = manager[2], manager[6]
+    open_orders_by_pair = {
+        "TEST_USDT": [
+            ExchangeOrder("1", "TEST_USDT", buy_grid.price, 10, "buy", "open", "open"),
+            ExchangeOrder("2", "TEST_USDT", sell_grid.price, 10, "sell", "open", "open"),
+            # not on a grid line
+            ExchangeOrder("3", "TEST_USDT", 0.123456, 10, "buy", "open", "open"),
+        ],
+        "OTHER_USDT": [
+            ExchangeOrder("4", "OTHER_USDT", buy_grid.price, 10, "sell", "open", "open"),
+        ],
+    }
+
+    grids = asyncio.run(
+        connector.remove_duplicate_orders(manager, giom, open_orders_by_pair)
+    )
+    assert giom.calls == []
+    assert [grid.name for grid in grids] == [buy_grid.name, sell_grid.name, manager[5].name]
+    assert buy_grid.buy_order_placed and buy_grid.order_id == "1"
+    assert sell_grid.sell_order_placed and sell_grid.order_id == "2"
+    assert manager[5].buy_order_filled and manager[5].total_buy_orders == 1
+
+
+def test_remove_duplicate_orders_vectorized_matches_loop(monkeypatch):
+    import exchanges.connector as connector_module
+
+    def restore(_vectorize_min_orders: int):
+        monkeypatch.setattr(connector_module, "VECTORIZE_MIN_ORDERS", _vectorize_min_orders)
+        manager = GridLineManager(
+            _central_grid_price=1.0,
+            _distance_between_grids=0.01,
+            _ticker="TEST_USDT",
+            _usd_amount_to_buy_with=10,
+            _number_of_grids_on_each_side_of_grid_start_price=50,
+            _do_not_buy_above_this_price=10,
+            _do_not_buy_below_this_price=0.1,
+            _round_prices_to=5,
+        )
+        prices = manager.grid_lines
+        orders = [
+            ExchangeOrder(str(index), "TEST_USDT", price, 10, "buy", "open", "open")
+            for index, price in enumerate(prices[:50])
+        ]
+        orders += [
+            ExchangeOrder(f"s{index}", "TEST_USDT", price, 10, "sell", "open", "open")
+            for index, price in enumerate(prices[51:60])
+        ]
+        # sell on the lowest grid line and orders off the grid are skipped
+        orders.append(ExchangeOrder("low", "TEST_USDT", prices[0], 10, "sell", "open", "open"))
+        orders.append(ExchangeOrder("off", "TEST_USDT", 0.123456, 10, "buy", "open", "open"))
+        grids = asyncio.run(
+            GateIOConnector(manager).remove_duplicate_orders(
+                manager, FakeGateIOManager(), {"TEST_USDT": orders}
+            )
+        )
+        store = manager.store
+        return [grid.index for grid in grids], store.state.tolist(), store.order_id.tolist(), (
+            store.total_buy_orders.tolist(), store.order_index
+        )
+
+    assert restore(10**6) == restore(0)
+
+
+### event driven price updates
+def test_price_update_wakes_watchers_on_change_only():
+    price_object = PriceUpdate("TEST_USDT")
+
+    async def run():
+        waiters = [asyncio.create_task(price_object.wait_for_change(0)) for _ in range(3)]
+        await asyncio.sleep(0)
+        assert not any(waiter.done() for waiter in waiters)
+
+        assert price_object.set_market_price(1.5)
+        versions = await asyncio.gather(*waiters)
+
+        waiter = asyncio.create_task(price_object.wait_for_change(price_object.version))
+        assert not price_object.set_market_price(1.5)
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        price_object.set_market_price(1.6)
+        price_object.set_market_price(1.7)
+        return versions, await waiter
+
+    versions, last_version = asyncio.run(run())
+    assert versions == [1, 1, 1]
+    assert last_version == 3 and price_object.market_price == 1.7
+
+
+def test_ticker_watcher_runs_only_on_price_changes():
+    manager = make_manager()
+    connector = GateIOConnector(manager)
+    giom = FakeGateIOManager()
+    price_object = GateIOConnector.prices_objects[manager.ticker]
+    regions = []
+    get_region = manager.get_region
+    manager.get_region = lambda _price: regions.append(_price) or get_region(_price)
+
+    async def run():
+        watcher = asyncio.create_task(connector.ticker_watcher(manager, giom, {}))
+        await asyncio.sleep(0.01)
+        assert giom.calls == []  # no price yet
+        price_object.set_market_price(1.01)
+        await asyncio.sleep(0.01)
+        price_object.set_market_price(1.01)
+        await asyncio.sleep(0.01)
+        price_object.set_market_price(1.02)
+        await asyncio.sleep(0.01)
+        watcher.cancel()
+
+    asyncio.run(run())
+    assert "batch_buy" in giom.calls
+    assert regions == [1.01, 1.02]
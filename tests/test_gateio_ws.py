@@ -0,0 +1,149 @@
+import asyncio, aiohttp, hashlib, hmac, pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from exchanges import PriceUpdate
+from exchanges.gateio_ws import GateIOOrderStream, GateIOPriceStream
+from exchanges.websocket import WebsocketStream
+
+
+def ticker_update(_ticker: str, _price: str) -> dict:
+    return {
+        "time": 0,
+        "channel": "spot.tickers",
+        "event": "update",
+        "result": {"currency_pair": _ticker, "last": _price, "highest_bid": _price},
+    }
+
+
+def test_handle_message():
+    prices = {"VANRY_USDT": PriceUpdate("VANRY_USDT")}
+    stream = GateIOPriceStream(prices)
+
+    assert stream.handle_message(ticker_update("VANRY_USDT", "0.197")) is prices["VANRY_USDT"]
+    assert prices["VANRY_USDT"].market_price == 0.197
+    # untracked tickers and subscribe acks are ignored
+    assert stream.handle_message(ticker_update("BTC_USDT", "60000")) is None
+    assert stream.handle_message({"channel": "spot.tickers", "event": "subscribe"}) is None
+
+
+def test_stream_reconnects_and_resubscribes():
+    prices = {"VANRY_USDT": PriceUpdate("VANRY_USDT"), "CPOOL_USDT": PriceUpdate("CPOOL_USDT")}
+    subscriptions = []
+
+    async def ws_handler(request):
+        # sends one price per connection then drops it
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        subscribe = await ws.receive_json()
+        subscriptions.append(subscribe["payload"])
+        await ws.send_json(ticker_update("VANRY_USDT", f"0.{len(subscriptions)}"))
+        await ws.close()
+        return ws
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/ws/v4/", ws_handler)
+        async with TestServer(app) as server:
+            stream = GateIOPriceStream(
+                prices, str(server.make_url("/ws/v4/")), _reconnect_delay=0.01
+            )
+            task = asyncio.create_task(stream.run())
+            while len(subscriptions) < 3:
+                await asyncio.sleep(0.01)
+            task.cancel()
+            return stream
+
+    stream = asyncio.run(run())
+    assert stream.connections >= 3
+    assert all(sorted(payload) == ["CPOOL_USDT", "VANRY_USDT"] for payload in subscriptions)
+    assert prices["VANRY_USDT"].market_price is not None
+    assert prices["CPOOL_USDT"].market_price is None
+
+
+def test_reconnect_backoff_resets_after_connecting(caplog):
+    # 3 failed connects, one connection that drops, then one more failed connect
+    outcomes = iter(["fail", "fail", "fail", "drop", "fail"])
+
+    class Stream(WebsocketStream):
+        async def stream(self, _session):
+            outcome = next(outcomes, "stop")
+            if outcome == "stop":
+                raise RuntimeError("done")
+            if outcome == "drop":
+                self.connections += 1
+            raise aiohttp.ClientError(outcome)
+
+    stream = Stream("ws://unused", _reconnect_delay=0.01, _max_reconnect_delay=0.05)
+    with pytest.raises(RuntimeError):
+        asyncio.run(stream.run())
+    delays = [record.fields["delay"] for record in caplog.records if record.name == "dca.websocket"]
+    assert delays == [0.01, 0.02, 0.04, 0.01, 0.02]
+
+
+def test_stream_survives_handler_errors():
+    orders = []
+
+    def on_order(_order):
+        orders.append(_order)
+        if len(orders) == 1:
+            raise KeyError("grid line gone")
+
+    async def ws_handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.receive_json()
+        await ws.send_str("not json")
+        for event, finish_as in (("put", "open"), ("finish", "filled")):
+            await ws.send_json({"channel": "spot.orders", "event": "update", "result": [order_update(event, finish_as)]})
+        await ws.receive()
+        return ws
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/ws/v4/", ws_handler)
+        async with TestServer(app) as server:
+            stream = GateIOOrderStream(
+                ["VANRY_USDT"], on_order, str(server.make_url("/ws/v4/")), _reconnect_delay=0.01
+            )
+            task = asyncio.create_task(stream.run())
+            while len(orders) < 2 and not task.done():
+                await asyncio.sleep(0.01)
+            task.cancel()
+            return stream
+
+    stream = asyncio.run(run())
+    # same connection kept, message after the failing one still handled
+    assert stream.connections == 1
+    assert [order.finish_as for order in orders] == ["open", "filled"]
+
+
+def order_update(_event: str, _finish_as: str) -> dict:
+    return {
+        "id": "7", "currency_pair": "VANRY_USDT", "side": "buy", "price": "0.19",
+        "amount": "52.6", "left": "0", "create_time": "1700000000",
+        "event": _event, "finish_as": _finish_as,
+    }
+
+
+def test_order_stream():
+    orders = []
+    stream = GateIOOrderStream(["VANRY_USDT"], orders.append, _key="key", _secret="secret")
+
+    subscribe = stream.subscribe_message()
+    assert subscribe["payload"] == ["VANRY_USDT"] and subscribe["auth"]["KEY"] == "key"
+    signed = f"channel=spot.orders&event=subscribe&time={subscribe['time']}"
+    assert subscribe["auth"]["SIGN"] == hmac.new(b"secret", signed.encode(), hashlib.sha512).hexdigest()
+
+    message = {
+        "channel": "spot.orders", "event": "update",
+        "result": [order_update("put", "open"), order_update("finish", "filled"), order_update("finish", "cancelled")],
+    }
+    assert stream.handle_message(message) == orders
+    assert [(order.status, order.finish_as) for order in orders] == [
+        ("open", "open"), ("closed", "filled"), ("cancelled", "cancelled"),
+    ]
+    assert orders[1].id == "7" and orders[1].amount == 52.6
+    # subscribe acks and errors aren't order events
+    assert stream.handle_message({"channel": "spot.orders", "event": "subscribe", "result": {}}) == []
+    assert stream.handle_message({"channel": "spot.orders", "error": {"code": 2}}) == []
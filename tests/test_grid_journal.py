@@ -0,0 +1,151 @@
+import asyncio
+
+from exchanges import ExchangeOrder
+from exchanges.gateio import GateIOConnector
+from exchanges.simulator import GateIOSimulator
+from grid_journal import GridJournal
+from tests.test_gateio_connector import FakeGateIOManager, make_manager
+from tests.test_simulator import make_manager as make_sim_manager, start
+
+
+def test_journal_restores_exact_state(tmp_path):
+    path = str(tmp_path / "grid.db")
+    manager = make_manager()
+    journal = GridJournal(path, _compact_after_rows=1)
+    journal.track(manager)
+
+    manager[3].buy_order_success("11")
+    assert journal.flush() == 1
+    # compact folds first rows into snapshot, later ones stay in journal
+    journal.compact()
+    manager[3].buy_order_triggerd(10)
+    manager[4].sell_order_success("12")
+    manager[7].buy_order_success("13")
+    manager[7].order_cancelled()
+    assert journal.flush() == 2
+    assert journal.flush() == 0
+    journal.close()
+
+    restored = make_manager()
+    journal = GridJournal(path)
+    assert journal.restore(restored) == 2
+    assert restored[3].buy_order_filled and restored[3].total_tokens == 10
+    assert restored[3].total_buy_orders == 1 and restored[3].order_id == 0
+    assert restored[4].sell_order_placed and restored[4].order_id == "12"
+    assert not restored[7].buy_order_placed
+    assert list(restored.store.state) == list(manager.store.state)
+    journal.close()
+
+
+def test_journal_ignores_lines_of_another_grid(tmp_path):
+    path = str(tmp_path / "grid.db")
+    manager = make_manager()
+    journal = GridJournal(path)
+    journal.track(manager)
+    manager[3].buy_order_success("11")
+    journal.close()
+
+    other_grid = make_manager()
+    # same ticker, different central price
+    other_grid.store.price[:] *= 1.01
+    journal = GridJournal(path)
+    assert journal.restore(other_grid) == 0
+    assert not other_grid[3].buy_order_placed
+    journal.close()
+
+
+def test_resume_from_journal_only_reconciles_delta(tmp_path):
+    manager = make_manager()
+    connector = GateIOConnector(manager)
+    giom = FakeGateIOManager()
+    mp = manager.central_grid_price * 1.05
+    asyncio.run(connector.manage_trades(mp, manager, giom))
+    journal = GridJournal(str(tmp_path / "grid.db"))
+    journal.track(manager)
+    journal.close()
+
+    # while down one buy filled, and one order journal never saw is open
+    filled = [grid for grid in manager if grid.buy_order_placed][-1]
+    giom.fill(filled.order_id)
+    unknown = ExchangeOrder("99", "TEST_USDT", manager[8].price, 10, "sell", "open", "open")
+    giom.open_orders["99"] = unknown
+
+    restored = make_manager()
+    journal = GridJournal(str(tmp_path / "grid.db"))
+    assert journal.restore(restored) > 0
+    giom.calls.clear()
+    asyncio.run(connector.resume_from_journal(mp, restored, giom))
+    journal.close()
+
+    assert "batch_buy" not in giom.calls
+    assert restored[filled.index].buy_order_filled
+    assert restored[filled.index + 1].sell_order_placed
+    assert restored[8].sell_order_placed and restored[8].order_id == "99"
+
+
+def test_journal_restores_sliding_grid_by_level(tmp_path):
+    path = str(tmp_path / "grid.db")
+    manager = make_manager(_window=4)
+    journal = GridJournal(path)
+    journal.track(manager)
+    grid = manager[2]
+    grid.buy_order_success("21")
+    journal.flush()
+    # grid grows below, grid line keeps its level in the journal
+    manager.extend_to(manager.grid_lines[0] * 0.5)
+    grid.buy_order_triggerd(10)
+    low = manager[0]
+    low.buy_order_success("22")
+    assert journal.flush() == 2
+    journal.close()
+
+    restored = make_manager(_window=4)
+    journal = GridJournal(path)
+    assert journal.restore(restored) == 2
+    # restore grew the grid down to the lowest journaled line
+    assert restored.grid_line_obj_map_price(grid.price).buy_order_filled
+    assert restored.grid_line_obj_map_price(low.price).order_id == "22"
+    journal.close()
+
+
+def test_entry_point_stops_every_task_before_closing(tmp_path):
+    simulator = GateIOSimulator({"SIM_USDT": [1.0, 0.999] * 50}, _tick_interval=0.02)
+    manager = make_sim_manager()
+    journal = GridJournal(str(tmp_path / "grid.db"))
+
+    async def failing_run():
+        # one task dying ends entry_point, the others must not outlive it
+        while not manager.grid_lines_with_orders():
+            await asyncio.sleep(0.01)
+        raise RuntimeError("journal task died")
+
+    journal.run = failing_run
+
+    async def run():
+        server, host = await start(simulator)
+        connector = GateIOConnector(
+            manager, _host=host, _ws_url=host.replace("http", "ws") + "/ws/v4/",
+            _log_ticks=False, _journal=journal, _reconcile_interval=0.01,
+        )
+        before = asyncio.all_tasks()
+        error = None
+        try:
+            await asyncio.wait_for(connector.entry_point(), 5)
+        except RuntimeError as e:
+            error = e
+        # price stream, order stream, reconcile loops and ticker watcher are gone
+        # too, only the test server's connection handlers may be left
+        await asyncio.sleep(0.05)
+        left = {
+            running.get_coro().__qualname__
+            for running in asyncio.all_tasks() - before
+            if not running.done() and not running.get_coro().__qualname__.startswith("RequestHandler")
+        }
+        for running in asyncio.all_tasks() - before - {asyncio.current_task()}:
+            running.cancel()
+        await server.close()
+        return error, left
+
+    error, left = asyncio.run(run())
+    assert str(error) == "journal task died"
+    assert left == set()
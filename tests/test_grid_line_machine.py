@@ -0,0 +1,252 @@
+import pytest
+import random
+from grid_line_machine import GridLineManager, GridLine, REGION_CACHE_SIZE, BUY_ORDER_PLACED
+
+
+def make_manager(_grid_price=1.0, _number_of_grids=10, _decimals=5) -> GridLineManager:
+    return GridLineManager(
+        _central_grid_price=_grid_price,
+        _distance_between_grids=0.05,
+        _ticker="TEST_USDT",
+        _usd_amount_to_buy_with=10,
+        _number_of_grids_on_each_side_of_grid_start_price=_number_of_grids,
+        _do_not_buy_above_this_price=_grid_price * 2,
+        _do_not_buy_below_this_price=_grid_price / 2,
+        _round_prices_to=_decimals,
+    )
+
+
+@pytest.fixture
+def manager():
+    return make_manager()
+
+
+### get_region
+def test_get_region_brackets_price(manager):
+    grid_lines = manager.grid_lines
+    for _ in range(500):
+        market_price = random.uniform(grid_lines[0], grid_lines[-1])
+        lower_grid, upper_grid = manager.get_region(market_price)
+        _price = round(market_price, manager.round_price_to)
+        assert lower_grid <= _price
+        # price sitting on the highest grid line falls in the last region
+        assert _price < upper_grid or upper_grid == grid_lines[-1]
+        assert grid_lines.index(upper_grid) == grid_lines.index(lower_grid) + 1
+
+
+def test_get_region_on_grid_line(manager):
+    grid_line = manager.grid_lines[4]
+    assert manager.get_region(grid_line) == (grid_line, manager.grid_lines[5])
+
+
+def test_get_region_outside_of_grid(manager):
+    grid_lines = manager.grid_lines
+    assert manager.get_region(grid_lines[0] / 2) == (grid_lines[0], grid_lines[1])
+    assert manager.get_region(grid_lines[-1] * 2) == (grid_lines[-2], grid_lines[-1])
+
+
+def test_get_region_grid_lines(manager):
+    market_price = manager.central_grid_price * 1.01
+    lower, upper = manager.get_region_grid_lines(market_price)
+    assert isinstance(lower, GridLine) and isinstance(upper, GridLine)
+    assert (lower.price, upper.price) == manager.get_region(market_price)
+    assert lower.next_grid_line is upper
+
+
+def test_region_cache_is_bounded(manager):
+    for index in range(REGION_CACHE_SIZE * 2):
+        manager.get_region(manager.central_grid_price + index * 10**-5)
+    assert len(manager._region_cache) == REGION_CACHE_SIZE
+    # caches are per manager
+    assert len(make_manager()._region_cache) == 0
+
+
+### price tick index
+def test_grid_line_obj_map_price(manager):
+    for grid in manager:
+        assert manager.grid_line_obj_map_price(grid.price) is grid
+        # exchanges return prices as strings, with trailing zeros
+        assert manager.grid_line_obj_map_price(f"{grid.price:.8f}") is grid
+
+
+def test_grid_line_obj_map_price_not_on_grid(manager):
+    assert manager.grid_line_obj_map_price(manager.central_grid_price + 10**-5) is None
+
+
+def test_grid_line_indices_match_grid_line_index():
+    # 2 decimals collapse the lowest grid lines onto the same prices
+    manager = make_manager(_grid_price=0.2, _number_of_grids=40, _decimals=2)
+    prices = manager.grid_lines + ["0.123", f"{manager.grid_lines[-1] * 2}", "0.05"]
+    expected = [manager.grid_line_index(price) for price in prices]
+    assert manager.grid_line_indices(prices).tolist() == [
+        -1 if index is None else index for index in expected
+    ]
+
+
+def test_price_to_tick(manager):
+    assert manager.price_to_tick("0.10072") == 10072
+    assert manager.price_to_tick(0.1 + 0.2) == 30000
+
+
+### closed form grid
+def test_grid_prices_closed_form():
+    manager = make_manager(_number_of_grids=3)
+    assert manager.grid_lines == manager.grid_prices(range(-3, 4)).tolist()
+    # any grid line is computed directly, beyond the grid too
+    assert manager.grid_prices([-40, 0, 40]).tolist() == [
+        round(0.95**40, 5), 1.0, round(1.05**40, 5),
+    ]
+    assert manager.first_step == -3
+
+
+def test_grid_line_views_created_lazily():
+    manager = GridLineManager(
+        _central_grid_price=1.0,
+        _distance_between_grids=0.001,
+        _ticker="TEST_USDT",
+        _usd_amount_to_buy_with=10,
+        _number_of_grids_on_each_side_of_grid_start_price=100_000,
+        _do_not_buy_above_this_price=2,
+        _do_not_buy_below_this_price=0.5,
+        _round_prices_to=8,
+    )
+    views = manager.grid_lines_as_objects
+    assert len(views) == 200_001 and views.materialized() == []
+    grid = manager[100_500]
+    assert manager.grid_line_obj_map_price(grid.price) is grid
+    assert grid.next_grid_line.last_grid_line is grid and manager[-1].next_grid_line is None
+    assert len(views.materialized()) == 3
+    with pytest.raises(IndexError):
+        manager[200_001]
+    # slices are lists of the same views, only the sliced lines are created
+    assert views[100_499:100_502] == [grid.last_grid_line, grid, grid.next_grid_line]
+    assert views[-2:] == [manager[-2], manager[-1]] and views[5:2] == []
+    assert len(views.materialized()) == 5
+
+
+### grid line store
+def test_grid_line_views_write_to_store(manager):
+    grid = manager[3]
+    grid.buy_order_success("42")
+    assert manager.store.order_id[3] == "42" and manager.store.has_state(BUY_ORDER_PLACED)[3]
+    grid.buy_order_triggerd(5)
+    assert not grid.buy_order_placed and grid.buy_order_filled
+    assert manager.store.total_tokens[3] == 5 and grid.total_cost == grid.price * 5
+    # one view per grid line
+    assert grid.next_grid_line.last_grid_line is grid
+    assert manager[0].last_grid_line is None and manager[len(manager.grid_lines) - 1].next_grid_line is None
+
+
+def test_free_grid_lines_below(manager):
+    # buy bounds are 0.5 .. 2
+    below_central = [grid for grid in manager if 0.5 <= grid.price < 1.0]
+    manager[8].buy_order_success("1")
+    manager[7].buy_order_filled = True
+    free = manager.free_grid_lines_below(1.0, _exclude=[manager[6]])
+    assert free == [grid for grid in below_central if grid.index not in (6, 7, 8)]
+    assert manager.grid_lines_with_orders() == [manager[8]]
+
+
+def test_grid_line_by_order_id(manager):
+    manager[4].buy_order_success(17)
+    manager[5].sell_order_success("18")
+    assert manager.grid_line_by_order_id("17") is manager[4]
+    assert manager.grid_line_by_order_id(18) is manager[5]
+    # filled orders no longer belong to a grid line
+    manager[4].buy_order_triggerd(1)
+    assert manager.grid_line_by_order_id("17") is None
+    assert manager.store.order_index == {"18": 5}
+
+
+def test_snap_to_decimals():
+    manager = make_manager(_number_of_grids=3)
+    assert not manager.snap_to_decimals(manager.round_price_to)
+    assert manager.snap_to_decimals(2)
+    assert manager.round_price_to == 2
+    assert manager.grid_lines == manager.grid_prices(range(-3, 4)).tolist() == [0.86, 0.9, 0.95, 1.0, 1.05, 1.1, 1.16]
+    assert manager.grid_line_obj_map_price("0.8600") is manager[0]
+    # grid lines holding orders can't move
+    manager[1].buy_order_success("1")
+    with pytest.raises(ValueError):
+        manager.snap_to_decimals(1)
+
+
+def test_order_index_follows_order_id_writes(manager):
+    store = manager.store
+    store.set_order_ids([2, 3], ["a", "b"])
+    manager[2].buy_order_placed = manager[3].buy_order_placed = True
+    assert manager.grid_line_by_order_id("b") is manager[3]
+    # replaced and cancelled orders drop out
+    manager[2].buy_order_success("c")
+    manager[3].order_cancelled()
+    assert [manager.grid_line_by_order_id(order_id) for order_id in "abc"] == [None, None, manager[2]]
+    assert "b" not in store.order_index
+    # lines added below shift every row
+    line = manager[2]
+    store.extend([0.001, 0.002], [])
+    assert manager.grid_line_by_order_id("c") is line and line.index == 4
+    assert store.order_index == {
+        str(order_id): index for index, order_id in enumerate(store.order_id.tolist()) if order_id != 0
+    }
+
+
+### sliding grid
+def make_sliding_manager(_window=4) -> GridLineManager:
+    return GridLineManager(
+        _central_grid_price=1.0,
+        _distance_between_grids=0.05,
+        _ticker="TEST_USDT",
+        _usd_amount_to_buy_with=10,
+        _number_of_grids_on_each_side_of_grid_start_price=2,
+        _do_not_buy_above_this_price=100,
+        _do_not_buy_below_this_price=0.01,
+        _round_prices_to=5,
+        _window=_window,
+    )
+
+
+def test_sliding_window_too_small():
+    with pytest.raises(ValueError):
+        make_sliding_manager(_window=1)
+
+
+def test_extend_to_keeps_grid_lines_and_state():
+    manager = make_sliding_manager()
+    grid = manager.grid_line_obj_map_price(0.95)
+    grid.buy_order_success("7")
+    # 5 lines, each side short of window grows by the grid size
+    assert manager.extend_to(1.0) == 10
+
+    added = manager.extend_to(0.5)
+    prices = manager.grid_lines
+    assert added >= len(prices) // 2 and prices == sorted(prices)
+    assert sum(price <= 0.5 for price in prices) >= 4
+    # views were re-indexed, not rebuilt
+    assert manager.grid_line_obj_map_price(0.95) is grid and grid.order_id == "7"
+    assert manager[grid.index] is grid and grid.name == "grid_line_2"
+    assert grid.next_grid_line.price == 1.0
+    lower, upper = manager.get_region(0.5)
+    assert lower <= 0.5 < upper
+    # nothing to add while price stays inside the grid
+    assert manager.extend_to(0.95) == 0
+
+
+def test_window_orders_outside_and_resell():
+    manager = make_sliding_manager()
+    manager.extend_to(0.5)
+    first, last = manager.window_range(1.0)
+    assert last - first + 1 == 4 and manager.store.price[first + 1] == 1.0
+    assert manager.window_mask(1.0).sum() == 4
+
+    below = manager.grid_line_obj_map_price(0.95)
+    below.buy_order_filled = True
+    manager[below.index + 1].sell_order_success("8")
+    far = manager[first - 3]
+    far.buy_order_success("9")
+    assert manager.grid_lines_outside_window(1.0) == [far]
+    assert manager.grid_lines_to_resell(1.0) == []
+    # sell retired while window was away is placed again once it is back
+    manager[below.index + 1].order_cancelled()
+    assert manager.grid_lines_to_resell(1.0) == [manager[below.index + 1]]
+    assert manager.grid_line_obj_map_price(0.95).index == first
+    assert manager.free_grid_lines_below(1.0) == []
@@ -0,0 +1,98 @@
+import asyncio, logging, os, pstats, signal, time
+
+from loop_monitor import LoopMonitor
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records: list[logging.LogRecord] = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def blocking_manage_trades():
+    # stands in for a sync call made on the event loop
+    time.sleep(0.3)
+
+
+def test_monitor_logs_stack_of_blocking_callback():
+    handler = ListHandler()
+    logger = logging.getLogger("dca.loop")
+    logger.addHandler(handler)
+    monitor = LoopMonitor(_interval=0.02, _threshold=0.1, _profile_signal=None)
+
+    async def run():
+        monitor.start()
+        await asyncio.sleep(0.05)
+        blocking_manage_trades()
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+    try:
+        asyncio.run(run())
+    finally:
+        logger.removeHandler(handler)
+
+    assert monitor.stalls == 1
+    assert monitor.max_lag > 0.2
+    stack = handler.records[0].fields["stack"]
+    assert "blocking_manage_trades" in stack[-1]
+    assert any(":run:" in frame for frame in stack)
+
+
+def busy(_seconds: float):
+    end = time.monotonic() + _seconds
+    while time.monotonic() < end:
+        pass
+
+
+async def ticker_watcher_cycles(_seconds: float):
+    end = time.monotonic() + _seconds
+    while time.monotonic() < end:
+        busy(0.02)
+        await asyncio.sleep(0)
+
+
+def test_profile_window_writes_pstats_and_folded_stacks(tmp_path):
+    monitor = LoopMonitor(
+        _profile_signal=None, _profile_dir=str(tmp_path), _profile_seconds=0.2, _profile_on_start=True
+    )
+
+    async def run():
+        monitor.start()
+        # a second window isn't started while one runs
+        assert monitor.start_profile() is None
+        await ticker_watcher_cycles(0.4)
+        await monitor.stop()
+
+    asyncio.run(run())
+
+    pstats_files = list(tmp_path.glob("*.pstats"))
+    folded_files = list(tmp_path.glob("*.folded"))
+    assert len(pstats_files) == len(folded_files) == 1
+    stats = pstats.Stats(str(pstats_files[0]))
+    assert any(function == "ticker_watcher_cycles" for _, _, function in stats.stats)
+    folded = folded_files[0].read_text().splitlines()
+    assert any("ticker_watcher_cycles" in line for line in folded)
+    # "stack count" lines
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in folded)
+    assert monitor.profile is None
+
+
+def test_signal_starts_profile_window(tmp_path):
+    monitor = LoopMonitor(
+        _profile_signal=signal.SIGUSR1, _profile_dir=str(tmp_path), _profile_seconds=0.05
+    )
+
+    async def run():
+        monitor.start()
+        os.kill(os.getpid(), signal.SIGUSR1)
+        await asyncio.sleep(0.01)
+        assert monitor.profile is not None
+        await asyncio.sleep(0.2)
+        await monitor.stop()
+
+    asyncio.run(run())
+    assert len(list(tmp_path.glob("*.pstats"))) == 1
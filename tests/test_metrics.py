@@ -0,0 +1,93 @@
+import asyncio, time
+import aiohttp
+
+from exchanges import PriceUpdate
+from exchanges.connector import collect_price_staleness
+from exchanges.gateio import GateIOConnector
+from metrics import API_CALL_SECONDS, PRICE_STALENESS_SECONDS, REGISTRY
+from metrics import Counter, Histogram, Registry, start_metrics_server
+from tests.test_gateio import gateio_stand_in, make_gateio
+
+
+def test_histogram_buckets_are_cumulative_when_rendered():
+    histogram = Histogram("latency_seconds", "help", ("method",), _buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, "prices")
+
+    assert histogram.count("prices") == 4
+    assert histogram.count("other") == 0
+    assert list(histogram.render()) == [
+        "# HELP latency_seconds help",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{method="prices",le="0.1"} 2',
+        'latency_seconds_bucket{method="prices",le="1"} 3',
+        'latency_seconds_bucket{method="prices",le="+Inf"} 4',
+        'latency_seconds_sum{method="prices"} 2.65',
+        'latency_seconds_count{method="prices"} 4',
+    ]
+
+
+def test_histogram_time_observes_when_block_raises():
+    histogram = Histogram("latency_seconds", "help")
+    try:
+        with histogram.time():
+            raise ValueError
+    except ValueError:
+        pass
+    assert histogram.count() == 1
+
+
+def test_registry_runs_collectors_before_render():
+    registry = Registry()
+    counter = registry.register(Counter("errors_total", "help", ("label",)))
+    registry.add_collector(lambda: counter.inc('say "hi"'))
+
+    assert 'errors_total{label="say \\"hi\\""} 1' in registry.render().splitlines()
+
+
+def test_price_staleness_of_tracked_tickers():
+    price_object = PriceUpdate("STALE_USDT")
+    GateIOConnector.prices_objects["STALE_USDT"] = price_object
+    try:
+        collect_price_staleness()
+        # no price yet, nothing to report
+        assert ("gateio", "STALE_USDT") not in PRICE_STALENESS_SECONDS.values
+
+        price_object.set_market_price(1.0)
+        price_object.updated_at = time.monotonic() - 30
+        collect_price_staleness()
+        assert 29 < PRICE_STALENESS_SECONDS.values[("gateio", "STALE_USDT")] < 60
+
+        # same price still counts as the feed reporting the ticker
+        assert not price_object.set_market_price(1.0)
+        collect_price_staleness()
+        assert PRICE_STALENESS_SECONDS.values[("gateio", "STALE_USDT")] < 1
+    finally:
+        del GateIOConnector.prices_objects["STALE_USDT"]
+        PRICE_STALENESS_SECONDS.values.pop(("gateio", "STALE_USDT"), None)
+
+
+def test_metrics_endpoint_serves_api_latency():
+    before = API_CALL_SECONDS.count("gateio", "prices")
+
+    async def run():
+        server = await gateio_stand_in([])
+        gateio = make_gateio(server)
+        runner = await start_metrics_server(0)
+        port = runner.addresses[0][1]
+        try:
+            await gateio.prices(["T1_USDT"])
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"http://127.0.0.1:{port}/metrics") as r:
+                    return r.status, r.headers["Content-Type"], await r.text()
+        finally:
+            await runner.cleanup()
+            await gateio.close()
+            await server.close()
+
+    status, content_type, text = asyncio.run(run())
+    assert status == 200
+    assert content_type.startswith("text/plain")
+    assert API_CALL_SECONDS.count("gateio", "prices") == before + 1
+    assert f'dca_api_call_seconds_count{{exchange="gateio",method="prices"}} {before + 1}' in text.splitlines()
+    assert "# TYPE dca_manage_trades_seconds histogram" in text
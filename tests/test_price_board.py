@@ -0,0 +1,45 @@
+import asyncio, pickle
+
+from exchanges import PriceUpdate
+from exchanges.price_board import BoardPriceUpdate, PriceBoard, PriceBoardReader
+
+
+def test_board_publish_and_attach():
+    board = PriceBoard.create(["A_USDT", "B_USDT"])
+    try:
+        assert board.price("A_USDT") is None
+        BoardPriceUpdate("A_USDT", board=board).set_market_price(1.5)
+        # a pickled board (i.e a Process arg) maps the same memory
+        attached = pickle.loads(pickle.dumps(board))
+        assert attached.price("A_USDT") == 1.5 and attached.price("B_USDT") is None
+        board.publish("B_USDT", 2.0)
+        assert attached.price("B_USDT") == 2.0
+        attached.close()
+    finally:
+        board.close()
+        board.unlink()
+
+
+def test_reader_wakes_watchers_on_change_only():
+    board = PriceBoard.create(["A_USDT", "B_USDT", "C_USDT"])
+    prices_objects = {"C_USDT": PriceUpdate("C_USDT"), "A_USDT": PriceUpdate("A_USDT")}
+    reader = PriceBoardReader(board, prices_objects)
+    try:
+        assert reader.poll() == 0
+        board.publish("A_USDT", 1.0)
+        board.publish("B_USDT", 3.0)
+        assert reader.poll() == 1 and prices_objects["A_USDT"].market_price == 1.0
+        assert reader.poll() == 0
+
+        async def run():
+            task = asyncio.create_task(reader.run())
+            version = prices_objects["C_USDT"].version
+            board.publish("C_USDT", 0.5)
+            await asyncio.wait_for(prices_objects["C_USDT"].wait_for_change(version), 1)
+            task.cancel()
+
+        asyncio.run(run())
+        assert prices_objects["C_USDT"].market_price == 0.5
+    finally:
+        board.close()
+        board.unlink()
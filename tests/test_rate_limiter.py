@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+import multiprocessing
+
+from exchanges.rate_limiter import Priority, RequestScheduler, SharedTokenBucket, TokenBucket
+
+
+def test_token_bucket():
+    bucket = TokenBucket(_rate=100, _capacity=2)
+    assert bucket.try_take() and bucket.try_take()
+    assert not bucket.try_take()
+    assert 0 < bucket.time_until_token() <= 0.01
+    time.sleep(0.011)
+    assert bucket.try_take()
+
+
+def test_scheduler_serves_higher_priority_first():
+    scheduler = RequestScheduler({"order": (50, 1)})
+    served = []
+
+    async def request(_name: str, _priority: Priority):
+        await scheduler.acquire("order", _priority)
+        served.append(_name)
+
+    async def run():
+        # uses the only token, everything else has to queue
+        await scheduler.acquire("order", Priority.PRICE_POLL)
+        await asyncio.gather(
+            request("poll", Priority.PRICE_POLL),
+            request("reconcile", Priority.RECONCILIATION),
+            request("new grid", Priority.NEW_GRID_ORDER),
+            request("follow up", Priority.FILL_FOLLOW_UP),
+        )
+
+    asyncio.run(run())
+    assert served == ["follow up", "new grid", "reconcile", "poll"]
+    stats = scheduler.stats()
+    assert stats["PRICE_POLL"]["requests"] == 2
+    assert all(lane["queued"] == 0 for lane in stats.values())
+    assert stats["PRICE_POLL"]["max_wait"] > stats["FILL_FOLLOW_UP"]["max_wait"] > 0
+
+
+def test_scheduler_respects_rate():
+    rate = 200
+    scheduler = RequestScheduler({"public": (rate, 5)})
+
+    async def run():
+        start = time.monotonic()
+        await asyncio.gather(
+            *(scheduler.acquire("public", Priority.PRICE_POLL) for _ in range(25))
+        )
+        return time.monotonic() - start
+
+    # first 5 use the burst, the other 20 wait for refills
+    assert asyncio.run(run()) >= 20 / rate * 0.9
+
+
+def test_cancelled_waiter_gives_up_its_turn():
+    scheduler = RequestScheduler({"private": (100, 1)})
+
+    async def run():
+        await scheduler.acquire("private", Priority.RECONCILIATION)
+        cancelled = asyncio.create_task(scheduler.acquire("private", Priority.FILL_FOLLOW_UP))
+        waiting = asyncio.create_task(scheduler.acquire("private", Priority.RECONCILIATION))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.wait_for(waiting, 1)
+
+    asyncio.run(run())
+    assert scheduler.stats()["FILL_FOLLOW_UP"]["queued"] == 0
+
+
+def test_waiter_cancelled_after_release_returns_token():
+    # refills one token every ~17 minutes, only refunds can bring it back
+    scheduler = RequestScheduler({"private": (0.001, 1)})
+    bucket = scheduler.buckets["private"]
+
+    async def run():
+        await scheduler.acquire("private", Priority.RECONCILIATION)
+        waiter = asyncio.create_task(scheduler.acquire("private", Priority.RECONCILIATION))
+        await asyncio.sleep(0)
+        # token is handed to the waiter, which is cancelled before it runs again
+        bucket.tokens = 1
+        scheduler._dispatch("private")
+        waiter.cancel()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            pass
+        return waiter.cancelled()
+
+    assert asyncio.run(run())
+    assert bucket.try_take()
+
+
+def take_tokens(_bucket: SharedTokenBucket, _results):
+    _results.put(sum(_bucket.try_take() for _ in range(20)))
+
+
+def test_shared_token_bucket_is_one_budget_across_processes():
+    context = multiprocessing.get_context("spawn")
+    # refills one token every ~3 hours, only the burst can be taken
+    bucket = SharedTokenBucket(0.0001, 10, context)
+    results = context.Queue()
+    processes = [context.Process(target=take_tokens, args=(bucket, results)) for _ in range(3)]
+    for process in processes:
+        process.start()
+    taken = [results.get(timeout=30) for _ in processes]
+    for process in processes:
+        process.join()
+    assert sum(taken) == 10
+    assert not bucket.try_take()
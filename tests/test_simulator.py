@@ -0,0 +1,227 @@
+import asyncio
+from aiohttp.test_utils import TestServer
+
+from exchanges import PriceUpdate
+from exchanges.gateio import GateIOConnector, GateIOManager, GateApiException
+from exchanges.gateio_ws import GateIOOrderStream, GateIOPriceStream
+from exchanges.simulator import GateIOSimulator, MatchingEngine, crash_path
+from grid_line_machine import GridLineManager
+
+
+def make_manager(_window=None) -> GridLineManager:
+    # grid lines 0.59049 ... 1.0 ... 1.61051
+    return GridLineManager(
+        _central_grid_price=1.0,
+        _distance_between_grids=0.1,
+        _ticker="SIM_USDT",
+        _usd_amount_to_buy_with=10,
+        _number_of_grids_on_each_side_of_grid_start_price=5,
+        _do_not_buy_above_this_price=10,
+        _do_not_buy_below_this_price=0.1,
+        _round_prices_to=5,
+        _window=_window,
+    )
+
+
+async def start(_simulator: GateIOSimulator) -> tuple[TestServer, str]:
+    server = TestServer(_simulator.app())
+    await server.start_server()
+    return server, f"http://{server.host}:{server.port}"
+
+
+def test_matching_engine_fills_crossed_orders():
+    engine = MatchingEngine()
+    engine.set_price("A_USDT", 1.0)
+    buy = engine.place("A_USDT", "buy", 0.9, 10)
+    sell = engine.place("A_USDT", "sell", 1.1, 10)
+    cancelled = engine.place("A_USDT", "buy", 0.8, 10)
+    # marketable buy fills as soon as it is placed
+    marketable = engine.place("A_USDT", "buy", 1.05, 10)
+    assert marketable.finish_as == "filled"
+
+    engine.cancel(cancelled.id)
+    assert engine.set_price("A_USDT", 0.7) == [buy]
+    assert cancelled.finish_as == "cancelled"
+    assert engine.set_price("A_USDT", 1.2) == [sell]
+    assert engine.open_orders("A_USDT") == []
+    assert [order.id for order in engine.finished["A_USDT"]] == [
+        marketable.id, cancelled.id, buy.id, sell.id,
+    ]
+
+
+def test_matching_engine_compacts_cancelled_orders():
+    engine = MatchingEngine()
+    engine.set_price("A_USDT", 1.0)
+    kept = engine.place("A_USDT", "buy", 0.5, 10)
+    # a sliding grid keeps placing and cancelling orders around price
+    for _ in range(1000):
+        engine.cancel(engine.place("A_USDT", "buy", 0.9, 10).id)
+        engine.cancel(engine.place("A_USDT", "sell", 1.1, 10).id)
+    assert len(engine._bids["A_USDT"]) <= 3 and len(engine._asks["A_USDT"]) <= 2
+    assert engine.open_orders("A_USDT") == [kept]
+    assert engine.set_price("A_USDT", 0.5) == [kept]
+    assert engine.set_price("A_USDT", 2.0) == []
+
+
+def test_connector_trades_against_simulator():
+    # price stays at 1.0 for the first ticks then falls to 0.85
+    simulator = GateIOSimulator(
+        {"SIM_USDT": [1.0, 0.85]}, _tick_interval=3600, _latency=0.001
+    )
+    manager = make_manager()
+
+    async def run():
+        server, host = await start(simulator)
+        giom = GateIOManager(_host=host)
+        connector = GateIOConnector(manager, _price_feed="rest", _host=host)
+        try:
+            await connector.manage_trades(1.0, manager, giom)
+            placed = await giom.get_orders("SIM_USDT", "open")
+
+            simulator.step()
+            await connector.manage_trades(0.85, manager, giom)
+            open_orders = await giom.get_orders("SIM_USDT", "open")
+            finished = await giom.get_orders("SIM_USDT", "finished")
+        finally:
+            await giom.close()
+            await server.close()
+        return placed, open_orders, finished
+
+    placed, open_orders, finished = asyncio.run(run())
+    # one buy on every grid line below 1.0
+    assert len(placed) == 5 and {order.side for order in placed} == {"buy"}
+    # 0.9 buy filled at 0.85 and a sell replaced it on 1.0
+    assert [order.price for order in finished] == [0.9]
+    assert manager.grid_line_obj_map_price(0.9).buy_order_filled
+    assert manager.grid_line_obj_map_price(1.0).sell_order_placed
+    assert sorted((order.side, order.price) for order in open_orders) == [
+        ("buy", 0.59049), ("buy", 0.6561), ("buy", 0.729), ("buy", 0.81), ("sell", 1.0),
+    ]
+
+
+def test_streamed_fill_places_follow_up_without_polling():
+    simulator = GateIOSimulator({"SIM_USDT": [1.0, 0.85]}, _tick_interval=3600)
+    manager = make_manager()
+
+    async def run():
+        server, host = await start(simulator)
+        giom = GateIOManager(_host=host)
+        connector = GateIOConnector(manager, _host=host)
+        connector.giom = giom
+        connector.prices_objects["SIM_USDT"].set_market_price(1.0)
+        stream = GateIOOrderStream(
+            ["SIM_USDT"], connector.on_order_update, host.replace("http", "ws") + "/ws/v4/"
+        )
+        task = asyncio.create_task(stream.run())
+        try:
+            await connector.manage_trades(1.0, manager, giom, _reconcile=False)
+            while not simulator._order_subscribers:
+                await asyncio.sleep(0.01)
+            polled = dict(simulator.requests)
+
+            # 0.9 buy fills, 0.59049 buy gets cancelled outside of the bot
+            simulator.step()
+            await giom.cancel_orders([manager.grid_line_obj_map_price(0.59049)], "SIM_USDT")
+            await simulator.push_order_events()
+            for _ in range(100):
+                if manager.grid_line_obj_map_price(1.0).sell_order_placed:
+                    break
+                await asyncio.sleep(0.01)
+            open_orders = await giom.get_orders("SIM_USDT", "open")
+        finally:
+            task.cancel()
+            await giom.close()
+            await server.close()
+        return polled, open_orders
+
+    polled, open_orders = asyncio.run(run())
+    # follow up sell went out without asking the exchange for fills
+    assert simulator.requests["private"] == polled["private"] + 1
+    assert manager.grid_line_obj_map_price(0.9).buy_order_filled
+    assert not manager.grid_line_obj_map_price(0.59049).buy_order_placed
+    assert sorted((order.side, order.price) for order in open_orders) == [
+        ("buy", 0.6561), ("buy", 0.729), ("buy", 0.81), ("sell", 1.0),
+    ]
+
+
+def test_simulator_rate_limits_and_auth():
+    simulator = GateIOSimulator({"SIM_USDT": [1.0]}, _rate_limits={
+        "public": (1, 2), "private": (100, 100), "order": (100, 100), "cancel": (100, 100)
+    })
+
+    async def run():
+        server, host = await start(simulator)
+        giom = GateIOManager(_host=host)
+        session = giom.gateio_instance.session
+        try:
+            async with session.get("/api/v4/spot/open_orders") as r:
+                unsigned_status = r.status
+            prices = [await giom.fetch_prices(["SIM_USDT"]) for _ in range(2)]
+            try:
+                await giom.gateio_instance.get_price("SIM_USDT")
+            except GateApiException as error:
+                return unsigned_status, prices, error
+        finally:
+            await giom.close()
+            await server.close()
+
+    unsigned_status, prices, error = asyncio.run(run())
+    assert unsigned_status == 401
+    assert prices[0] == {"SIM_USDT": "1.0"}
+    assert error.status == 429 and error.label == "TOO_MANY_REQUESTS"
+    assert simulator.rejected["public"] == 1
+
+
+def test_simulator_streams_prices():
+    simulator = GateIOSimulator({"SIM_USDT": crash_path(1.0, 0.5, 10)}, _tick_interval=0.01)
+    prices_objects = {"SIM_USDT": PriceUpdate("SIM_USDT")}
+
+    async def run():
+        server, host = await start(simulator)
+        stream = GateIOPriceStream(prices_objects, _url=host.replace("http", "ws") + "/ws/v4/")
+        task = asyncio.create_task(stream.run())
+        try:
+            version = 0
+            while prices_objects["SIM_USDT"].market_price != 0.5:
+                version = await asyncio.wait_for(
+                    prices_objects["SIM_USDT"].wait_for_change(version), 2
+                )
+        finally:
+            task.cancel()
+            await server.close()
+        return version
+
+    # one update per tick of the crash
+    assert asyncio.run(run()) >= 2
+    assert simulator.engine.prices["SIM_USDT"] == 0.5
+
+
+def test_sliding_grid_follows_crash():
+    # price falls far below the initial grid, a window of 4 lines follows it
+    simulator = GateIOSimulator({"SIM_USDT": crash_path(1.0, 0.8, 20)}, _tick_interval=3600)
+    manager = make_manager(_window=4)
+
+    async def run():
+        server, host = await start(simulator)
+        giom = GateIOManager(_host=host)
+        connector = GateIOConnector(manager, _price_feed="rest", _host=host)
+        most_open = 0
+        try:
+            for _ in range(21):
+                price = simulator.engine.prices["SIM_USDT"]
+                await connector.manage_trades(price, manager, giom)
+                most_open = max(most_open, len(await giom.get_orders("SIM_USDT", "open")))
+                simulator.step()
+        finally:
+            await giom.close()
+            await server.close()
+        return most_open
+
+    most_open = asyncio.run(run())
+    assert most_open <= 4
+    # grid grew below its initial lowest line and buys went there
+    assert manager.grid_lines[0] < 0.2
+    cancelled = [order for order in simulator.engine.finished["SIM_USDT"] if order.finish_as == "cancelled"]
+    assert cancelled and simulator.requests["cancel"] > 0
+    open_prices = [order.price for order in simulator.engine.open_orders("SIM_USDT")]
+    assert open_prices and all(price < 0.3 for price in open_prices)
@@ -0,0 +1,68 @@
+import asyncio, threading, time
+from aiohttp.test_utils import TestServer
+
+from exchanges.simulator import GateIOSimulator
+from supervisor import Supervisor, shard_grid_configs, shard_log_path
+
+
+def grid_config(_ticker: str, _grids: int = 5) -> dict:
+    return dict(
+        _central_grid_price=1.0,
+        _distance_between_grids=0.1,
+        _ticker=_ticker,
+        _usd_amount_to_buy_with=10,
+        _number_of_grids_on_each_side_of_grid_start_price=_grids,
+        _do_not_buy_above_this_price=10,
+        _do_not_buy_below_this_price=0.1,
+        _round_prices_to=5,
+    )
+
+
+def test_shard_grid_configs_balances_grid_lines():
+    configs = [grid_config("A_USDT", 50), grid_config("B_USDT", 10), grid_config("C_USDT", 30),
+               grid_config("D_USDT", 25)]
+    shards = shard_grid_configs(configs, 2)
+    assert [[config["_ticker"] for config in shard] for shard in shards] == [
+        ["A_USDT", "B_USDT"], ["C_USDT", "D_USDT"],
+    ]
+    # never more shards than grids
+    assert len(shard_grid_configs(configs[:1], 4)) == 1
+    assert shard_log_path("logs/DCALOGS.log", "shard-1") == "logs/DCALOGS.shard-1.log"
+
+
+def test_supervisor_trades_every_shard_against_simulator(tmp_path):
+    simulator = GateIOSimulator({"A_USDT": [1.0], "B_USDT": [1.0]}, _tick_interval=3600)
+
+    async def run():
+        server = TestServer(simulator.app())
+        await server.start_server()
+        supervisor = Supervisor(
+            [grid_config("A_USDT"), grid_config("B_USDT")],
+            _shards=2,
+            _price_feed="rest",
+            _host=f"http://{server.host}:{server.port}",
+            _journal_path=None,
+            _log_path=str(tmp_path / "DCALOGS.log"),
+        )
+        thread = threading.Thread(target=supervisor.run)
+        thread.start()
+        try:
+            deadline = time.monotonic() + 60
+            # every grid line below 1.0 gets a buy, one shard per pair
+            while time.monotonic() < deadline and not all(
+                len(simulator.engine.open_orders(pair)) == 5 for pair in ("A_USDT", "B_USDT")
+            ):
+                await asyncio.sleep(0.1)
+        finally:
+            supervisor.stop()
+            await asyncio.to_thread(thread.join)
+            await server.close()
+        return supervisor
+
+    supervisor = asyncio.run(run())
+    assert list(supervisor.processes) == ["price-feed", "shard-0", "shard-1"]
+    assert all(not process.is_alive() for process in supervisor.processes.values())
+    assert supervisor.restarts == {}
+    for pair in ("A_USDT", "B_USDT"):
+        assert len(simulator.engine.open_orders(pair)) == 5
+    assert (tmp_path / "DCALOGS.shard-0.log").exists()
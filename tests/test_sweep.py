@@ -0,0 +1,59 @@
+import pytest
+import numpy as np
+import pandas as pd
+
+from sweep import configurations, parse_values, run_sweep
+
+
+def test_parse_values():
+    assert parse_values("0.1") == [0.1]
+    assert parse_values("0.01:0.05:0.01") == [0.01, 0.02, 0.03, 0.04, 0.05]
+    assert parse_values("5:20:5") == [5, 10, 15, 20]
+
+
+def test_configurations_skip_invalid_bounds():
+    ranges = {"distance": [0.1], "grids": [5], "usd": [10], "above": [1, 2], "below": [0.5, 1.5]}
+    assert [(c["above"], c["below"]) for c in configurations(ranges)] == [(1, 0.5), (2, 0.5), (2, 1.5)]
+
+
+def test_configurations_drop_grids_collapsed_by_rounding():
+    # distance is rounded to 0.001 by GridLineManager, 0.0101 and 0.0104 are both 0.01
+    ranges = {
+        "distance": parse_values("0.01:0.0106:0.0001"), "grids": [5, 5.0], "usd": [10],
+        "above": [2], "below": [0.5],
+    }
+    assert [(c["distance"], c["grids"]) for c in configurations(ranges)] == [(0.01, 5), (0.011, 5)]
+
+
+def test_run_sweep_ranks_every_configuration():
+    rng = np.random.default_rng(0)
+    close = np.exp(np.cumsum(rng.normal(0, 0.01, 2000)))
+    open_ = np.r_[1.0, close[:-1]]
+    candles = pd.DataFrame(
+        {
+            "open": open_,
+            "high": np.maximum(open_, close) * 1.002,
+            "low": np.minimum(open_, close) * 0.998,
+            "close": close,
+        }
+    )
+    ranges = {
+        "distance": [0.02, 0.05],
+        "grids": [3, 6],
+        "usd": [10],
+        "above": [10],
+        "below": [0.1],
+    }
+    progress = []
+
+    ranked = run_sweep(
+        candles,
+        ranges,
+        _workers=2,
+        _chunk_size=1,
+        _on_result=lambda _ranked, _done, _total: progress.append((_done, _total)),
+    )
+    assert len(ranked) == 4
+    assert list(ranked["pnl"]) == sorted(ranked["pnl"], reverse=True)
+    assert progress[-1] == (4, 4) and len(progress) == 4
+    assert (ranked["buy_fills"] > 0).all()